@@ -1,15 +1,37 @@
 # api/main.py
 
 from fastapi import FastAPI
-from api.routers import topics, queues, messages, auth
+from api.routers import topics, queues, messages, auth, cluster, metrics
+from mom_server.database import init_db
+from mom_server.services.outbox import outbox_dispatcher
+from mom_server.services.membership import membership
+from mom_server.services.rebalancer import start_partition_map_tasks
 
 app = FastAPI(title="MOM Cluster API")
 
+@app.on_event("startup")
+def startup():
+    # Crear tablas y aplicar migraciones pendientes antes de atender solicitudes
+    init_db()
+    # Reanudar la replicación pendiente que quedó en el outbox
+    outbox_dispatcher.start()
+    # Observar el estado de los nodos para no enrutar ni replicar hacia nodos caídos
+    membership.start(announce=False)
+    # El mapa de particiones lo gestiona el proceso que enruta: este (sin efecto si gRPC ya lo arrancó)
+    start_partition_map_tasks()
+
+@app.on_event("shutdown")
+def shutdown():
+    membership.stop()
+    outbox_dispatcher.stop()
+
 # Incluir los routers con sus prefijos actualizados para coincidir con las pruebas
 app.include_router(auth.router)
 app.include_router(topics.router, prefix="/messages/topics", tags=["Topics"])
 app.include_router(queues.router, prefix="/messages/queues", tags=["Queues"])
 app.include_router(messages.router, prefix="/messages/messages", tags=["Messages"])
+app.include_router(cluster.router, prefix="/cluster", tags=["Cluster"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,136 @@
+# api/routers/cluster.py
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Optional
+import logging
+
+from api.routers.auth import verify_token
+from mom_server.config import SELF_HOST, CLUSTER_NODES, PARTITIONING_ENABLED, METADATA_ENABLED, METADATA_NODE
+from mom_server.services.forwarding import forward
+from mom_server.services.metadata import metadata_service, metadata_watcher
+from mom_server.services.partitioning import get_partition_map, get_partition_for_topic, topic_key, queue_key
+from mom_server.services.state import get_topic
+from mom_server.services.rebalancer import rebalancer
+from mom_server.services.replication_lag import replication_lag_report
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+class NodeWeights(BaseModel):
+    weights: Dict[str, float]  # Nodo -> peso; 0 = el nodo no recibe particiones
+
+@router.get("/replication")
+def replication_lag_endpoint(topic: Optional[str] = None):
+    """
+    Retraso de cada réplica en las particiones que lidera este nodo:
+    offset confirmado, mensajes y segundos por detrás del líder y latencia de replicación.
+    """
+    entries = replication_lag_report(topic)
+    return {
+        "node": SELF_HOST,
+        "max_lag_messages": max((entry["lag_messages"] for entry in entries), default=0),
+        "replication": entries
+    }
+
+@router.get("/rebalance")
+def rebalance_status_endpoint():
+    """
+    Estado del rebalanceo: mapa activo, mapa objetivo en curso, particiones que aún
+    se están trayendo y resumen del último corte.
+    """
+    return {"node": SELF_HOST, **rebalancer.status()}
+
+def _owners(keys):
+    """Versión del mapa activo y nodos responsables de cada clave en ese mismo mapa, primario primero."""
+    if not PARTITIONING_ENABLED:
+        return 0, [[SELF_HOST] + [node for node in CLUSTER_NODES if node != SELF_HOST] for _ in keys]
+    partition_map = get_partition_map()
+    return partition_map.version, [list(partition_map.placement(key)["all_responsible_nodes"]) for key in keys]
+
+@router.get("/partition-map")
+def partition_map_endpoint():
+    """Mapa de particiones activo en este nodo: versión, nodos y parámetros de reparto."""
+    partition_map = get_partition_map()
+    return {
+        "node": SELF_HOST,
+        "version": partition_map.version,
+        "nodes": list(partition_map.nodes),
+        "strategy": partition_map.strategy,
+        "replication_factor": partition_map.replication_factor
+    }
+
+@router.get("/partition-map/topic/{topic_name}")
+def topic_owners_endpoint(topic_name: str, redirected: bool = False):
+    """
+    Responsables de cada partición de un tópico, para clientes que envían cada
+    solicitud directamente al primario (ver mom_client).
+    """
+    topic = get_topic(topic_name)
+    if topic is None and PARTITIONING_ENABLED and not redirected:
+        # Solo los responsables guardan la configuración del tópico: la tiene el primario de la partición 0
+        primary_node = get_partition_for_topic(topic_name)["primary"]
+        if primary_node != SELF_HOST:
+            try:
+                response = forward("GET", primary_node, f"/cluster/partition-map/topic/{topic_name}",
+                                   params={"redirected": True})
+            except Exception as e:
+                logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
+            else:
+                if response.status_code >= 400:
+                    raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+                return response.json()
+    if topic is None:
+        raise HTTPException(status_code=404, detail="Tópico no encontrado")
+    version, owners = _owners([topic_key(topic_name, partition_id) for partition_id in range(topic["partitions"])])
+    return {"node": SELF_HOST, "version": version, "topic": topic_name, "partitions": topic["partitions"],
+            "owners": owners}
+
+@router.get("/partition-map/queue/{queue_name}")
+def queue_owners_endpoint(queue_name: str):
+    """Responsables de una cola, el primario (que entrega los mensajes) primero."""
+    version, owners = _owners([queue_key(queue_name)])
+    return {"node": SELF_HOST, "version": version, "queue": queue_name, "owners": owners[0]}
+
+@router.get("/metadata")
+def metadata_status_endpoint():
+    """
+    Servicio de metadatos: última versión del mapa recibida por este nodo y, en el
+    nodo que lo aloja, la versión publicada y los nodos que la observan.
+    """
+    return {
+        "node": SELF_HOST,
+        "enabled": METADATA_ENABLED,
+        "watcher": metadata_watcher.status(),
+        "service": metadata_service.status() if SELF_HOST == METADATA_NODE else None
+    }
+
+@router.put("/metadata/weights")
+def set_weights_endpoint(body: NodeWeights, token: str, redirected: bool = False):
+    """Cambia el peso de los nodos en el mapa de particiones; la versión nueva llega a todos los nodos."""
+    verify_token(token)
+    if not METADATA_ENABLED:
+        raise HTTPException(status_code=409, detail="Servicio de metadatos desactivado (METADATA_NODE vacío)")
+    if SELF_HOST != METADATA_NODE:
+        if redirected:
+            raise HTTPException(status_code=409, detail=f"El servicio de metadatos está en {METADATA_NODE}")
+        logger.info(f"Redirigiendo cambio de pesos al nodo de metadatos: {METADATA_NODE}")
+        try:
+            response = forward(
+                "PUT", METADATA_NODE, "/cluster/metadata/weights",
+                json={"weights": body.weights}, params={"token": token, "redirected": True}
+            )
+        except Exception as e:
+            logger.error(f"Error al contactar el nodo de metadatos {METADATA_NODE}: {str(e)}")
+            raise HTTPException(status_code=503, detail=f"Nodo de metadatos {METADATA_NODE} no disponible")
+        if response.status_code >= 400:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        return response.json()
+    if not metadata_service.is_alive():
+        # API en un proceso distinto del servidor gRPC, que es quien aloja el servicio
+        raise HTTPException(status_code=503, detail="El servicio de metadatos no se ejecuta en este proceso")
+    try:
+        spec = metadata_service.set_weights(body.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"node": SELF_HOST, **spec}
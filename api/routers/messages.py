@@ -1,25 +1,39 @@
 # api/routers/messages.py - Versión corregida
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Header
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+import itertools
 import logging
+import time
 
 # AÑADIR estas nuevas importaciones
-from mom_server.services.partitioning import get_partition_for_topic, get_partition_for_queue, is_node_responsible, get_responsible_nodes
-from mom_server.config import PARTITIONING_ENABLED, CLUSTER_NODES
-import requests
-import logging
+from mom_server.services.partitioning import (
+    get_partition_for_topic, get_partition_for_queue, is_node_responsible, get_responsible_nodes, partition_for_key,
+    get_partition_map, shared_map_version
+)
+from mom_server.config import (
+    PARTITIONING_ENABLED, CLUSTER_NODES, SELF_HOST, PRODUCER_ACKS, PRODUCER_ACKS_LEVELS, REPLICATION_PEER_DEADLINE,
+    READ_CONSISTENCY, READ_CONSISTENCY_LEVELS
+)
+from mom_server.services.forwarding import forward
 
 # Mantener las importaciones originales
 from api.routers.auth import verify_token
 from mom_server.services.state import (
-    get_topics,
+    get_topic,
+    get_topic_messages,
     add_topic_message,
-    get_queues,
+    get_queue,
     add_queue_message,
     consume_queue_message
 )
-from mom_server.services.messaging import replicate_message_to_cluster, replicate_message_to_specific_nodes
+from mom_server.services.messaging import replicate_message_to_specific_nodes
+from mom_server.services.outbox import outbox_dispatcher
+from mom_server.services.quorum_read import quorum_read, merge_responses, ReadQuorumError
+from mom_server.services.rebalancer import rebalancer
+from mom_server.services.replication_lag import replication_tracker
+from mom_server.db.outbox_repository import delete_message_entry
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,169 +41,390 @@ router = APIRouter()
 class Message(BaseModel):
     sender: str
     content: str
+    # Solo para tópicos: se guardan con el mensaje y viajan en el sobre de replicación
+    headers: Dict[str, str] = Field(default_factory=dict)
+    # Solo para tópicos: los mensajes con la misma clave van a la misma partición
+    key: Optional[str] = None
+
+def _forwarded(response):
+    """Cuerpo de una respuesta reenviada; los errores del otro nodo se devuelven con su código."""
+    if response.status_code >= 400:
+        raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+    return response.json()
+
+def _misdirected(map_version: Optional[int], name: str, primary_node: str):
+    """
+    Un cliente que enruta con su propio mapa (cabecera X-Partition-Map-Version) recibe
+    421 en lugar de un reenvío, para que actualice el mapa y vaya directo al responsable.
+
+    Las versiones solo se comparan si son comunes a todo el clúster (servicio de metadatos
+    o mapa gestionado por el rebalanceador): si la del cliente es más nueva que la local,
+    este nodo es el desactualizado y la solicitud se reenvía como cualquier otra. Sin
+    versión común basta con que este nodo no sea el responsable para responder 421.
+    """
+    if map_version is None:
+        return
+    if shared_map_version() and map_version > get_partition_map().version:
+        logger.info(f"Mapa v{map_version} del cliente más nuevo que el local para '{name}': se reenvía")
+        return
+    logger.info(f"Solicitud para '{name}' con mapa v{map_version} dirigida a un nodo no responsable (primario: {primary_node})")
+    raise HTTPException(status_code=421, detail={
+        "message": f"Este nodo no es responsable de '{name}'",
+        "primary": primary_node,
+        "version": get_partition_map().version
+    })
+
+# Tópico -> contador para repartir en round-robin los mensajes sin clave
+_round_robin = {}
+
+def _choose_partition(topic_name: str, partitions: int, key: Optional[str] = None):
+    """Partición de un mensaje: por hash de la clave si la tiene, en round-robin si no."""
+    if partitions <= 1:
+        return 0
+    if key is not None:
+        return partition_for_key(key, partitions)
+    return next(_round_robin.setdefault(topic_name, itertools.count())) % partitions
+
+def _replica_nodes(name: str, entity_type: str = "topic", partition_id: int = 0):
+    """Nodos, distintos del local, que deben recibir copia de los mensajes del tópico (o partición) o cola."""
+    if PARTITIONING_ENABLED:
+        nodes = get_responsible_nodes(name, entity_type, partition_id)
+    else:
+        # Comportamiento original: replicar a todos los nodos
+        nodes = CLUSTER_NODES
+    return [node for node in nodes if node != SELF_HOST and node.strip()]
+
+def _store_topic_message(topic_name: str, sender: str, content: str, acks: str, headers: dict = None,
+                         partition_id: int = 0):
+    """
+    Guarda el mensaje en la partición junto con su trabajo de replicación en el outbox.
+
+    Con acks="all" se replica de forma síncrona y se devuelven también los nodos que
+    confirmaron; las réplicas que no lo hagan quedan en el outbox para los emisores
+    en segundo plano. Con cualquier otro nivel solo se avisa a los emisores.
+
+    Returns:
+        tuple: Registro guardado (message_id, partición, offset...) y nodos que confirmaron
+    """
+    replicas = _replica_nodes(topic_name, "topic", partition_id)
+    if acks != "all":
+        record = add_topic_message(topic_name, sender, content, replicate_to=replicas, headers=headers,
+                                   partition_id=partition_id)
+        outbox_dispatcher.wake(replicas)
+        return record, []
+
+    # El outbox espera el plazo de la replicación síncrona antes de reintentar por su cuenta
+    appended_at = time.time()
+    record = add_topic_message(topic_name, sender, content, replicate_to=replicas,
+                               replication_delay=REPLICATION_PEER_DEADLINE, headers=headers, partition_id=partition_id)
+    message_id = record["message_id"]
+
+    def on_ack(node):
+        delete_message_entry(message_id, node)
+        replication_tracker.record_ack(node, {"topic_name": topic_name, "appended_at": appended_at, **record})
+
+    logger.info(f"Replicando mensaje para '{topic_name}' a nodos: {replicas}")
+    acked = replicate_message_to_specific_nodes(
+        topic_name, sender, content, replicas, "all", message_id=message_id,
+        on_ack=on_ack,
+        partition_id=record["partition_id"], partition_offset=record["partition_offset"],
+        timestamp=record["timestamp"], headers=record["headers"]
+    )
+    outbox_dispatcher.wake([node for node in replicas if node not in acked])
+    return record, acked
+
+def _store_topic_message_deferred(topic_name: str, sender: str, content: str, headers: dict = None,
+                                  partition_id: int = 0):
+    """Escritura diferida para acks=0: se ejecuta después de responder al productor."""
+    try:
+        # Como en las demás escrituras: si la partición se está trayendo, sus offsets van primero
+        rebalancer.ensure_ready(topic_name, partition_id)
+        _store_topic_message(topic_name, sender, content, "0", headers, partition_id)
+    except Exception as e:
+        logger.error(f"Error al agregar mensaje (acks=0) al tópico '{topic_name}': {str(e)}")
 
 @router.post("/topic/{topic_name}")
-def send_message_endpoint(topic_name: str, message: Message, token: str, redirected: bool = False):
+def send_message_endpoint(topic_name: str, message: Message, token: str, background_tasks: BackgroundTasks,
+                          redirected: bool = False, acks: Optional[str] = None, partition: Optional[int] = None,
+                          map_version: Optional[int] = Header(None, alias="X-Partition-Map-Version")):
+    """
+    Publica un mensaje en un tópico.
+
+    La partición es la indicada en `partition` o, si no se indica, la que corresponde
+    al hash de `key` del mensaje; los mensajes sin clave se reparten en round-robin.
+    Cada partición tiene su propio líder, al que se reenvía la escritura.
+
+    El parámetro `acks` (o, si no se indica, el configurado en el tópico o PRODUCER_ACKS)
+    decide cuándo se responde al productor:
+      - "0": en cuanto el mensaje es aceptado; escritura y replicación ocurren después
+      - "1": tras confirmar la escritura en el líder; la replicación continúa en segundo plano
+      - "all": tras confirmar la escritura en el líder y en todas las réplicas
+    """
     user = verify_token(token)
+    if acks is not None and acks not in PRODUCER_ACKS_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Nivel de acks inválido: {acks}")
+    topic = get_topic(topic_name)
+    if partition is not None and (partition < 0 or (topic is not None and partition >= topic["partitions"])):
+        raise HTTPException(status_code=400, detail=f"Partición inválida: {partition}")
+    if topic is not None and partition is None:
+        partition = _choose_partition(topic_name, topic["partitions"], message.key)
     
-    # CÓDIGO CORREGIDO: Verificar particionamiento con parámetro de redirección
+    # Las escrituras se dirigen al líder (nodo primario) de la partición
     if PARTITIONING_ENABLED and not redirected:
-        partition_info = get_partition_for_topic(topic_name)
+        # Sin la configuración del tópico no se conocen sus particiones: decide el primario de la partición 0
+        partition_info = get_partition_for_topic(topic_name, partition_id=partition or 0)
         
-        if not partition_info["is_primary"] and not partition_info["is_secondary"]:
-            # Este nodo no es responsable - reenviar al nodo primario
+        if not partition_info["is_primary"]:
+            # Este nodo no es el líder - reenviar al nodo primario
             primary_node = partition_info["primary"]
+            _misdirected(map_version, topic_name, primary_node)
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo mensaje para tópico '{topic_name}' al nodo primario: {primary_node}")
-                response = requests.post(
-                    f"http://{primary_node}/messages/messages/topic/{topic_name}",
-                    json={"sender": message.sender, "content": message.content},
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                params = {"token": token}
+                # La partición elegida (o indicada) viaja siempre; el líder solo vuelve a
+                # decidir si este nodo no conoce el tópico
+                if partition is not None:
+                    params["partition"] = partition
+                if topic is not None:
+                    params["redirected"] = True
+                if acks is not None:
+                    params["acks"] = acks
+                response = forward(
+                    "POST", primary_node, f"/messages/messages/topic/{topic_name}",
+                    json={"sender": message.sender, "content": message.content, "headers": message.headers,
+                          "key": message.key},
+                    params=params
                 )
-                return response.json()
             except Exception as e:
                 logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
-                # En caso de error, procesamos localmente en vez de fallar
-                logger.warning(f"Procesando mensaje localmente debido al error de comunicación")
+                # Escribir aquí asignaría offsets que el líder también asigna: mejor que el productor reintente
+                raise HTTPException(status_code=503, detail=f"Líder de la partición no disponible: {primary_node}")
+            else:
+                return _forwarded(response)
         else:
-            logger.info(f"Nodo actual es responsable para el tópico '{topic_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
+            logger.info(f"Nodo actual es líder para el tópico '{topic_name}' (partición {partition or 0})")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    topics = get_topics()
-    if topic_name not in topics:
+    if topic is None:
         logger.warning(f"Tópico '{topic_name}' no encontrado")
         raise HTTPException(status_code=404, detail="Tópico no encontrado")
+    acks = acks or topic["acks"] or PRODUCER_ACKS
+
+    if acks == "0":
+        background_tasks.add_task(
+            _store_topic_message_deferred, topic_name, user, message.content, message.headers, partition
+        )
+        return {"message": "Mensaje aceptado", "acks": acks, "partition": partition}
+
+    # Si este nodo aún está trayendo la partición por un rebalanceo, los offsets nuevos deben seguir a los suyos
+    rebalancer.ensure_ready(topic_name, partition)
+
     try:
-        logger.info(f"Agregando mensaje al tópico '{topic_name}' localmente")
-        add_topic_message(topic_name, user, message.content)
+        logger.info(f"Agregando mensaje al tópico '{topic_name}' (partición {partition}) localmente")
+        record, acked = _store_topic_message(topic_name, user, message.content, acks, message.headers, partition)
     except Exception as e:
         logger.error(f"Error al agregar mensaje al tópico '{topic_name}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al agregar mensaje al tópico: {str(e)}")
-    
-    # MODIFICACIÓN: Si hay particionamiento, replicar solo a nodos responsables
-    if PARTITIONING_ENABLED:
-        responsible_nodes = get_responsible_nodes(topic_name)
-        logger.info(f"Replicando mensaje para '{topic_name}' a nodos responsables: {responsible_nodes}")
-        replicate_message_to_specific_nodes(topic_name, user, message.content, responsible_nodes)
-    else:
-        # Comportamiento original: replicar a todos los nodos
-        logger.info(f"Replicando mensaje para '{topic_name}' a todo el clúster")
-        replicate_message_to_cluster(topic_name, user, message.content)
-    
-    return {"message": "Mensaje enviado y replicado"}
+
+    identity = {"message_id": record["message_id"], "partition": record["partition_id"],
+                "offset": record["partition_offset"]}
+    if acks == "1":
+        return {"message": "Mensaje enviado, replicación en curso", "acks": acks, **identity}
+    return {"message": "Mensaje enviado y replicado", "acks": acks, "replicas_acked": len(acked), **identity}
 
 # MODIFICAR las funciones para colas de manera similar
 @router.post("/queue/{queue_name}")
-def send_queue_message_endpoint(queue_name: str, message: Message, token: str, redirected: bool = False):
+def send_queue_message_endpoint(queue_name: str, message: Message, token: str, redirected: bool = False,
+                                map_version: Optional[int] = Header(None, alias="X-Partition-Map-Version")):
+    """
+    Encola un mensaje en el líder (nodo primario) de la cola.
+
+    El evento de encolado se replica a los secundarios de forma asíncrona y por
+    lotes a través del outbox.
+    """
     user = verify_token(token)
     
-    # CÓDIGO CORREGIDO: Verificar particionamiento con parámetro de redirección
+    # Las escrituras se dirigen al líder (nodo primario) de la cola
     if PARTITIONING_ENABLED and not redirected:
         partition_info = get_partition_for_queue(queue_name)
         
-        if not partition_info["is_primary"] and not partition_info["is_secondary"]:
-            # Este nodo no es responsable - reenviar al nodo primario
+        if not partition_info["is_primary"]:
+            # Este nodo no es el líder - reenviar al nodo primario
             primary_node = partition_info["primary"]
+            _misdirected(map_version, queue_name, primary_node)
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo mensaje para cola '{queue_name}' al nodo primario: {primary_node}")
-                response = requests.post(
-                    f"http://{primary_node}/messages/messages/queue/{queue_name}",
+                response = forward(
+                    "POST", primary_node, f"/messages/messages/queue/{queue_name}",
                     json={"sender": message.sender, "content": message.content},
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                    params={"token": token, "redirected": True}
                 )
-                return response.json()
             except Exception as e:
                 logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
                 # En caso de error, procesamos localmente en vez de fallar
                 logger.warning(f"Procesando mensaje localmente debido al error de comunicación")
+            else:
+                # Los errores del primario (404, 421...) se devuelven con su código
+                return _forwarded(response)
         else:
-            logger.info(f"Nodo actual es responsable para la cola '{queue_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
+            logger.info(f"Nodo actual es líder para la cola '{queue_name}'")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    queues = get_queues()
-    if queue_name not in queues:
+    if get_queue(queue_name) is None:
         logger.warning(f"Cola '{queue_name}' no encontrada")
         raise HTTPException(status_code=404, detail="Cola no encontrada")
     try:
         logger.info(f"Agregando mensaje a la cola '{queue_name}' localmente")
-        add_queue_message(queue_name, user, message.content)
+        replicas = _replica_nodes(queue_name, "queue")
+        add_queue_message(queue_name, user, message.content, replicate_to=replicas)
+        outbox_dispatcher.wake(replicas)
     except Exception as e:
         logger.error(f"Error al agregar mensaje a la cola '{queue_name}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al agregar mensaje a la cola: {str(e)}")
     return {"message": "Mensaje enviado a la cola"}
 
+def _read_partition(topic_name: str, partition_id: int, map_version: Optional[int] = None):
+    """Mensajes de una partición leídos en este nodo si es responsable, o en su primario."""
+    partition_info = get_partition_for_topic(topic_name, partition_id=partition_id)
+    if not partition_info["is_primary"] and not partition_info["is_secondary"]:
+        primary_node = partition_info["primary"]
+        _misdirected(map_version, topic_name, primary_node)
+        try:
+            logger.info(f"Redirigiendo lectura de '{topic_name}'/{partition_id} al nodo primario: {primary_node}")
+            response = forward(
+                "GET", primary_node, f"/messages/messages/topic/{topic_name}",
+                params={"redirected": True, "partition": partition_id, "consistency": "one"}
+            )
+            response.raise_for_status()
+            return response.json().get("messages", [])
+        except Exception as e:
+            logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
+            # En caso de error, procesamos localmente en vez de fallar
+            logger.warning(f"Obteniendo mensajes localmente debido al error de comunicación")
+    return get_topic_messages(topic_name, partition_id)
+
 @router.get("/topic/{topic_name}")
-def get_messages_endpoint(topic_name: str, redirected: bool = False):
-    # CÓDIGO CORREGIDO: Verificar particionamiento con parámetro de redirección
-    if PARTITIONING_ENABLED and not redirected:
+def get_messages_endpoint(topic_name: str, redirected: bool = False, consistency: Optional[str] = None,
+                          partition: Optional[int] = None,
+                          map_version: Optional[int] = Header(None, alias="X-Partition-Map-Version")):
+    """
+    Devuelve los mensajes de un tópico, o solo los de `partition` si se indica.
+
+    Sin `partition`, se leen todas las particiones (cada una de sus nodos
+    responsables) y se devuelven en orden de partición.
+
+    El parámetro `consistency` (o, si no se indica, READ_CONSISTENCY) decide cuántas
+    réplicas de cada partición deben responder:
+      - "one": responde el nodo que recibe la lectura si es responsable, o el primario
+      - "quorum": este nodo consulta a los responsables y responde con la mayoría
+      - "all": como "quorum", pero deben responder todos los responsables
+    Con "quorum" y "all" las réplicas desactualizadas se reparan en segundo plano.
+    """
+    consistency = consistency or READ_CONSISTENCY
+    if consistency not in READ_CONSISTENCY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Nivel de consistencia inválido: {consistency}")
+    topic = get_topic(topic_name)
+    if partition is not None and (partition < 0 or (topic is not None and partition >= topic["partitions"])):
+        raise HTTPException(status_code=400, detail=f"Partición inválida: {partition}")
+
+    if PARTITIONING_ENABLED and not redirected and topic is None:
+        # Sin la configuración del tópico no se conocen sus particiones: lee el primario de la partición 0
         partition_info = get_partition_for_topic(topic_name)
-        
-        if not partition_info["is_primary"] and not partition_info["is_secondary"]:
-            # Este nodo no es responsable - reenviar al nodo primario
+        if not partition_info["is_primary"]:
             primary_node = partition_info["primary"]
+            _misdirected(map_version, topic_name, primary_node)
             try:
-                # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo obtención de mensajes de tópico '{topic_name}' al nodo primario: {primary_node}")
-                response = requests.get(
-                    f"http://{primary_node}/messages/messages/topic/{topic_name}",
-                    params={"redirected": True},
-                    timeout=5
-                )
-                return response.json()
+                # redirected=True: si el primario tampoco tiene el tópico responde 404 en vez de reenviarlo otra vez
+                params = {"redirected": True, "consistency": consistency}
+                if partition is not None:
+                    params["partition"] = partition
+                response = forward("GET", primary_node, f"/messages/messages/topic/{topic_name}", params=params)
             except Exception as e:
                 logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
-                # En caso de error, procesamos localmente en vez de fallar
                 logger.warning(f"Obteniendo mensajes localmente debido al error de comunicación")
-        else:
-            logger.info(f"Nodo actual es responsable para el tópico '{topic_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
-    
+            else:
+                return _forwarded(response)
+
+    if partition is not None:
+        partitions = [partition]
+    else:
+        partitions = list(range(topic["partitions"] if topic else 1))
+
+    # Las lecturas de réplica que lanza el coordinador llegan con consistency=one y se leen en local;
+    # una lectura quorum/all reenviada (redirected) la coordina el nodo que la recibe
+    if consistency != "one":
+        try:
+            responses = {partition_id: quorum_read(topic_name, consistency, partition_id) for partition_id in partitions}
+        except ReadQuorumError as e:
+            logger.warning(str(e))
+            raise HTTPException(status_code=503, detail=str(e))
+        if all(messages is None for messages in responses.values()):
+            logger.warning(f"Tópico '{topic_name}' no encontrado")
+            raise HTTPException(status_code=404, detail="Tópico no encontrado")
+        return {"messages": merge_responses(responses), "consistency": consistency}
+
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    topics = get_topics()
-    if topic_name not in topics:
+    if topic is None:
         logger.warning(f"Tópico '{topic_name}' no encontrado")
         raise HTTPException(status_code=404, detail="Tópico no encontrado")
-    return {"messages": topics[topic_name]["messages"]}
+    if not PARTITIONING_ENABLED or redirected:
+        for partition_id in partitions:
+            rebalancer.ensure_ready(topic_name, partition_id)
+        return {"messages": get_topic_messages(topic_name, partition)}
+    messages = []
+    for partition_id in partitions:
+        messages.extend(_read_partition(topic_name, partition_id, map_version))
+    return {"messages": messages}
 
 @router.get("/queue/{queue_name}")
-def get_queue_message_endpoint(queue_name: str, token: str, redirected: bool = False):
+def get_queue_message_endpoint(queue_name: str, token: str, redirected: bool = False,
+                               map_version: Optional[int] = Header(None, alias="X-Partition-Map-Version")):
+    """
+    Consume el siguiente mensaje de la cola en su líder.
+
+    El líder es el único que decide qué mensaje se entrega; el ack resultante se
+    replica a los secundarios por el outbox para que eliminen su copia.
+    """
     user = verify_token(token)
     
-    # CÓDIGO CORREGIDO: Verificar particionamiento con parámetro de redirección
+    # El consumo lo resuelve el líder (nodo primario) de la cola
     if PARTITIONING_ENABLED and not redirected:
         partition_info = get_partition_for_queue(queue_name)
         
-        if not partition_info["is_primary"] and not partition_info["is_secondary"]:
-            # Este nodo no es responsable - reenviar al nodo primario
+        if not partition_info["is_primary"]:
+            # Este nodo no es el líder - reenviar al nodo primario
             primary_node = partition_info["primary"]
+            _misdirected(map_version, queue_name, primary_node)
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo obtención de mensaje de cola '{queue_name}' al nodo primario: {primary_node}")
-                response = requests.get(
-                    f"http://{primary_node}/messages/messages/queue/{queue_name}",
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                response = forward(
+                    "GET", primary_node, f"/messages/messages/queue/{queue_name}",
+                    params={"token": token, "redirected": True}
                 )
-                return response.json()
             except Exception as e:
                 logger.error(f"Error al contactar nodo primario {primary_node}: {str(e)}")
                 # En caso de error, procesamos localmente en vez de fallar
                 logger.warning(f"Obteniendo mensaje localmente debido al error de comunicación")
+            else:
+                # Los errores del primario (404, 421...) se devuelven con su código
+                return _forwarded(response)
         else:
-            logger.info(f"Nodo actual es responsable para la cola '{queue_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
+            logger.info(f"Nodo actual es líder para la cola '{queue_name}'")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    queues = get_queues()
-    if queue_name not in queues:
+    if get_queue(queue_name) is None:
         logger.warning(f"Cola '{queue_name}' no encontrada")
         raise HTTPException(status_code=404, detail="Cola no encontrada")
     
-    msg = consume_queue_message(queue_name)
+    replicas = _replica_nodes(queue_name, "queue")
+    msg = consume_queue_message(queue_name, replicate_to=replicas)
     logger.info(f"Mensaje consumido de cola '{queue_name}': {msg}")
     if not msg:
         return {"message": None}
+    outbox_dispatcher.wake(replicas)
     
-    return {"message": msg}
\ No newline at end of file
+    return {"message": msg}
@@ -0,0 +1,66 @@
+# api/routers/metrics.py
+
+"""Métricas del nodo en formato de texto de Prometheus."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from mom_server.db import outbox_repository
+from mom_server.services.circuit_breaker import breakers_snapshot, OPEN
+from mom_server.services.membership import membership
+from mom_server.services.replication_lag import replication_lag_report
+
+router = APIRouter()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _replica_labels(entry):
+    return {"topic": entry["topic"], "partition": entry["partition"], "replica": entry["replica"]}
+
+class _MetricsWriter:
+    """Acumula familias de métricas (HELP, TYPE y muestras) en orden."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, help_text, samples, metric_type="gauge"):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {value}")
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    writer = _MetricsWriter()
+
+    lag = replication_lag_report()
+    leaders = {(entry["topic"], entry["partition"]): entry["leader_offset"] for entry in lag}
+    writer.family("mom_replication_leader_offset", "Último offset escrito en el líder",
+                  [({"topic": topic, "partition": partition}, offset) for (topic, partition), offset in leaders.items()])
+    writer.family("mom_replication_acked_offset", "Último offset confirmado por la réplica",
+                  [(_replica_labels(entry), entry["acked_offset"]) for entry in lag])
+    writer.family("mom_replication_lag_messages", "Mensajes de la réplica por detrás del líder",
+                  [(_replica_labels(entry), entry["lag_messages"]) for entry in lag])
+    writer.family("mom_replication_lag_seconds", "Antigüedad del mensaje más antiguo sin confirmar",
+                  [(_replica_labels(entry), entry["lag_seconds"]) for entry in lag])
+    writer.family("mom_replication_latency_seconds", "Media móvil de la latencia de replicación",
+                  [(_replica_labels(entry), entry["avg_latency_ms"] / 1000)
+                   for entry in lag if entry["avg_latency_ms"] is not None])
+
+    writer.family("mom_outbox_pending", "Entradas del outbox pendientes por nodo",
+                  [({"peer": peer}, count) for peer, count in sorted(outbox_repository.count_pending_by_peer().items())])
+
+    members = membership.snapshot()
+    writer.family("mom_peer_up", "1 si el detector de fallos considera vivo al nodo",
+                  [({"peer": node}, int(state["alive"])) for node, state in sorted(members.items())])
+    writer.family("mom_peer_phi", "Valor phi del detector de fallos",
+                  [({"peer": node}, state["phi"]) for node, state in sorted(members.items())])
+    writer.family("mom_circuit_open", "1 si el circuit breaker del nodo está abierto",
+                  [({"peer": address}, int(state["state"] == OPEN)) for address, state in sorted(breakers_snapshot().items())])
+
+    return writer.render()
@@ -8,6 +8,7 @@ import logging
 from api.routers.auth import verify_token
 from mom_server.services.state import (
     get_queues,
+    get_queue,
     create_queue,
     delete_queue
 )
@@ -21,7 +22,7 @@ from mom_server.services.messaging import (
 # NUEVAS IMPORTACIONES para particionamiento
 from mom_server.services.partitioning import get_partition_for_queue, is_node_responsible, get_responsible_nodes
 from mom_server.config import PARTITIONING_ENABLED, CLUSTER_NODES
-import requests
+from mom_server.services.forwarding import forward
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,11 +46,10 @@ def create_queue_endpoint(queue: QueueData, token: str, redirected: bool = False
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo solicitud de creación de cola '{queue.name}' al nodo primario: {primary_node}")
-                response = requests.post(
-                    f"http://{primary_node}/messages/queues",
+                response = forward(
+                    "POST", primary_node, "/messages/queues",
                     json={"name": queue.name, "owner": user},
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                    params={"token": token, "redirected": True}
                 )
                 return response.json()
             except Exception as e:
@@ -60,8 +60,7 @@ def create_queue_endpoint(queue: QueueData, token: str, redirected: bool = False
             logger.info(f"Nodo actual es responsable para la cola '{queue.name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    queues = get_queues()
-    if queue.name in queues:
+    if get_queue(queue.name) is not None:
         logger.warning(f"Cola '{queue.name}' ya existe")
         raise HTTPException(status_code=400, detail="Cola ya existe")
     try:
@@ -97,10 +96,9 @@ def delete_queue_endpoint(queue_name: str, token: str, redirected: bool = False)
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo solicitud de eliminación de cola '{queue_name}' al nodo primario: {primary_node}")
-                response = requests.delete(
-                    f"http://{primary_node}/messages/queues/{queue_name}",
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                response = forward(
+                    "DELETE", primary_node, f"/messages/queues/{queue_name}",
+                    params={"token": token, "redirected": True}
                 )
                 return response.json()
             except Exception as e:
@@ -111,11 +109,11 @@ def delete_queue_endpoint(queue_name: str, token: str, redirected: bool = False)
             logger.info(f"Nodo actual es responsable para la cola '{queue_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o no hay particionamiento
-    queues = get_queues()
-    if queue_name not in queues:
+    existing = get_queue(queue_name)
+    if existing is None:
         logger.warning(f"Cola '{queue_name}' no encontrada")
         raise HTTPException(status_code=404, detail="Cola no encontrada")
-    if queues[queue_name]["owner"] != user:
+    if existing["owner"] != user:
         logger.warning(f"Usuario '{user}' no autorizado para eliminar cola '{queue_name}'")
         raise HTTPException(status_code=403, detail="No autorizado para eliminar esta cola")
     try:
@@ -151,8 +149,8 @@ def list_queues_endpoint(redirected: bool = False):
         for node in CLUSTER_NODES:
             try:
                 logger.info(f"Consultando colas en nodo: {node}")
-                response = requests.get(
-                    f"http://{node}/messages/queues", 
+                response = forward(
+                    "GET", node, "/messages/queues",
                     params={"redirected": True},
                     timeout=3
                 )
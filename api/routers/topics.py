@@ -2,12 +2,14 @@
 
 from fastapi import APIRouter, HTTPException, Request, Query
 from pydantic import BaseModel
+from typing import Optional
 import logging
 
 # Importar las funciones originales
 from api.routers.auth import verify_token  
 from mom_server.services.state import (
     get_topics,
+    get_topic,
     create_topic,
     delete_topic
 )
@@ -19,9 +21,9 @@ from mom_server.services.messaging import (
 )
 
 # Importaciones para particionamiento
-from mom_server.services.partitioning import get_partition_for_topic, is_node_responsible, get_responsible_nodes
-import requests
-from mom_server.config import PARTITIONING_ENABLED, CLUSTER_NODES
+from mom_server.services.partitioning import get_partition_for_topic, is_node_responsible, get_responsible_nodes, get_topic_nodes
+from mom_server.services.forwarding import forward
+from mom_server.config import PARTITIONING_ENABLED, CLUSTER_NODES, PRODUCER_ACKS_LEVELS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,10 +32,16 @@ router = APIRouter()
 class TopicQueue(BaseModel):
     name: str
     owner: str
+    acks: Optional[str] = None  # Nivel de confirmación por defecto del tópico: "0", "1" o "all"
+    partitions: int = 1  # Cada partición tiene su propio primario en el anillo
 
 @router.post("/")
 def create_topic_endpoint(topic: TopicQueue, token: str, request: Request, redirected: bool = False):
     user = verify_token(token)
+    if topic.acks is not None and topic.acks not in PRODUCER_ACKS_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Nivel de acks inválido: {topic.acks}")
+    if topic.partitions < 1:
+        raise HTTPException(status_code=400, detail=f"Número de particiones inválido: {topic.partitions}")
     
     # CÓDIGO CORREGIDO: Verificar particionamiento con parámetro de redirección
     if PARTITIONING_ENABLED and not redirected:
@@ -45,11 +53,10 @@ def create_topic_endpoint(topic: TopicQueue, token: str, request: Request, redir
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo solicitud de creación de tópico '{topic.name}' al nodo primario: {primary_node}")
-                response = requests.post(
-                    f"http://{primary_node}/messages/topics",
-                    json={"name": topic.name, "owner": user},
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                response = forward(
+                    "POST", primary_node, "/messages/topics",
+                    json={"name": topic.name, "owner": user, "acks": topic.acks, "partitions": topic.partitions},
+                    params={"token": token, "redirected": True}
                 )
                 return response.json()
             except Exception as e:
@@ -60,28 +67,27 @@ def create_topic_endpoint(topic: TopicQueue, token: str, request: Request, redir
             logger.info(f"Nodo actual es responsable para el tópico '{topic.name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o la solicitud ya fue redirigida
-    topics = get_topics()
-    if topic.name in topics:
+    if get_topic(topic.name) is not None:
         logger.warning(f"Tópico '{topic.name}' ya existe")
         raise HTTPException(status_code=400, detail="Tópico ya existe")
     try:
         logger.info(f"Creando tópico '{topic.name}' localmente")
-        create_topic(topic.name, user)
+        create_topic(topic.name, user, topic.acks, topic.partitions)
     except Exception as e:
         logger.error(f"Error al crear el tópico '{topic.name}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al crear el tópico: {str(e)}")
     
-    # MODIFICACIÓN: Si hay particionamiento, replicar solo a nodos responsables
+    # MODIFICACIÓN: Si hay particionamiento, replicar solo a nodos responsables de alguna partición
     if PARTITIONING_ENABLED:
-        responsible_nodes = get_responsible_nodes(topic.name)
-        replicate_topic_to_specific_nodes(topic.name, user, responsible_nodes)
+        responsible_nodes = get_topic_nodes(topic.name, topic.partitions)
+        replicate_topic_to_specific_nodes(topic.name, user, responsible_nodes, topic.acks, topic.partitions)
         logger.info(f"Replicando tópico '{topic.name}' a nodos responsables: {responsible_nodes}")
     else:
         # Comportamiento original: replicar a todos los nodos
         logger.info(f"Replicando tópico '{topic.name}' a todo el clúster")
-        replicate_topic_to_cluster(topic.name, user)
+        replicate_topic_to_cluster(topic.name, user, topic.acks, topic.partitions)
     
-    return {"message": f"Tópico {topic.name} creado"}
+    return {"message": f"Tópico {topic.name} creado", "partitions": topic.partitions}
 
 @router.delete("/{topic_name}")
 def delete_topic_endpoint(topic_name: str, token: str, redirected: bool = False):
@@ -97,10 +103,9 @@ def delete_topic_endpoint(topic_name: str, token: str, redirected: bool = False)
             try:
                 # Reenviar la solicitud al nodo primario con flag de redirección
                 logger.info(f"Redirigiendo solicitud de eliminación de tópico '{topic_name}' al nodo primario: {primary_node}")
-                response = requests.delete(
-                    f"http://{primary_node}/messages/topics/{topic_name}",
-                    params={"token": token, "redirected": True},
-                    timeout=5
+                response = forward(
+                    "DELETE", primary_node, f"/messages/topics/{topic_name}",
+                    params={"token": token, "redirected": True}
                 )
                 return response.json()
             except Exception as e:
@@ -111,11 +116,11 @@ def delete_topic_endpoint(topic_name: str, token: str, redirected: bool = False)
             logger.info(f"Nodo actual es responsable para el tópico '{topic_name}' (primario: {partition_info['is_primary']}, secundario: {partition_info['is_secondary']})")
     
     # CÓDIGO ORIGINAL: Este nodo es responsable o la solicitud ya fue redirigida
-    topics = get_topics()
-    if topic_name not in topics:
+    existing = get_topic(topic_name)
+    if existing is None:
         logger.warning(f"Tópico '{topic_name}' no encontrado")
         raise HTTPException(status_code=404, detail="Tópico no encontrado")
-    if topics[topic_name]["owner"] != user:
+    if existing["owner"] != user:
         logger.warning(f"Usuario '{user}' no autorizado para eliminar tópico '{topic_name}'")
         raise HTTPException(status_code=403, detail="No autorizado para eliminar este tópico")
     try:
@@ -125,9 +130,9 @@ def delete_topic_endpoint(topic_name: str, token: str, redirected: bool = False)
         logger.error(f"Error al eliminar el tópico '{topic_name}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al eliminar el tópico: {str(e)}")
     
-    # MODIFICACIÓN: Si hay particionamiento, replicar solo a nodos responsables
+    # MODIFICACIÓN: Si hay particionamiento, replicar solo a nodos responsables de alguna partición
     if PARTITIONING_ENABLED:
-        responsible_nodes = get_responsible_nodes(topic_name)
+        responsible_nodes = get_topic_nodes(topic_name, existing["partitions"])
         replicate_topic_deletion_to_specific_nodes(topic_name, user, responsible_nodes)
         logger.info(f"Replicando eliminación de tópico '{topic_name}' a nodos responsables: {responsible_nodes}")
     else:
@@ -150,9 +155,11 @@ def list_topics_endpoint(redirected: bool = False):
         for node in CLUSTER_NODES:
             try:
                 logger.info(f"Consultando tópicos en nodo: {node}")
-                response = requests.get(f"http://{node}/messages/topics", 
-                                        params={"redirected": True},
-                                        timeout=3)
+                response = forward(
+                    "GET", node, "/messages/topics",
+                    params={"redirected": True},
+                    timeout=3
+                )
                 if response.status_code == 200:
                     remote_topics = response.json().get("topics", [])
                     logger.info(f"Tópicos en nodo {node}: {remote_topics}")
@@ -70,6 +70,8 @@ def launch_grpc_servers(num_nodes=3, grpc_base_port=50051, api_base_port=8000):
         env["GRPC_NODES"] = ",".join(grpc_nodes)
         env["NODE_INDEX"] = str(i)
         env["ENV_FILE"] = f".env.node{i+1}"
+        # Cada nodo con su propia base de datos: outbox, offsets, hojas de hashes y mapas son por nodo
+        env["MOM_DB_PATH"] = f"mom_server/mom_state_node{i}.db"
         env["SELF_HOST"] = f"localhost:{api_base_port + i}"
         print(f"[GRPC Node {i}] Iniciando en puerto {grpc_port} con ENV_FILE: {env['ENV_FILE']} y SELF_HOST: {env['SELF_HOST']}")
         process = subprocess.Popen(cmd, env=env)
@@ -100,12 +102,43 @@ def launch_api_servers(num_nodes=3, api_base_port=8000, grpc_base_port=50051):
         env["NODE_INDEX"] = str(i)
         env["CLUSTER_NODES"] = ",".join(api_nodes)
         env["ENV_FILE"] = f".env.node{i+1}"
+        # Cada nodo con su propia base de datos: outbox, offsets, hojas de hashes y mapas son por nodo
+        env["MOM_DB_PATH"] = f"mom_server/mom_state_node{i}.db"
         cmd = [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "0.0.0.0", "--port", str(api_port)]
         print(f"[API Node {i}] Iniciando en puerto {api_port} con ENV_FILE: {env['ENV_FILE']} y conectado a GRPC {grpc_port}")
         process = subprocess.Popen(cmd, env=env)
         processes.append(process)
         time.sleep(1)
 
+def launch_nodes(num_nodes=3, api_base_port=8000, grpc_base_port=50051):
+    """Lanza un proceso por nodo con la API y el servicio gRPC juntos (mom_server.node)."""
+    try:
+        with open('cluster_config.json', 'r') as f:
+            cluster_config = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cluster_config = generate_cluster_config(num_nodes, api_base_port, grpc_base_port)
+
+    print("\n=== Lanzando nodos (API + GRPC en un solo proceso) ===")
+    for i in range(num_nodes):
+        node_config = cluster_config.get(f"node{i}", {})
+        api_port = node_config.get('api_port', api_base_port + i)
+        grpc_port = node_config.get('grpc_port', grpc_base_port + i)
+        env = os.environ.copy()
+        env["PORT"] = str(api_port)
+        env["SELF_HOST"] = f"localhost:{api_port}"
+        env["GRPC_PORT"] = str(grpc_port)
+        env["GRPC_NODES"] = ",".join(node_config.get('grpc_nodes', []))
+        env["CLUSTER_NODES"] = ",".join(node_config.get('api_nodes', []))
+        env["NODE_INDEX"] = str(i)
+        env["ENV_FILE"] = f".env.node{i+1}"
+        # Cada nodo con su propia base de datos: outbox, offsets, hojas de hashes y mapas son por nodo
+        env["MOM_DB_PATH"] = f"mom_server/mom_state_node{i}.db"
+        cmd = [sys.executable, "-m", "mom_server.node"]
+        print(f"[Node {i}] Iniciando API en puerto {api_port} y GRPC en puerto {grpc_port} con ENV_FILE: {env['ENV_FILE']}")
+        process = subprocess.Popen(cmd, env=env)
+        processes.append(process)
+        time.sleep(1)
+
 def main():
     parser = argparse.ArgumentParser(description='Lanzar clúster MOM')
     parser.add_argument('--nodes', type=int, default=3, help='Número de nodos en el clúster')
@@ -113,6 +146,8 @@ def main():
     parser.add_argument('--api-base-port', type=int, default=8000, help='Puerto base para API')
     parser.add_argument('--install-deps', action='store_true', help='Instalar dependencias necesarias')
     parser.add_argument('--config', action='store_true', help='Solo generar configuración')
+    parser.add_argument('--separate-processes', action='store_true',
+                        help='Lanzar la API y el servidor GRPC de cada nodo en procesos separados')
     
     args = parser.parse_args()
     
@@ -129,8 +164,11 @@ def main():
     
     try:
         generate_cluster_config(args.nodes, args.api_base_port, args.grpc_base_port)
-        launch_grpc_servers(args.nodes, args.grpc_base_port, args.api_base_port)
-        launch_api_servers(args.nodes, args.api_base_port, args.grpc_base_port)
+        if args.separate_processes:
+            launch_grpc_servers(args.nodes, args.grpc_base_port, args.api_base_port)
+            launch_api_servers(args.nodes, args.api_base_port, args.grpc_base_port)
+        else:
+            launch_nodes(args.nodes, args.api_base_port, args.grpc_base_port)
         print("\nClúster MOM iniciado con éxito!")
         print(f"- {args.nodes} nodos GRPC (puertos {args.grpc_base_port}-{args.grpc_base_port + args.nodes - 1})")
         print(f"- {args.nodes} nodos API (puertos {args.api_base_port}-{args.api_base_port + args.nodes - 1})")
@@ -0,0 +1,5 @@
+# mom_client/__init__.py
+
+"""Cliente Python del MOM con enrutado directo al nodo responsable de cada tópico y cola."""
+
+from mom_client.client import MomClient, MomClientError, partition_for_key
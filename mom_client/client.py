@@ -0,0 +1,308 @@
+# mom_client/client.py
+
+"""
+Cliente Python del MOM que envía cada solicitud directamente al nodo responsable.
+
+Un cliente que siempre habla con el mismo nodo paga un salto extra en la mayoría de
+las solicitudes: ese nodo las reenvía al primario de la partición o de la cola. Este
+cliente pregunta a cualquier nodo quién es responsable de cada tópico o cola
+(/cluster/partition-map/...), guarda la respuesta y envía escrituras, lecturas y
+consumos al primario, con una sesión HTTP que reutiliza las conexiones a cada nodo.
+
+Las solicitudes enrutadas así llevan la cabecera X-Partition-Map-Version con la
+versión del mapa que se usó. Un nodo que ya no es responsable (el mapa cambió por un
+rebalanceo) no las reenvía: responde 421, y el cliente vuelve a preguntar por ese
+tópico o cola y reintenta. Si no se puede conectar con el responsable, la solicitud
+se envía sin la cabecera a otro nodo, que la reenvía como para cualquier otro
+cliente. Un nodo que acepta la conexión pero no responde a tiempo pudo haber
+procesado ya la solicitud: el error se propaga en lugar de repetirla en otro nodo.
+
+Uso:
+
+    client = MomClient(["localhost:8000", "localhost:8001", "localhost:8002"])
+    client.login("ana", "secreto")
+    client.publish("pedidos", "hola", key="cliente-42")
+    mensajes = client.read("pedidos")
+"""
+
+import hashlib
+import itertools
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+MAP_VERSION_HEADER = "X-Partition-Map-Version"
+# Reintentos tras un 421 antes de dejar que un nodo cualquiera reenvíe la solicitud
+MAX_MISDIRECT_RETRIES = 2
+# Segundos durante los que un nodo que no contestó se salta sin volver a intentarlo
+NODE_RETRY_INTERVAL = 5
+
+
+class MomClientError(Exception):
+    """El clúster rechazó la solicitud; `status_code` y `detail` son los de la respuesta."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _connect_failed(error):
+    """True si la solicitud no llegó al nodo (conexión rechazada o agotada al conectar) y puede enviarse a otro."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def partition_for_key(key, partitions):
+    """Partición de un mensaje con clave: el mismo cálculo que hace el servidor (partitioning.partition_for_key)."""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big") % max(partitions, 1)
+
+
+class MomClient:
+    """Cliente del clúster con enrutado directo al responsable de cada tópico y cola."""
+
+    def __init__(self, nodes, token=None, timeout=10, pool_size=10):
+        """
+        Args:
+            nodes (list): Direcciones API ("host:puerto") de algunos nodos del clúster
+            token (str, optional): JWT ya obtenido; si no, usar login()
+            timeout (float): Plazo de cada solicitud HTTP
+            pool_size (int): Conexiones reutilizables por nodo
+        """
+        if not nodes:
+            raise ValueError("Se necesita al menos un nodo del clúster")
+        self.nodes = list(nodes)
+        self.token = token
+        self.username = None
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        # Nombre -> respuesta de /cluster/partition-map/{topic,queue}/{nombre}
+        self._routes = {"topic": {}, "queue": {}}
+        self._round_robin = {}
+        self._next_node = itertools.count()
+        # Nodo -> instante hasta el que se considera caído
+        self._down_until = {}
+        self.stats = {"direct": 0, "misdirected": 0, "forwarded": 0}
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- HTTP ---
+    def _request(self, method, node, path, **kwargs):
+        try:
+            return self._session.request(method, f"http://{node}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self._down_until[node] = time.monotonic() + NODE_RETRY_INTERVAL
+            raise
+
+    def _is_down(self, node):
+        return self._down_until.get(node, 0) > time.monotonic()
+
+    def _any_node(self, method, path, rotate=True, **kwargs):
+        """
+        Envía la solicitud al primer nodo conocido que acepte la conexión, empezando por uno
+        distinto cada vez (o siempre por el primero con rotate=False).
+
+        Solo se pasa al siguiente nodo si no se pudo conectar; cualquier otro error (p. ej.
+        un plazo de lectura agotado) se propaga, porque el nodo pudo procesar la solicitud.
+        """
+        start = next(self._next_node) if rotate else 0
+        candidates = [self.nodes[(start + i) % len(self.nodes)] for i in range(len(self.nodes))]
+        # Los nodos que acaban de fallar se intentan los últimos
+        candidates.sort(key=self._is_down)
+        error = None
+        for node in candidates:
+            try:
+                return self._request(method, node, path, **kwargs)
+            except requests.RequestException as e:
+                if not _connect_failed(e):
+                    raise
+                logger.warning(f"Nodo {node} no disponible: {str(e)}")
+                error = e
+        raise error
+
+    @staticmethod
+    def _check(response):
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise MomClientError(response.status_code, detail)
+        return response.json()
+
+    # --- Enrutado ---
+    def _route(self, kind, name, refresh=False):
+        """Responsables de un tópico o cola, de la caché o preguntando a un nodo."""
+        route = None if refresh else self._routes[kind].get(name)
+        if route is None:
+            route = self._check(self._any_node("GET", f"/cluster/partition-map/{kind}/{name}"))
+            self._routes[kind][name] = route
+        return route
+
+    def _owner(self, kind, name, partition_id, refresh=False):
+        route = self._route(kind, name, refresh)
+        owners = route["owners"][partition_id] if kind == "topic" else route["owners"]
+        return route["version"], owners[0]
+
+    def _send_to_owner(self, method, kind, name, partition_id, path, **kwargs):
+        """
+        Envía la solicitud al primario; tras un 421 actualiza la ruta y reintenta, y si no se
+        puede conectar con el primario (o sigue sin acertar) la envía a cualquier nodo para que
+        la reenvíe. Los demás errores se propagan (ver _any_node).
+        """
+        for attempt in range(MAX_MISDIRECT_RETRIES + 1):
+            version, node = self._owner(kind, name, partition_id, refresh=attempt > 0)
+            if self._is_down(node):
+                break
+            try:
+                response = self._request(method, node, path, headers={MAP_VERSION_HEADER: str(version)}, **kwargs)
+            except requests.RequestException as e:
+                self._routes[kind].pop(name, None)
+                if not _connect_failed(e):
+                    raise
+                logger.warning(f"Responsable {node} de '{name}' no disponible: {str(e)}")
+                break
+            if response.status_code != 421:
+                self.stats["direct"] += 1
+                return self._check(response)
+            self.stats["misdirected"] += 1
+            logger.info(f"{node} ya no es responsable de '{name}' (mapa v{version}); actualizando ruta")
+        self.stats["forwarded"] += 1
+        return self._check(self._any_node(method, path, **kwargs))
+
+    def refresh(self):
+        """Olvida todas las rutas; se vuelven a pedir en la siguiente solicitud de cada tópico o cola."""
+        for routes in self._routes.values():
+            routes.clear()
+
+    def partition_map(self):
+        """Mapa de particiones activo en un nodo cualquiera (versión, nodos y parámetros de reparto)."""
+        return self._check(self._any_node("GET", "/cluster/partition-map"))
+
+    # --- Autenticación ---
+    # Los usuarios se guardan en el nodo donde se registran: registro y login van al mismo nodo.
+    # El token, en cambio, lo acepta cualquier nodo
+    def register(self, username, password):
+        return self._check(self._any_node("POST", "/auth/register", rotate=False,
+                                          json={"username": username, "password": password}))
+
+    def login(self, username, password):
+        """Obtiene un JWT y lo usa en las solicitudes siguientes."""
+        response = self._check(self._any_node("POST", "/auth/login", rotate=False,
+                                              json={"username": username, "password": password}))
+        self.token = response["token"]
+        self.username = username
+        return self.token
+
+    # --- Tópicos ---
+    def create_topic(self, name, partitions=1, acks=None):
+        body = {"name": name, "owner": self.username or "", "acks": acks, "partitions": partitions}
+        response = self._check(self._any_node("POST", "/messages/topics/", json=body, params={"token": self.token}))
+        self._routes["topic"].pop(name, None)
+        return response
+
+    def delete_topic(self, name):
+        response = self._check(self._any_node("DELETE", f"/messages/topics/{name}", params={"token": self.token}))
+        self._routes["topic"].pop(name, None)
+        return response
+
+    def _choose_partition(self, topic, partitions, key):
+        # Como el servidor: por hash de la clave o, sin clave, en round-robin
+        if partitions <= 1:
+            return 0
+        if key is not None:
+            return partition_for_key(key, partitions)
+        return next(self._round_robin.setdefault(topic, itertools.count())) % partitions
+
+    def publish(self, topic, content, key=None, headers=None, partition=None, acks=None):
+        """
+        Publica un mensaje en el líder de su partición.
+
+        Args:
+            topic (str): Nombre del tópico
+            content (str): Contenido del mensaje
+            key (str, optional): Los mensajes con la misma clave van a la misma partición
+            headers (dict, optional): Cabeceras del mensaje
+            partition (int, optional): Partición explícita; si no, por clave o round-robin
+            acks (str, optional): "0", "1" o "all"; por defecto el del tópico
+
+        Returns:
+            dict: Respuesta del líder (message_id, partition, offset...)
+        """
+        route = self._route("topic", topic)
+        if partition is None:
+            partition = self._choose_partition(topic, route["partitions"], key)
+        params = {"token": self.token, "partition": partition}
+        if acks is not None:
+            params["acks"] = acks
+        body = {"sender": self.username or "", "content": content, "headers": headers or {}, "key": key}
+        return self._send_to_owner("POST", "topic", topic, partition, f"/messages/messages/topic/{topic}",
+                                   params=params, json=body)
+
+    def read(self, topic, partition=None, consistency=None):
+        """
+        Mensajes de un tópico, leyendo cada partición en su primario.
+
+        Args:
+            topic (str): Nombre del tópico
+            partition (int, optional): Solo esta partición
+            consistency (str, optional): "one", "quorum" o "all"; el primario coordina la lectura
+
+        Returns:
+            list: Mensajes en orden de partición y offset
+        """
+        route = self._route("topic", topic)
+        partitions = [partition] if partition is not None else range(route["partitions"])
+        messages = []
+        for partition_id in partitions:
+            params = {"partition": partition_id}
+            if consistency is not None:
+                params["consistency"] = consistency
+            response = self._send_to_owner("GET", "topic", topic, partition_id, f"/messages/messages/topic/{topic}",
+                                           params=params)
+            messages.extend(response["messages"])
+        return messages
+
+    # --- Colas ---
+    def create_queue(self, name):
+        body = {"name": name, "owner": self.username or ""}
+        response = self._check(self._any_node("POST", "/messages/queues/", json=body, params={"token": self.token}))
+        self._routes["queue"].pop(name, None)
+        return response
+
+    def delete_queue(self, name):
+        response = self._check(self._any_node("DELETE", f"/messages/queues/{name}", params={"token": self.token}))
+        self._routes["queue"].pop(name, None)
+        return response
+
+    def send(self, queue, content):
+        """Encola un mensaje en el líder de la cola."""
+        return self._send_to_owner("POST", "queue", queue, 0, f"/messages/messages/queue/{queue}",
+                                   params={"token": self.token},
+                                   json={"sender": self.username or "", "content": content})
+
+    def consume(self, queue):
+        """
+        Consume el siguiente mensaje de la cola en su líder.
+
+        Returns:
+            dict: Mensaje consumido, o None si la cola está vacía
+        """
+        response = self._send_to_owner("GET", "queue", queue, 0, f"/messages/messages/queue/{queue}",
+                                       params={"token": self.token})
+        return response["message"]
@@ -61,8 +61,135 @@ logger.info(f"SELF_HOST: {SELF_HOST}")
 # NUEVAS CONFIGURACIONES PARA PARTICIONAMIENTO
 PARTITIONING_ENABLED = os.getenv("PARTITIONING_ENABLED", "true").lower() == "true"
 PARTITION_REPLICATION_FACTOR = int(os.getenv("PARTITION_REPLICATION_FACTOR", "2"))
+# Nodos virtuales por miembro en el anillo de hash consistente
+PARTITION_VIRTUAL_NODES = int(os.getenv("PARTITION_VIRTUAL_NODES", "64"))
+# Entradas memoizadas (nombre -> nodos responsables) por versión del mapa de particiones
+PARTITION_CACHE_SIZE = int(os.getenv("PARTITION_CACHE_SIZE", "4096"))
+# Estrategia de reparto: "ring" (anillo con nodos virtuales) o "rendezvous" (hashing
+# rendezvous ponderado). Los pesos salen de "weight" en cluster_config.json y de
+# PARTITION_NODE_WEIGHTS ("host:puerto=peso,..."), que tiene prioridad; por defecto 1
+PARTITION_STRATEGY = os.getenv("PARTITION_STRATEGY", "ring").lower()
+PARTITION_NODE_WEIGHTS = {
+    f"localhost:{node_data['api_port']}": float(node_data["weight"])
+    for node_data in CLUSTER_CONFIG.values()
+    if node_data.get("api_port") and node_data.get("weight")
+}
+for entry in os.getenv("PARTITION_NODE_WEIGHTS", "").split(","):
+    if "=" in entry:
+        node, weight = entry.rsplit("=", 1)
+        PARTITION_NODE_WEIGHTS[node.strip()] = float(weight)
+for node, weight in list(PARTITION_NODE_WEIGHTS.items()):
+    if weight < 0:
+        logger.warning(f"Peso negativo ignorado para {node}: {weight}")
+        del PARTITION_NODE_WEIGHTS[node]
+# Los nodos sin peso valen 1: solo si todos los conocidos tienen peso 0 nadie podría recibir particiones
+if all(PARTITION_NODE_WEIGHTS.get(node, 1.0) == 0 for node in set(CLUSTER_NODES) | {SELF_HOST}):
+    logger.error(f"Pesos ignorados: todos los nodos tienen peso 0 ({PARTITION_NODE_WEIGHTS})")
+    PARTITION_NODE_WEIGHTS = {}
 logger.info(f"Particionamiento habilitado: {PARTITIONING_ENABLED}")
 logger.info(f"Factor de replicación: {PARTITION_REPLICATION_FACTOR}")
+logger.info(f"Estrategia de reparto: {PARTITION_STRATEGY} (pesos: {PARTITION_NODE_WEIGHTS or 'iguales'})")
+
+# Pool de canales gRPC entre nodos (keepalive y reconexión perezosa)
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "10000"))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "5000"))
+GRPC_RECONNECT_BACKOFF_MAX_MS = int(os.getenv("GRPC_RECONNECT_BACKOFF_MAX_MS", "5000"))
+GRPC_CHANNEL_MAX_FAILURES = int(os.getenv("GRPC_CHANNEL_MAX_FAILURES", "3"))
+# Segundos que un canal sustituido sigue abierto para que terminen las llamadas en curso
+GRPC_CHANNEL_DRAIN_SECONDS = float(os.getenv("GRPC_CHANNEL_DRAIN_SECONDS", "30"))
+GRPC_RPC_TIMEOUT = float(os.getenv("GRPC_RPC_TIMEOUT", "5"))
+
+# Servidor gRPC asyncio: RPCs simultáneas admitidas (0 = sin límite), streams HTTP/2 por
+# conexión e hilos dedicados a la base de datos
+GRPC_MAX_CONCURRENT_RPCS = int(os.getenv("GRPC_MAX_CONCURRENT_RPCS", "1000"))
+GRPC_MAX_CONCURRENT_STREAMS = int(os.getenv("GRPC_MAX_CONCURRENT_STREAMS", "1000"))
+GRPC_STORAGE_WORKERS = int(os.getenv("GRPC_STORAGE_WORKERS", "8"))
+
+# Replicación en paralelo: plazo por réplica y confirmaciones necesarias ("all" o un número)
+REPLICATION_FANOUT_WORKERS = int(os.getenv("REPLICATION_FANOUT_WORKERS", "16"))
+REPLICATION_PEER_DEADLINE = float(os.getenv("REPLICATION_PEER_DEADLINE", "5"))
+REPLICATION_REQUIRED_ACKS = os.getenv("REPLICATION_REQUIRED_ACKS", "all")
+
+# Nivel de confirmación por defecto para productores: "0", "1" o "all"
+PRODUCER_ACKS_LEVELS = ("0", "1", "all")
+PRODUCER_ACKS = os.getenv("PRODUCER_ACKS", "all")
+
+# Lecturas de tópicos: réplicas que deben responder ("one", "quorum" o "all") y reparación en lectura
+READ_CONSISTENCY_LEVELS = ("one", "quorum", "all")
+READ_CONSISTENCY = os.getenv("READ_CONSISTENCY", "one")
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", "3"))
+READ_REPAIR_ENABLED = os.getenv("READ_REPAIR_ENABLED", "true").lower() == "true"
+
+# Outbox de replicación: sondeo y back-off exponencial de los emisores por nodo
+REPLICATION_OUTBOX_POLL_INTERVAL = float(os.getenv("REPLICATION_OUTBOX_POLL_INTERVAL", "1"))
+REPLICATION_OUTBOX_BACKOFF_BASE = float(os.getenv("REPLICATION_OUTBOX_BACKOFF_BASE", "0.5"))
+REPLICATION_OUTBOX_BACKOFF_MAX = float(os.getenv("REPLICATION_OUTBOX_BACKOFF_MAX", "30"))
+REPLICATION_OUTBOX_BATCH = int(os.getenv("REPLICATION_OUTBOX_BATCH", "100"))
+
+# Lotes de replicación: cada emisor espera hasta LINGER_MS para acumular mensajes
+# y envía como máximo MAX_MESSAGES mensajes o MAX_BYTES de contenido por RPC
+REPLICATION_BATCH_LINGER_MS = float(os.getenv("REPLICATION_BATCH_LINGER_MS", "5"))
+REPLICATION_BATCH_MAX_MESSAGES = int(os.getenv("REPLICATION_BATCH_MAX_MESSAGES", "100"))
+REPLICATION_BATCH_MAX_BYTES = int(os.getenv("REPLICATION_BATCH_MAX_BYTES", str(1024 * 1024)))
+
+# Stream bidireccional de replicación: tramas en vuelo sin confirmar por nodo
+REPLICATION_STREAM_ENABLED = os.getenv("REPLICATION_STREAM_ENABLED", "true").lower() == "true"
+REPLICATION_STREAM_WINDOW = int(os.getenv("REPLICATION_STREAM_WINDOW", "8"))
+
+# Recuperación al arrancar: el nodo pide a las réplicas los mensajes posteriores a su último offset
+CATCHUP_ENABLED = os.getenv("CATCHUP_ENABLED", "true").lower() == "true"
+CATCHUP_MAX_BYTES = int(os.getenv("CATCHUP_MAX_BYTES", str(1024 * 1024)))
+
+# Anti-entropía: cada hoja del árbol de hashes cubre MERKLE_BUCKET_SIZE offsets
+MERKLE_BUCKET_SIZE = int(os.getenv("MERKLE_BUCKET_SIZE", "64"))
+MERKLE_FANOUT = int(os.getenv("MERKLE_FANOUT", "16"))
+ANTI_ENTROPY_ENABLED = os.getenv("ANTI_ENTROPY_ENABLED", "true").lower() == "true"
+ANTI_ENTROPY_INTERVAL = float(os.getenv("ANTI_ENTROPY_INTERVAL", "60"))
+
+# Rebalanceo: cada REBALANCE_INTERVAL se compara el mapa activo con el de la pertenencia actual;
+# un nodo caído más de REBALANCE_DOWN_GRACE segundos sale del mapa (0 = nunca). Las transferencias
+# de datos se limitan a REBALANCE_MAX_BYTES_PER_SEC por nodo, en tramos de REBALANCE_CHUNK_BYTES
+REBALANCE_ENABLED = os.getenv("REBALANCE_ENABLED", "true").lower() == "true"
+REBALANCE_INTERVAL = float(os.getenv("REBALANCE_INTERVAL", "5"))
+REBALANCE_DOWN_GRACE = float(os.getenv("REBALANCE_DOWN_GRACE", "300"))
+REBALANCE_MAX_BYTES_PER_SEC = int(os.getenv("REBALANCE_MAX_BYTES_PER_SEC", str(4 * 1024 * 1024)))
+REBALANCE_CHUNK_BYTES = int(os.getenv("REBALANCE_CHUNK_BYTES", str(256 * 1024)))
+
+# Servicio de metadatos: el nodo METADATA_NODE (dirección API) mantiene el mapa de particiones
+# versionado y lo envía a todos los nodos por WatchPartitionMap. Vacío = cada nodo deriva el mapa
+# de su propia pertenencia. Un nodo sin conexión con el servicio reintenta cada METADATA_RETRY_INTERVAL
+METADATA_NODE = os.getenv("METADATA_NODE", "").strip()
+METADATA_ENABLED = PARTITIONING_ENABLED and bool(METADATA_NODE)
+METADATA_RETRY_INTERVAL = float(os.getenv("METADATA_RETRY_INTERVAL", "2"))
+
+# Pertenencia por gossip y detector de fallos phi-accrual (tiempos en segundos)
+MEMBERSHIP_ENABLED = os.getenv("MEMBERSHIP_ENABLED", "true").lower() == "true"
+GOSSIP_INTERVAL = float(os.getenv("GOSSIP_INTERVAL", "0.5"))
+GOSSIP_FANOUT = int(os.getenv("GOSSIP_FANOUT", "2"))
+PHI_THRESHOLD = float(os.getenv("PHI_THRESHOLD", "8"))
+PHI_MIN_STD_DEV = float(os.getenv("PHI_MIN_STD_DEV", "0.1"))
+PHI_ACCEPTABLE_PAUSE = float(os.getenv("PHI_ACCEPTABLE_PAUSE", "0.5"))
+PHI_WINDOW_SIZE = int(os.getenv("PHI_WINDOW_SIZE", "100"))
+
+# Circuit breakers por nodo (reenvío HTTP y replicación gRPC) y reenvío entre APIs
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_THRESHOLD = float(os.getenv("CIRCUIT_SLOW_CALL_THRESHOLD", "2"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "5"))
+FORWARD_TIMEOUT = float(os.getenv("FORWARD_TIMEOUT", "5"))
+FORWARD_POOL_SIZE = int(os.getenv("FORWARD_POOL_SIZE", "10"))
+
+# Registro de auditoría: escritura en segundo plano con rotación por tamaño.
+# Sin AUDIT_LOG_PATH se usa "<base de datos>-audit.log"
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH", "")
+AUDIT_MAX_BYTES = int(os.getenv("AUDIT_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_BACKUP_COUNT = int(os.getenv("AUDIT_BACKUP_COUNT", "5"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
 
 def api_to_grpc_address(api_address):
     if not api_address:
@@ -91,5 +218,36 @@ def get_config():
         "redis_url": REDIS_URL,
         # Nuevos campos de configuración
         "partitioning_enabled": PARTITIONING_ENABLED,
-        "partition_replication_factor": PARTITION_REPLICATION_FACTOR
+        "partition_replication_factor": PARTITION_REPLICATION_FACTOR,
+        "partition_virtual_nodes": PARTITION_VIRTUAL_NODES,
+        "partition_strategy": PARTITION_STRATEGY,
+        "partition_node_weights": PARTITION_NODE_WEIGHTS,
+        "grpc_keepalive_time_ms": GRPC_KEEPALIVE_TIME_MS,
+        "grpc_rpc_timeout": GRPC_RPC_TIMEOUT,
+        "replication_peer_deadline": REPLICATION_PEER_DEADLINE,
+        "replication_required_acks": REPLICATION_REQUIRED_ACKS,
+        "producer_acks": PRODUCER_ACKS,
+        "read_consistency": READ_CONSISTENCY,
+        "read_repair_enabled": READ_REPAIR_ENABLED,
+        "replication_batch_linger_ms": REPLICATION_BATCH_LINGER_MS,
+        "replication_batch_max_messages": REPLICATION_BATCH_MAX_MESSAGES,
+        "replication_stream_enabled": REPLICATION_STREAM_ENABLED,
+        "replication_stream_window": REPLICATION_STREAM_WINDOW,
+        "catchup_enabled": CATCHUP_ENABLED,
+        "merkle_bucket_size": MERKLE_BUCKET_SIZE,
+        "anti_entropy_interval": ANTI_ENTROPY_INTERVAL,
+        "rebalance_enabled": REBALANCE_ENABLED,
+        "rebalance_down_grace": REBALANCE_DOWN_GRACE,
+        "rebalance_max_bytes_per_sec": REBALANCE_MAX_BYTES_PER_SEC,
+        "metadata_node": METADATA_NODE,
+        "membership_enabled": MEMBERSHIP_ENABLED,
+        "gossip_interval": GOSSIP_INTERVAL,
+        "phi_threshold": PHI_THRESHOLD,
+        "circuit_failure_threshold": CIRCUIT_FAILURE_THRESHOLD,
+        "circuit_reset_timeout": CIRCUIT_RESET_TIMEOUT,
+        "forward_timeout": FORWARD_TIMEOUT,
+        "audit_enabled": AUDIT_ENABLED,
+        "audit_log_path": AUDIT_LOG_PATH,
+        "grpc_max_concurrent_rpcs": GRPC_MAX_CONCURRENT_RPCS,
+        "grpc_storage_workers": GRPC_STORAGE_WORKERS
     }
\ No newline at end of file
@@ -2,13 +2,19 @@
 import sqlite3
 import os
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'mom_state.db')
+DB_PATH = os.getenv("MOM_DB_PATH", os.path.join(os.path.dirname(__file__), 'mom_state.db'))
 
 def get_connection():
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
+def _ensure_column(cursor, table, column, definition):
+    """Añade una columna a una tabla existente si aún no la tiene (migración de bases antiguas)."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row["name"] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 def init_db():
     conn = get_connection()
     cursor = conn.cursor()
@@ -28,9 +34,13 @@ def init_db():
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS topics (
         name TEXT PRIMARY KEY,
-        owner TEXT NOT NULL
+        owner TEXT NOT NULL,
+        acks TEXT,
+        partitions INTEGER NOT NULL DEFAULT 1
     )
     """)
+    _ensure_column(cursor, "topics", "acks", "TEXT")
+    _ensure_column(cursor, "topics", "partitions", "INTEGER NOT NULL DEFAULT 1")
     
     # Crear tabla para mensajes de tópicos
     cursor.execute("""
@@ -40,9 +50,37 @@ def init_db():
         sender TEXT NOT NULL,
         content TEXT NOT NULL,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        message_id TEXT,
+        partition_id INTEGER NOT NULL DEFAULT 0,
+        partition_offset INTEGER,
+        headers TEXT,
         FOREIGN KEY (topic_name) REFERENCES topics(name)
     )
     """)
+    _ensure_column(cursor, "topic_messages", "message_id", "TEXT")
+    _ensure_column(cursor, "topic_messages", "partition_id", "INTEGER NOT NULL DEFAULT 0")
+    _ensure_column(cursor, "topic_messages", "partition_offset", "INTEGER")
+    # Cabeceras del mensaje en JSON; el timestamp lo fija el líder y las réplicas lo conservan
+    _ensure_column(cursor, "topic_messages", "headers", "TEXT")
+    # Offset asignado por el líder dentro de cada partición del tópico: único, para que dos
+    # escrituras con el mismo offset fallen en vez de convivir (sustituye al índice no único)
+    cursor.execute("DROP INDEX IF EXISTS idx_topic_messages_offset")
+    try:
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_topic_messages_partition_offset
+        ON topic_messages (topic_name, partition_id, partition_offset)
+        """)
+    except sqlite3.IntegrityError:
+        conn.close()
+        raise RuntimeError(
+            f"La base de datos {DB_PATH} tiene mensajes con el mismo offset en una partición; "
+            "hay que resolver los duplicados antes de arrancar el nodo"
+        )
+    # Identificador global del mensaje: permite reenviar réplicas sin duplicarlas
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_topic_messages_message_id
+    ON topic_messages (message_id)
+    """)
     
     # Crear tabla para colas
     cursor.execute("""
@@ -60,9 +98,58 @@ def init_db():
         sender TEXT NOT NULL,
         content TEXT NOT NULL,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        message_id TEXT,
         FOREIGN KEY (queue_name) REFERENCES queues(name)
     )
     """)
+    _ensure_column(cursor, "queue_messages", "message_id", "TEXT")
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_queue_messages_message_id
+    ON queue_messages (message_id)
+    """)
+    
+    # Crear tabla de salida de replicación (outbox): trabajo pendiente por nodo destino
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS replication_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        peer TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        message_id TEXT,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_replication_outbox_peer
+    ON replication_outbox (peer, id)
+    """)
+    
+    # Hojas del árbol de hashes por partición: resumen de cada rango de offsets
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS partition_hashes (
+        topic_name TEXT NOT NULL,
+        partition_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        leaf_hash INTEGER NOT NULL DEFAULT 0,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (topic_name, partition_id, bucket)
+    )
+    """)
+    
+    # Versiones del mapa de particiones recibidas del servicio de metadatos (o publicadas por él)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS partition_maps (
+        version INTEGER PRIMARY KEY,
+        nodes TEXT NOT NULL,
+        weights TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        replication_factor INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
     
     conn.commit()
     conn.close()
@@ -0,0 +1,62 @@
+# mom_server/db/catalog_cache.py
+
+"""
+Caché en memoria del catálogo (nombre, propietario y acks de tópicos y colas).
+
+Las rutas de la API consultan el catálogo en cada petición para comprobar que el
+tópico o la cola existe. Con la caché activada esas consultas no tocan SQLite: el
+catálogo completo se carga una vez y los repositorios lo invalidan en cada
+escritura que lo modifica.
+
+Solo es correcta si todas las escrituras pasan por este proceso, así que está
+desactivada por defecto y la activa el nodo de proceso único (mom_server.node).
+Con la API y el servidor gRPC en procesos separados, las creaciones replicadas
+que aplica el proceso gRPC no llegarían a la caché de la API.
+"""
+
+import threading
+
+
+class CatalogCache:
+    """Catálogo de tópicos o colas cargado bajo demanda e invalidado al escribir."""
+
+    def __init__(self):
+        self.enabled = False
+        self._entries = {}
+        # Se incrementa en cada invalidación: una carga que empezó antes no se guarda
+        self._generation = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def get(self, kind, loader):
+        """
+        Devuelve el catálogo de `kind` ("topics" o "queues").
+
+        Args:
+            kind (str): Tipo de entidad
+            loader (callable): Función que lee el catálogo completo de la base de datos
+
+        Returns:
+            dict: Nombre -> metadatos. No debe modificarse
+        """
+        with self._lock:
+            entries = self._entries.get(kind)
+            generation = self._generation.get(kind, 0)
+        if entries is not None:
+            return entries
+        entries = loader()
+        with self._lock:
+            if self._generation.get(kind, 0) == generation:
+                self._entries[kind] = entries
+        return entries
+
+    def invalidate(self, kind):
+        with self._lock:
+            self._entries.pop(kind, None)
+            self._generation[kind] = self._generation.get(kind, 0) + 1
+
+
+# Instancia única por proceso
+catalog_cache = CatalogCache()
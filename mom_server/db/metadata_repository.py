@@ -0,0 +1,45 @@
+# mom_server/db/metadata_repository.py
+
+import json
+from mom_server.database import get_connection
+
+def save_partition_map(partition_map):
+    """
+    Guarda una versión del mapa de particiones; si ya estaba guardada, la sustituye.
+
+    Args:
+        partition_map (dict): version, nodes, weights, strategy y replication_factor
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR REPLACE INTO partition_maps (version, nodes, weights, strategy, replication_factor)
+        VALUES (?, ?, ?, ?, ?)
+    """, (
+        partition_map["version"], json.dumps(partition_map["nodes"]), json.dumps(partition_map["weights"]),
+        partition_map["strategy"], partition_map["replication_factor"]
+    ))
+    conn.commit()
+    conn.close()
+
+def get_latest_partition_map():
+    """
+    Obtiene la versión más reciente guardada del mapa de particiones.
+
+    Returns:
+        dict: version, nodes, weights, strategy y replication_factor, o None si no hay ninguna
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM partition_maps ORDER BY version DESC LIMIT 1")
+    row = cursor.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return {
+        "version": row["version"],
+        "nodes": json.loads(row["nodes"]),
+        "weights": json.loads(row["weights"]),
+        "strategy": row["strategy"],
+        "replication_factor": row["replication_factor"]
+    }
@@ -0,0 +1,195 @@
+# mom_server/db/outbox_repository.py
+
+import json
+import logging
+import time
+from mom_server.database import get_connection
+
+logger = logging.getLogger(__name__)
+
+def enqueue_entries(cursor, peers, kind, payload, message_id=None, delay=0):
+    """
+    Inserta trabajo de replicación para varios nodos usando un cursor ya abierto,
+    de modo que quede en la misma transacción que la escritura que lo origina.
+
+    Args:
+        cursor: Cursor de la transacción en curso
+        peers (list): Nodos destino (direcciones API)
+        kind (str): Tipo de operación a replicar (p. ej. "topic_message")
+        payload (dict): Datos necesarios para reenviar la operación
+        message_id (str, optional): Identificador del mensaje asociado
+        delay (float, optional): Segundos antes de que los emisores en segundo plano lo tomen
+    """
+    next_attempt_at = time.time() + delay
+    serialized = json.dumps(payload)
+    for peer in peers:
+        cursor.execute("""
+            INSERT INTO replication_outbox (peer, kind, message_id, payload, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (peer, kind, message_id, serialized, next_attempt_at))
+
+def get_pending_peers():
+    """
+    Obtiene los nodos que tienen trabajo de replicación pendiente.
+
+    Returns:
+        list: Nodos con al menos una entrada en el outbox
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT peer FROM replication_outbox")
+    peers = [row["peer"] for row in cursor.fetchall()]
+    conn.close()
+    return peers
+
+def _ordering_key(entry):
+    # Las entradas de una misma partición (o cola) deben llegar en orden; las de otras no dependen de ellas
+    payload = entry["payload"]
+    return entry["kind"], payload.get("topic_name") or payload.get("queue_name"), payload.get("partition_id", 0)
+
+def fetch_due_window(peer, limit=100, after_id=0):
+    """
+    Obtiene las entradas pendientes de un nodo que ya deben enviarse, en orden de inserción.
+
+    Una entrada que aún no debe enviarse (p. ej. la de una escritura acks=all
+    mientras el líder espera la confirmación síncrona) retiene solo a las
+    posteriores de su misma partición o cola, para no alterar su orden; el resto
+    de entradas del nodo se devuelven igualmente.
+
+    Args:
+        peer (str): Nodo destino
+        limit (int): Máximo de filas a examinar
+        after_id (int): Solo entradas posteriores a este id (las anteriores ya están en vuelo)
+
+    Returns:
+        tuple: (entradas con el payload ya deserializado, id de la primera entrada
+            retenida o None si no se retuvo ninguna)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, peer, kind, message_id, payload, attempts, next_attempt_at
+        FROM replication_outbox
+        WHERE peer = ? AND id > ?
+        ORDER BY id ASC
+        LIMIT ?
+    """, (peer, after_id, limit))
+    now = time.time()
+    entries = []
+    held_back = set()
+    first_held_id = None
+    for row in cursor.fetchall():
+        entry = dict(row)
+        entry["payload"] = json.loads(entry["payload"])
+        key = _ordering_key(entry)
+        if key in held_back or entry["next_attempt_at"] > now:
+            held_back.add(key)
+            if first_held_id is None:
+                first_held_id = entry["id"]
+            continue
+        entries.append(entry)
+    conn.close()
+    return entries, first_held_id
+
+def fetch_due_entries(peer, limit=100, after_id=0):
+    """
+    Obtiene las entradas pendientes de un nodo que ya deben enviarse (ver fetch_due_window).
+
+    Returns:
+        list: Entradas con el payload ya deserializado
+    """
+    return fetch_due_window(peer, limit, after_id)[0]
+
+def delete_entries(entry_ids):
+    """
+    Elimina entradas ya entregadas.
+
+    Args:
+        entry_ids (list): Identificadores de las entradas
+    """
+    if not entry_ids:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("DELETE FROM replication_outbox WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+    conn.commit()
+    conn.close()
+
+def delete_message_entry(message_id, peer):
+    """
+    Elimina la entrada de un mensaje para un nodo que ya lo confirmó.
+
+    Args:
+        message_id (str): Identificador del mensaje
+        peer (str): Nodo que confirmó
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM replication_outbox WHERE message_id = ? AND peer = ?", (message_id, peer))
+    conn.commit()
+    conn.close()
+
+def mark_entry_failed(entry_id, error, retry_at):
+    """
+    Registra un intento fallido de entrega.
+
+    Args:
+        entry_id (int): Identificador de la entrada
+        error (str): Descripción del error
+        retry_at (float): Momento (epoch) del siguiente intento
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE replication_outbox
+        SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+        WHERE id = ?
+    """, (error, retry_at, entry_id))
+    conn.commit()
+    conn.close()
+
+def count_pending_by_peer():
+    """
+    Cuenta las entradas pendientes por nodo.
+
+    Returns:
+        dict: Nodo -> número de entradas pendientes
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT peer, COUNT(*) AS pending FROM replication_outbox GROUP BY peer")
+    counts = {row["peer"]: row["pending"] for row in cursor.fetchall()}
+    conn.close()
+    return counts
+
+def get_pending_topic_offsets():
+    """
+    Resume, por nodo y partición, los mensajes de tópico aún sin confirmar.
+
+    Returns:
+        dict: (nodo, tópico, partición) -> {"first_offset", "pending", "oldest_appended_at"}
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT peer,
+               json_extract(payload, '$.topic_name') AS topic_name,
+               COALESCE(json_extract(payload, '$.partition_id'), 0) AS partition_id,
+               MIN(json_extract(payload, '$.partition_offset')) AS first_offset,
+               COUNT(*) AS pending,
+               MIN(COALESCE(json_extract(payload, '$.appended_at'), CAST(strftime('%s', created_at) AS REAL)))
+                   AS oldest_appended_at
+        FROM replication_outbox
+        WHERE kind = 'topic_message'
+        GROUP BY peer, topic_name, partition_id
+    """)
+    pending = {
+        (row["peer"], row["topic_name"], row["partition_id"]): {
+            "first_offset": row["first_offset"],
+            "pending": row["pending"],
+            "oldest_appended_at": row["oldest_appended_at"]
+        }
+        for row in cursor.fetchall()
+    }
+    conn.close()
+    return pending
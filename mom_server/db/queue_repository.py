@@ -1,7 +1,10 @@
 # mom_server/db/queue_repository.py
 
 import logging
+import uuid
 from mom_server.database import get_connection
+from mom_server.db.catalog_cache import catalog_cache
+from mom_server.db.outbox_repository import enqueue_entries
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,45 @@ def get_queues():
     conn.close()
     return queues
 
+def get_queue(queue_name):
+    """
+    Obtiene la configuración de una cola sin cargar sus mensajes.
+    
+    Args:
+        queue_name (str): Nombre de la cola
+        
+    Returns:
+        dict: Nombre y propietario de la cola, o None si no existe
+    """
+    if catalog_cache.enabled:
+        queue = catalog_cache.get("queues", _load_queue_catalog).get(queue_name)
+        return dict(queue) if queue else None
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, owner FROM queues WHERE name = ?", (queue_name,))
+    row = cursor.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_queue_catalog():
+    """
+    Obtiene la configuración de todas las colas sin cargar sus mensajes.
+    
+    Returns:
+        dict: Nombre -> nombre y propietario
+    """
+    if catalog_cache.enabled:
+        return {name: dict(queue) for name, queue in catalog_cache.get("queues", _load_queue_catalog).items()}
+    return _load_queue_catalog()
+
+def _load_queue_catalog():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, owner FROM queues")
+    catalog = {row["name"]: dict(row) for row in cursor.fetchall()}
+    conn.close()
+    return catalog
+
 def get_queue_messages(queue_name):
     """
     Obtiene todos los mensajes de una cola específica.
@@ -39,6 +81,26 @@ def get_queue_messages(queue_name):
     conn.close()
     return messages
 
+def get_pending_messages(queue_name):
+    """
+    Obtiene los mensajes pendientes de una cola con su identidad, en orden de llegada.
+    
+    Args:
+        queue_name (str): Nombre de la cola
+        
+    Returns:
+        list: Mensajes con message_id, sender, content y timestamp
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT message_id, sender, content, timestamp FROM queue_messages
+        WHERE queue_name = ? ORDER BY id ASC
+    """, (queue_name,))
+    messages = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return messages
+
 def create_queue(queue_name, owner):
     """
     Crea una nueva cola en la base de datos.
@@ -56,6 +118,7 @@ def create_queue(queue_name, owner):
         conn.close()
         raise e
     conn.close()
+    catalog_cache.invalidate("queues")
 
 def delete_queue(queue_name):
     """
@@ -70,29 +133,68 @@ def delete_queue(queue_name):
     cursor.execute("DELETE FROM queue_messages WHERE queue_name = ?", (queue_name,))
     conn.commit()
     conn.close()
+    catalog_cache.invalidate("queues")
+
+def _insert_queue_message(cursor, queue_name, sender, content, message_id, timestamp=None):
+    # Las réplicas conservan el timestamp del líder para mantener el mismo orden de consumo
+    if timestamp:
+        cursor.execute("""
+            INSERT OR IGNORE INTO queue_messages (queue_name, sender, content, message_id, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        """, (queue_name, sender, content, message_id, timestamp))
+    else:
+        cursor.execute("""
+            INSERT OR IGNORE INTO queue_messages (queue_name, sender, content, message_id)
+            VALUES (?, ?, ?, ?)
+        """, (queue_name, sender, content, message_id))
 
-def add_queue_message(queue_name, sender, content):
+def add_queue_message(queue_name, sender, content, message_id=None, replicate_to=None):
     """
     Añade un mensaje a una cola existente.
     
+    Si se indican nodos en `replicate_to`, el evento de encolado se guarda en el
+    outbox dentro de la misma transacción que el mensaje.
+    
     Args:
         queue_name (str): Nombre de la cola
         sender (str): Remitente del mensaje
         content (str): Contenido del mensaje
+        message_id (str, optional): Identificador global; se genera si no se indica
+        replicate_to (list, optional): Nodos a los que se debe replicar el evento
+        
+    Returns:
+        str: Identificador del mensaje
     """
+    message_id = message_id or uuid.uuid4().hex
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT INTO queue_messages (queue_name, sender, content) VALUES (?, ?, ?)",
-                   (queue_name, sender, content))
-    conn.commit()
+    try:
+        _insert_queue_message(cursor, queue_name, sender, content, message_id)
+        if replicate_to:
+            cursor.execute("SELECT timestamp FROM queue_messages WHERE message_id = ?", (message_id,))
+            event = {
+                "event": "enqueue", "queue_name": queue_name, "message_id": message_id,
+                "sender": sender, "content": content, "timestamp": cursor.fetchone()["timestamp"]
+            }
+            enqueue_entries(cursor, replicate_to, "queue_event", event, message_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
     conn.close()
+    return message_id
 
-def consume_queue_message(queue_name):
+def consume_queue_message(queue_name, replicate_to=None):
     """
     Consume (lee y elimina) el primer mensaje de una cola de forma atómica.
     
+    Si se indican nodos en `replicate_to`, el evento de confirmación (ack) se guarda
+    en el outbox dentro de la misma transacción para que las réplicas lo eliminen.
+    
     Args:
         queue_name (str): Nombre de la cola
+        replicate_to (list, optional): Nodos a los que se debe replicar el consumo
         
     Returns:
         dict: Mensaje consumido o None si la cola está vacía
@@ -107,10 +209,10 @@ def consume_queue_message(queue_name):
         
         # Obtenemos el primer mensaje (el más antiguo)
         cursor.execute("""
-            SELECT id, sender, content, timestamp 
+            SELECT id, sender, content, timestamp, message_id
             FROM queue_messages 
             WHERE queue_name = ? 
-            ORDER BY timestamp ASC
+            ORDER BY timestamp ASC, id ASC
             LIMIT 1
         """, (queue_name,))
         
@@ -132,6 +234,9 @@ def consume_queue_message(queue_name):
         
         # Eliminamos el mensaje recuperado
         cursor.execute("DELETE FROM queue_messages WHERE id = ?", (msg_id,))
+        if replicate_to and msg['message_id']:
+            event = {"event": "ack", "queue_name": queue_name, "message_id": msg['message_id']}
+            enqueue_entries(cursor, replicate_to, "queue_event", event, msg['message_id'])
         
         # Confirmamos la transacción explícitamente
         cursor.execute("COMMIT")
@@ -149,4 +254,45 @@ def consume_queue_message(queue_name):
             pass
         logger.error(f"Error al consumir mensaje de cola {queue_name}: {str(e)}")
         conn.close()
-        return None
\ No newline at end of file
+        return None
+
+def apply_queue_events(events):
+    """
+    Aplica en una sola transacción un lote de eventos de cola recibidos del líder.
+    
+    Los eventos "enqueue" insertan el mensaje (ignorando los ya aplicados) y los
+    eventos "ack" eliminan el mensaje consumido en el líder. Las colas que aún no
+    existan localmente se crean con propietario "system".
+    
+    Args:
+        events (list): Diccionarios con event, queue_name, message_id y, para
+            "enqueue", sender, content y timestamp
+            
+    Returns:
+        int: Número de eventos aplicados
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    created_queues = False
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for event in events:
+            if event["event"] == "enqueue":
+                cursor.execute("INSERT OR IGNORE INTO queues (name, owner) VALUES (?, ?)",
+                               (event["queue_name"], "system"))
+                created_queues = created_queues or cursor.rowcount > 0
+                _insert_queue_message(cursor, event["queue_name"], event["sender"], event["content"],
+                                      event["message_id"], event.get("timestamp"))
+            elif event["event"] == "ack":
+                cursor.execute("DELETE FROM queue_messages WHERE message_id = ?", (event["message_id"],))
+            else:
+                raise ValueError(f"Evento de cola desconocido: {event['event']}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
+    conn.close()
+    if created_queues:
+        catalog_cache.invalidate("queues")
+    return len(events)
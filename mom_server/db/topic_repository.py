@@ -1,10 +1,34 @@
 # mom_server/db/topic_repository.py
 
+import hashlib
+import json
 import logging
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from mom_server.config import MERKLE_BUCKET_SIZE
 from mom_server.database import get_connection
+from mom_server.db.catalog_cache import catalog_cache
+from mom_server.db.outbox_repository import enqueue_entries
 
 logger = logging.getLogger(__name__)
 
+def format_timestamp(timestamp_ms):
+    """Convierte milisegundos desde epoch al texto UTC que se guarda en la columna timestamp."""
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S.") + f"{timestamp_ms % 1000:03d}"
+
+def parse_timestamp(timestamp):
+    """Inversa de format_timestamp; acepta también el formato sin milisegundos de CURRENT_TIMESTAMP."""
+    if not timestamp:
+        return 0
+    moment = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+    return int(round(moment.timestamp() * 1000))
+
+def _decode_headers(headers):
+    return json.loads(headers) if headers else {}
+
 def get_topics():
     """
     Obtiene todos los tópicos desde la base de datos.
@@ -18,44 +42,105 @@ def get_topics():
     rows = cursor.fetchall()
     topics = {}
     for row in rows:
-        topics[row["name"]] = {"owner": row["owner"], "messages": get_topic_messages(row["name"])}
+        topics[row["name"]] = {
+            "owner": row["owner"],
+            "acks": row["acks"],
+            "partitions": row["partitions"],
+            "messages": get_topic_messages(row["name"])
+        }
     conn.close()
     return topics
 
-def get_topic_messages(topic_name):
+def get_topic(topic_name):
+    """
+    Obtiene la configuración de un tópico sin cargar sus mensajes.
+    
+    Args:
+        topic_name (str): Nombre del tópico
+        
+    Returns:
+        dict: Nombre, propietario, nivel de acks y número de particiones del tópico,
+            o None si no existe
+    """
+    if catalog_cache.enabled:
+        topic = catalog_cache.get("topics", _load_topic_catalog).get(topic_name)
+        return dict(topic) if topic else None
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, owner, acks, partitions FROM topics WHERE name = ?", (topic_name,))
+    row = cursor.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_topic_catalog():
+    """
+    Obtiene la configuración de todos los tópicos sin cargar sus mensajes.
+    
+    Returns:
+        dict: Nombre -> nombre, propietario, nivel de acks y número de particiones
+    """
+    if catalog_cache.enabled:
+        return {name: dict(topic) for name, topic in catalog_cache.get("topics", _load_topic_catalog).items()}
+    return _load_topic_catalog()
+
+def _load_topic_catalog():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, owner, acks, partitions FROM topics")
+    catalog = {row["name"]: dict(row) for row in cursor.fetchall()}
+    conn.close()
+    return catalog
+
+def get_topic_messages(topic_name, partition_id=None):
     """
     Obtiene todos los mensajes de un tópico específico.
     
     Args:
         topic_name (str): Nombre del tópico
+        partition_id (int, optional): Solo los mensajes de esta partición
         
     Returns:
         list: Lista de mensajes del tópico
     """
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT sender, content, timestamp FROM topic_messages WHERE topic_name = ?", (topic_name,))
-    messages = [dict(row) for row in cursor.fetchall()]
+    if partition_id is None:
+        cursor.execute("""
+            SELECT message_id, sender, content, timestamp, headers, partition_id, partition_offset
+            FROM topic_messages WHERE topic_name = ?
+        """, (topic_name,))
+    else:
+        cursor.execute("""
+            SELECT message_id, sender, content, timestamp, headers, partition_id, partition_offset
+            FROM topic_messages WHERE topic_name = ? AND partition_id = ?
+        """, (topic_name, partition_id))
+    messages = [{**dict(row), "headers": _decode_headers(row["headers"])} for row in cursor.fetchall()]
     conn.close()
     return messages
 
-def create_topic(topic_name, owner):
+def create_topic(topic_name, owner, acks=None, partitions=1):
     """
     Crea un nuevo tópico en la base de datos.
     
     Args:
         topic_name (str): Nombre del tópico a crear
         owner (str): Propietario del tópico
+        acks (str, optional): Nivel de confirmación por defecto del tópico ("0", "1" o "all")
+        partitions (int, optional): Número de particiones del tópico
     """
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO topics (name, owner) VALUES (?, ?)", (topic_name, owner))
+        cursor.execute(
+            "INSERT INTO topics (name, owner, acks, partitions) VALUES (?, ?, ?, ?)",
+            (topic_name, owner, acks, partitions)
+        )
         conn.commit()
     except Exception as e:
         conn.close()
         raise e
     conn.close()
+    catalog_cache.invalidate("topics")
 
 def delete_topic(topic_name):
     """
@@ -69,21 +154,359 @@ def delete_topic(topic_name):
     cursor.execute("DELETE FROM topics WHERE name = ?", (topic_name,))
     # También borramos los mensajes asociados
     cursor.execute("DELETE FROM topic_messages WHERE topic_name = ?", (topic_name,))
+    cursor.execute("DELETE FROM partition_hashes WHERE topic_name = ?", (topic_name,))
     conn.commit()
     conn.close()
+    catalog_cache.invalidate("topics")
+
+def _next_offset(cursor, topic_name, partition_id):
+    cursor.execute("""
+        SELECT COALESCE(MAX(partition_offset), 0) + 1 AS next_offset
+        FROM topic_messages
+        WHERE topic_name = ? AND partition_id = ?
+    """, (topic_name, partition_id))
+    return cursor.fetchone()["next_offset"]
 
-def add_topic_message(topic_name, sender, content):
+def _message_digest(message_id, partition_offset, sender, content):
+    """Hash de 64 bits de un mensaje; las hojas lo combinan con XOR para no depender del orden de llegada."""
+    digest = hashlib.sha256(f"{message_id}:{partition_offset}:{sender}:{content}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+def _update_leaf(cursor, topic_name, partition_id, partition_offset, digest):
+    """Incorpora el hash de un mensaje a la hoja de su rango de offsets."""
+    bucket = (partition_offset - 1) // MERKLE_BUCKET_SIZE
+    cursor.execute("""
+        SELECT leaf_hash FROM partition_hashes
+        WHERE topic_name = ? AND partition_id = ? AND bucket = ?
+    """, (topic_name, partition_id, bucket))
+    row = cursor.fetchone()
+    leaf_hash = (row["leaf_hash"] if row else 0) ^ digest
+    cursor.execute("""
+        INSERT INTO partition_hashes (topic_name, partition_id, bucket, leaf_hash, message_count)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (topic_name, partition_id, bucket)
+        DO UPDATE SET leaf_hash = excluded.leaf_hash, message_count = message_count + 1
+    """, (topic_name, partition_id, bucket, leaf_hash))
+
+def _remove_leaf(cursor, topic_name, partition_id, partition_offset, digest):
+    """Quita el hash de un mensaje de la hoja de su rango de offsets (el XOR es su propio inverso)."""
+    bucket = (partition_offset - 1) // MERKLE_BUCKET_SIZE
+    cursor.execute("""
+        SELECT leaf_hash FROM partition_hashes
+        WHERE topic_name = ? AND partition_id = ? AND bucket = ?
+    """, (topic_name, partition_id, bucket))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    cursor.execute("""
+        UPDATE partition_hashes SET leaf_hash = ?, message_count = message_count - 1
+        WHERE topic_name = ? AND partition_id = ? AND bucket = ?
+    """, (row["leaf_hash"] ^ digest, topic_name, partition_id, bucket))
+
+def _insert_topic_message(cursor, topic_name, sender, content, message_id, partition_id, partition_offset,
+                          timestamp=None, headers=None):
+    # Sin offset (escritura en el líder o réplica antigua) se asigna el siguiente de la partición
+    if not partition_offset:
+        partition_offset = _next_offset(cursor, topic_name, partition_id)
+    # El líder fija el timestamp; las réplicas guardan el que reciben
+    timestamp = timestamp or format_timestamp(int(time.time() * 1000))
+    # Un message_id repetido indica una réplica ya aplicada: se ignora. Otro mensaje con el
+    # mismo offset en la partición es una divergencia y lanza sqlite3.IntegrityError
+    cursor.execute("""
+        INSERT INTO topic_messages
+            (topic_name, sender, content, message_id, partition_id, partition_offset, timestamp, headers)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (message_id) DO NOTHING
+    """, (topic_name, sender, content, message_id, partition_id, partition_offset, timestamp,
+          json.dumps(headers, sort_keys=True) if headers else None))
+    if cursor.rowcount == 1:
+        _update_leaf(cursor, topic_name, partition_id, partition_offset,
+                     _message_digest(message_id, partition_offset, sender, content))
+    return partition_offset, timestamp
+
+def add_topic_message(topic_name, sender, content, message_id=None, replicate_to=None, replication_delay=0,
+                      partition_id=0, partition_offset=None, headers=None, timestamp=None):
     """
     Añade un mensaje a un tópico existente.
     
+    Si se indican nodos en `replicate_to`, el trabajo de replicación hacia cada uno
+    se guarda en el outbox dentro de la misma transacción que el mensaje.
+    
     Args:
         topic_name (str): Nombre del tópico
         sender (str): Remitente del mensaje
         content (str): Contenido del mensaje
+        message_id (str, optional): Identificador global; se genera si no se indica
+        replicate_to (list, optional): Nodos a los que se debe replicar el mensaje
+        replication_delay (float, optional): Segundos antes de que el outbox intente el envío
+        partition_id (int, optional): Partición del tópico
+        partition_offset (int, optional): Offset asignado por el líder; se asigna aquí si no se indica
+        headers (dict, optional): Cabeceras del mensaje
+        timestamp (str, optional): Timestamp asignado por el líder; se asigna aquí si no se indica
+        
+    Returns:
+        dict: message_id, partition_id, partition_offset, timestamp y headers del mensaje
     """
+    message_id = message_id or uuid.uuid4().hex
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT INTO topic_messages (topic_name, sender, content) VALUES (?, ?, ?)",
-                   (topic_name, sender, content))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    try:
+        # BEGIN IMMEDIATE serializa a los escritores para que los offsets no se repitan
+        cursor.execute("BEGIN IMMEDIATE")
+        partition_offset, timestamp = _insert_topic_message(
+            cursor, topic_name, sender, content, message_id, partition_id, partition_offset, timestamp, headers
+        )
+        record = {"message_id": message_id, "partition_id": partition_id, "partition_offset": partition_offset,
+                  "timestamp": timestamp, "headers": headers or {}}
+        if replicate_to:
+            # appended_at permite medir el retraso de cada réplica respecto al líder
+            payload = {"topic_name": topic_name, "sender": sender, "content": content,
+                       "appended_at": time.time(), **record}
+            enqueue_entries(cursor, replicate_to, "topic_message", payload, message_id, replication_delay)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
+    conn.close()
+    return record
+
+def add_topic_messages_batch(messages):
+    """
+    Aplica un lote de mensajes replicados en una sola transacción.
+    
+    Los tópicos que aún no existan localmente se crean con propietario "system",
+    igual que en la sincronización inicial, y con tantas particiones como indique
+    la mayor partición recibida.
+    
+    Args:
+        messages (list): Diccionarios con topic_name, sender, content, message_id,
+            partition_id, partition_offset y, si los asignó el líder, timestamp y headers
+            
+    Returns:
+        list: message_id de los mensajes aplicados o ya presentes
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    created_topics = False
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Un mensaje de la partición p implica al menos p + 1 particiones
+        partitions = {}
+        for message in messages:
+            partitions[message["topic_name"]] = max(
+                partitions.get(message["topic_name"], 1), message.get("partition_id", 0) + 1
+            )
+        for topic_name, count in partitions.items():
+            cursor.execute(
+                "INSERT OR IGNORE INTO topics (name, owner, partitions) VALUES (?, ?, ?)",
+                (topic_name, "system", count)
+            )
+            created_topics = created_topics or cursor.rowcount > 0
+        for message in messages:
+            _insert_topic_message(
+                cursor, message["topic_name"], message["sender"], message["content"],
+                message["message_id"], message.get("partition_id", 0), message.get("partition_offset"),
+                message.get("timestamp"), message.get("headers")
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
+    conn.close()
+    if created_topics:
+        catalog_cache.invalidate("topics")
+    return [message["message_id"] for message in messages]
+
+def find_moved_messages(messages):
+    """
+    Detecta mensajes recibidos cuyo message_id ya está guardado aquí en otra partición u offset.
+
+    Al aplicarlos, el INSERT OR IGNORE los descartaría y las copias seguirían distintas.
+
+    Args:
+        messages (list): Diccionarios con message_id, topic_name, partition_id y partition_offset
+
+    Returns:
+        list: Mensajes de `messages` que ocupan otra posición en este nodo
+    """
+    if not messages:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" for _ in messages)
+    cursor.execute(f"""
+        SELECT message_id, topic_name, partition_id, partition_offset FROM topic_messages
+        WHERE message_id IN ({placeholders})
+    """, [message["message_id"] for message in messages])
+    local = {row["message_id"]: (row["topic_name"], row["partition_id"], row["partition_offset"])
+             for row in cursor.fetchall()}
+    conn.close()
+    return [
+        message for message in messages
+        if message["message_id"] in local and local[message["message_id"]] != (
+            message["topic_name"], message.get("partition_id", 0), message.get("partition_offset")
+        )
+    ]
+
+def replace_topic_messages(messages):
+    """
+    Sustituye la copia local de unos mensajes por la recibida, con su partición y offset.
+
+    Args:
+        messages (list): Diccionarios como los de add_topic_messages_batch
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for message in messages:
+            row = cursor.execute("""
+                SELECT topic_name, partition_id, partition_offset, sender, content FROM topic_messages
+                WHERE message_id = ?
+            """, (message["message_id"],)).fetchone()
+            if row is not None:
+                cursor.execute("DELETE FROM topic_messages WHERE message_id = ?", (message["message_id"],))
+                if row["partition_offset"] is not None:
+                    _remove_leaf(cursor, row["topic_name"], row["partition_id"], row["partition_offset"],
+                                 _message_digest(message["message_id"], row["partition_offset"],
+                                                 row["sender"], row["content"]))
+            _insert_topic_message(
+                cursor, message["topic_name"], message["sender"], message["content"],
+                message["message_id"], message.get("partition_id", 0), message.get("partition_offset"),
+                message.get("timestamp"), message.get("headers")
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
+    conn.close()
+
+def get_partition_offsets():
+    """
+    Obtiene el último offset almacenado de cada partición conocida.
+    
+    Las particiones sin mensajes aparecen con offset 0.
+    
+    Returns:
+        dict: (topic_name, partition_id) -> último offset
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, partitions FROM topics")
+    offsets = {
+        (row["name"], partition_id): 0
+        for row in cursor.fetchall()
+        for partition_id in range(row["partitions"])
+    }
+    cursor.execute("""
+        SELECT m.topic_name, m.partition_id, MAX(m.partition_offset) AS last_offset
+        FROM topic_messages m
+        JOIN topics t ON t.name = m.topic_name
+        GROUP BY m.topic_name, m.partition_id
+    """)
+    for row in cursor.fetchall():
+        offsets[(row["topic_name"], row["partition_id"])] = row["last_offset"] or 0
+    conn.close()
+    return offsets
+
+def get_last_offset(topic_name, partition_id):
+    """
+    Obtiene el último offset almacenado de una partición (0 si no hay mensajes).
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    last_offset = _next_offset(cursor, topic_name, partition_id) - 1
+    conn.close()
+    return last_offset
+
+def get_messages_since(topic_name, partition_id, offset, max_bytes, end_offset=None):
+    """
+    Obtiene, en orden de offset, los mensajes posteriores a `offset` de una partición.
+    
+    Se detiene al superar `max_bytes` de contenido, pero siempre devuelve al menos
+    un mensaje si lo hay para que quien lo pide pueda avanzar.
+    
+    Args:
+        topic_name (str): Nombre del tópico
+        partition_id (int): Partición
+        offset (int): Último offset que ya tiene quien lo pide
+        max_bytes (int): Límite aproximado de contenido
+        end_offset (int, optional): Último offset incluido; sin límite si no se indica
+        
+    Returns:
+        list: Mensajes con message_id, topic_name, sender, content, partition_id,
+            partition_offset, timestamp y headers
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT message_id, topic_name, sender, content, partition_id, partition_offset, timestamp, headers
+        FROM topic_messages
+        WHERE topic_name = ? AND partition_id = ? AND partition_offset > ? AND partition_offset <= ?
+        ORDER BY partition_offset ASC
+    """, (topic_name, partition_id, offset, end_offset or sys.maxsize))
+    messages = []
+    total_bytes = 0
+    for row in cursor:
+        size = len(row["content"].encode("utf-8"))
+        if messages and total_bytes + size > max_bytes:
+            break
+        messages.append({**dict(row), "headers": _decode_headers(row["headers"])})
+        total_bytes += size
+    conn.close()
+    return messages
+
+def get_partition_leaves(topic_name, partition_id):
+    """
+    Obtiene las hojas del árbol de hashes de una partición.
+    
+    Returns:
+        dict: bucket -> hash de la hoja (solo buckets con mensajes)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT bucket, leaf_hash FROM partition_hashes
+        WHERE topic_name = ? AND partition_id = ? AND message_count > 0
+    """, (topic_name, partition_id))
+    leaves = {row["bucket"]: row["leaf_hash"] for row in cursor.fetchall()}
+    conn.close()
+    return leaves
+
+def rebuild_partition_hashes():
+    """
+    Recalcula las hojas si no cubren todos los mensajes con offset
+    (p. ej. mensajes guardados antes de existir la tabla de hashes).
+    
+    Returns:
+        bool: True si hubo que recalcular
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) AS total FROM topic_messages WHERE partition_offset IS NOT NULL")
+    total = cursor.fetchone()["total"]
+    cursor.execute("SELECT COALESCE(SUM(message_count), 0) AS total FROM partition_hashes")
+    if cursor.fetchone()["total"] == total:
+        conn.close()
+        return False
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM partition_hashes")
+        rows = cursor.execute("""
+            SELECT topic_name, partition_id, partition_offset, message_id, sender, content
+            FROM topic_messages WHERE partition_offset IS NOT NULL
+        """).fetchall()
+        for row in rows:
+            _update_leaf(cursor, row["topic_name"], row["partition_id"], row["partition_offset"],
+                         _message_digest(row["message_id"], row["partition_offset"], row["sender"], row["content"]))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        raise e
+    conn.close()
+    logger.info(f"Hojas de hashes recalculadas para {len(rows)} mensajes")
+    return True
@@ -0,0 +1,232 @@
+# mom_server/grpc_services/channel_pool.py
+
+"""
+Registro de canales gRPC reutilizables entre nodos del clúster.
+
+Cada nodo remoto tiene un único canal HTTP/2 con keepalive que se crea la primera
+vez que se necesita y se reutiliza para todas las llamadas posteriores. Si un nodo
+acumula demasiados fallos consecutivos, su canal se sustituye: las llamadas nuevas
+usan un canal creado de forma perezosa, y el anterior se cierra pasados
+GRPC_CHANNEL_DRAIN_SECONDS, para no cancelar los RPCs que aún lo usan (streams de
+replicación, WatchPartitionMap...).
+
+Las llamadas hechas con `guard` (o `call`) pasan además por el circuit breaker del
+nodo: si está abierto se rechazan al instante con CircuitOpenError.
+"""
+
+import grpc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from mom_server.config import (
+    GRPC_KEEPALIVE_TIME_MS,
+    GRPC_KEEPALIVE_TIMEOUT_MS,
+    GRPC_RECONNECT_BACKOFF_MAX_MS,
+    GRPC_CHANNEL_MAX_FAILURES,
+    GRPC_CHANNEL_DRAIN_SECONDS,
+    GRPC_RPC_TIMEOUT
+)
+from mom_server.grpc_services import messaging_pb2_grpc
+from mom_server.services.circuit_breaker import get_breaker
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_OPTIONS = [
+    ('grpc.max_receive_message_length', 1024 * 1024 * 10),
+    ('grpc.max_send_message_length', 1024 * 1024 * 10),
+    ('grpc.keepalive_time_ms', GRPC_KEEPALIVE_TIME_MS),
+    ('grpc.keepalive_timeout_ms', GRPC_KEEPALIVE_TIMEOUT_MS),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.initial_reconnect_backoff_ms', 200),
+    ('grpc.max_reconnect_backoff_ms', GRPC_RECONNECT_BACKOFF_MAX_MS)
+]
+
+
+class PeerChannel:
+    """Canal, stub y estado de salud de un nodo remoto."""
+
+    def __init__(self, address):
+        self.address = address
+        self.channel = None
+        self.stub = None
+        self.connectivity = None
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success = None
+        self.last_failure = None
+
+    def connect(self):
+        """Crea el canal y el stub. gRPC establece la conexión en segundo plano."""
+        self.channel = grpc.insecure_channel(self.address, options=CHANNEL_OPTIONS)
+        self.channel.subscribe(self._on_connectivity_change, try_to_connect=True)
+        self.stub = messaging_pb2_grpc.MessagingServiceStub(self.channel)
+        logger.info(f"Canal gRPC creado hacia {self.address}")
+
+    def detach(self):
+        """
+        Separa el canal actual sin cerrarlo; se creará otro en la siguiente llamada.
+
+        Returns:
+            grpc.Channel: El canal separado, o None si no había
+        """
+        channel = self.channel
+        if channel is not None:
+            try:
+                channel.unsubscribe(self._on_connectivity_change)
+            except Exception as e:
+                logger.warning(f"Error separando canal hacia {self.address}: {str(e)}")
+        self.channel = None
+        self.stub = None
+        self.connectivity = None
+        return channel
+
+    def close(self):
+        """Cierra el canal; se volverá a crear en la siguiente llamada."""
+        _close_channel(self.address, self.detach())
+
+    def _on_connectivity_change(self, state):
+        self.connectivity = state
+
+    @property
+    def healthy(self):
+        if self.consecutive_failures > 0:
+            return False
+        return self.connectivity not in (
+            grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+            grpc.ChannelConnectivity.SHUTDOWN
+        )
+
+    def snapshot(self):
+        return {
+            "address": self.address,
+            "healthy": self.healthy,
+            "connected": self.channel is not None,
+            "connectivity": self.connectivity.name if self.connectivity else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_success": self.last_success,
+            "last_failure": self.last_failure
+        }
+
+
+def _close_channel(address, channel):
+    if channel is None:
+        return
+    try:
+        channel.close()
+    except Exception as e:
+        logger.warning(f"Error cerrando canal hacia {address}: {str(e)}")
+
+
+class ChannelPool:
+    """Registro de canales gRPC por dirección de nodo, compartido por todo el proceso."""
+
+    def __init__(self):
+        self._peers = {}
+        self._lock = threading.Lock()
+
+    def _get_peer(self, address):
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is None:
+                peer = PeerChannel(address)
+                self._peers[address] = peer
+            if peer.channel is None:
+                peer.connect()
+            return peer
+
+    def get_stub(self, address):
+        """Devuelve el stub del nodo, creando o reconectando el canal si hace falta."""
+        return self._get_peer(address).stub
+
+    def get_channel(self, address):
+        """Devuelve el canal del nodo, creando o reconectando si hace falta."""
+        return self._get_peer(address).channel
+
+    def call(self, address, method, request, timeout=GRPC_RPC_TIMEOUT):
+        """
+        Ejecuta un RPC unario sobre el canal del nodo y actualiza su estado de salud.
+
+        Args:
+            address (str): Dirección gRPC del nodo
+            method (str): Nombre del método del stub (p. ej. "CreateTopic")
+            request: Mensaje protobuf de la solicitud
+            timeout (float): Plazo máximo de la llamada en segundos
+
+        Returns:
+            La respuesta del RPC. Propaga la excepción si la llamada falla.
+        """
+        with self.guard(address) as stub:
+            return getattr(stub, method)(request, timeout=timeout)
+
+    @contextmanager
+    def guard(self, address):
+        """
+        Protege una llamada al nodo con su circuit breaker y registra el resultado.
+
+        Uso: `with channel_pool.guard(address) as stub: stub.Metodo(...)`.
+        Lanza CircuitOpenError sin llamar si el breaker está abierto.
+        """
+        get_breaker(address).before_call()
+        started = time.monotonic()
+        try:
+            yield self.get_stub(address)
+        except Exception as e:
+            self.report_failure(address, e)
+            raise
+        self.report_success(address, time.monotonic() - started)
+
+    def report_success(self, address, latency=None):
+        get_breaker(address).record_success(latency)
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is not None:
+                peer.consecutive_failures = 0
+                peer.last_success = time.time()
+
+    def report_failure(self, address, error):
+        get_breaker(address).record_failure(error)
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is None:
+                return
+            peer.consecutive_failures += 1
+            peer.last_error = str(error)
+            peer.last_failure = time.time()
+            if peer.consecutive_failures % GRPC_CHANNEL_MAX_FAILURES == 0:
+                logger.warning(f"Sustituyendo canal hacia {address} tras {peer.consecutive_failures} fallos consecutivos")
+                # Las llamadas en curso (p. ej. streams largos) siguen en el canal anterior hasta el cierre
+                timer = threading.Timer(GRPC_CHANNEL_DRAIN_SECONDS, _close_channel, args=(address, peer.detach()))
+                timer.daemon = True
+                timer.start()
+
+    def is_healthy(self, address):
+        """Un nodo desconocido se considera sano hasta que falle una llamada o se abra su breaker."""
+        with self._lock:
+            peer = self._peers.get(address)
+            healthy = peer is None or peer.healthy
+        return healthy and get_breaker(address).available()
+
+    def health(self):
+        with self._lock:
+            return {
+                address: {**peer.snapshot(), "circuit": get_breaker(address).snapshot()}
+                for address, peer in self._peers.items()
+            }
+
+    def close_all(self):
+        with self._lock:
+            for peer in self._peers.values():
+                peer.close()
+            self._peers.clear()
+
+
+# Instancia única por proceso
+channel_pool = ChannelPool()
+
+
+def get_channel_pool():
+    return channel_pool
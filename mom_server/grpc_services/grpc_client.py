@@ -4,6 +4,7 @@ import grpc
 import argparse
 import logging
 import time
+import uuid
 from mom_server.grpc_services import messaging_pb2, messaging_pb2_grpc
 
 # Configurar logging
@@ -43,7 +44,11 @@ def send_message(address="localhost:50051", topic="alertas", sender="cliente1",
         
         # Enviar el mensaje al tópico
         logger.info(f"Enviando mensaje al tópico '{topic}'...")
-        request = messaging_pb2.MessageRequest(topic_name=topic, sender=sender, content=content)
+        # Con un message_id propio los reintentos no duplican el mensaje; offset y timestamp los asigna el servidor
+        request = messaging_pb2.MessageRequest(envelope=messaging_pb2.MessageEnvelope(
+            version=1, message_id=uuid.uuid4().hex, topic_name=topic, sender=sender,
+            payload=content.encode("utf-8")
+        ))
         
         # Intentar hasta 3 veces en caso de error
         for attempt in range(3):
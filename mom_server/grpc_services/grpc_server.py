@@ -1,9 +1,24 @@
 # mom_server/grpc_services/grpc_server.py
 
+import asyncio
+import functools
 import grpc
 from concurrent import futures
 from mom_server.grpc_services import messaging_pb2_grpc, messaging_pb2
-from mom_server.config import CLUSTER_NODES, api_to_grpc_address, SELF_HOST
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.config import (
+    CLUSTER_NODES, api_to_grpc_address, SELF_HOST, CATCHUP_ENABLED, CATCHUP_MAX_BYTES,
+    MERKLE_BUCKET_SIZE, ANTI_ENTROPY_ENABLED, MEMBERSHIP_ENABLED, METADATA_ENABLED, METADATA_NODE,
+    GRPC_MAX_CONCURRENT_RPCS, GRPC_MAX_CONCURRENT_STREAMS, GRPC_STORAGE_WORKERS
+)
+from mom_server.database import init_db
+from mom_server.services.messaging import to_envelope, from_envelope
+from mom_server.services.catchup import start_catch_up
+from mom_server.services.anti_entropy import HashTree, AntiEntropyWorker
+from mom_server.services.membership import membership
+from mom_server.services.rebalancer import start_partition_map_tasks
+from mom_server.services.metadata import metadata_service, metadata_watcher, to_proto
+from mom_server.services.audit import audit
 import os
 import threading
 import sys
@@ -13,8 +28,9 @@ import json
 
 # Importar funciones de state (que ahora re-exporta desde los repositorios)
 from mom_server.services.state import (
-    get_topics, create_topic, delete_topic, add_topic_message,
-    get_queues, create_queue, delete_queue, add_queue_message,
+    get_topics, get_topic, get_topic_catalog, create_topic, delete_topic, add_topic_message, add_topic_messages_batch, get_messages_since,
+    get_partition_leaves, get_last_offset,
+    get_queues, create_queue, delete_queue, add_queue_message, apply_queue_events,
     update_state
 )
 
@@ -28,6 +44,10 @@ class MessagingService(messaging_pb2_grpc.MessagingServiceServicer):
         # Filtrar nodos vacíos y eliminar espacios
         self.other_nodes = [node.strip() for node in other_nodes if node.strip()]
         self.node_lock = threading.Lock()  # Para operaciones seguras en múltiples hilos
+        # Las operaciones de SQLite se ejecutan aquí, con su propio tamaño, para no bloquear el bucle asyncio
+        self.storage_executor = futures.ThreadPoolExecutor(
+            max_workers=GRPC_STORAGE_WORKERS, thread_name_prefix="grpc-storage"
+        )
         self.replication_history = set()   # Para evitar ciclos de replicación
         
         logger.info(f"Inicializando servicio de mensajería en puerto {self_port}")
@@ -43,101 +63,188 @@ class MessagingService(messaging_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Iniciando sincronización con el clúster... {self.other_nodes}")
         for node in self.other_nodes:
             try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024 * 1024 * 10),
-                    ('grpc.max_send_message_length', 1024 * 1024 * 10)
-                ]
-                with grpc.insecure_channel(node, options=options) as channel:
-                    try:
-                        grpc.channel_ready_future(channel).result(timeout=5)
-                        stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                        topics_response = stub.ListTopics(messaging_pb2.EmptyRequest(), timeout=5)
-                        logger.info(f"Sincronizando tópicos desde {node}: {topics_response.topics}")
-                        
-                        # Obtén los tópicos locales y los del nodo remoto
-                        local_topics = get_topics()
-                        for topic_name in topics_response.topics:
-                            if topic_name not in local_topics:
-                                logger.info(f"Añadiendo tópico de sincronización: {topic_name}")
-                                create_topic(topic_name, "system")
-                        
-                        queues_response = stub.ListQueues(messaging_pb2.EmptyRequest(), timeout=5)
-                        logger.info(f"Sincronizando colas desde {node}: {queues_response.queues}")
+                grpc.channel_ready_future(channel_pool.get_channel(node)).result(timeout=5)
+                topics_response = channel_pool.call(node, "ListTopics", messaging_pb2.EmptyRequest())
+                logger.info(f"Sincronizando tópicos desde {node}: {topics_response.topics}")
+                
+                # Obtén los tópicos locales y los del nodo remoto
+                local_topics = get_topics()
+                for topic_name in topics_response.topics:
+                    if topic_name not in local_topics:
+                        logger.info(f"Añadiendo tópico de sincronización: {topic_name}")
+                        create_topic(topic_name, "system", partitions=topics_response.partitions.get(topic_name, 1))
+                
+                queues_response = channel_pool.call(node, "ListQueues", messaging_pb2.EmptyRequest())
+                logger.info(f"Sincronizando colas desde {node}: {queues_response.queues}")
+                
+                # Obtén las colas locales y las del nodo remoto
+                local_queues = get_queues()
+                for queue_name in queues_response.queues:
+                    if queue_name not in local_queues:
+                        logger.info(f"Añadiendo cola de sincronización: {queue_name}")
+                        create_queue(queue_name, "system")
                         
-                        # Obtén las colas locales y las del nodo remoto
-                        local_queues = get_queues()
-                        for queue_name in queues_response.queues:
-                            if queue_name not in local_queues:
-                                logger.info(f"Añadiendo cola de sincronización: {queue_name}")
-                                create_queue(queue_name, "system")
-                                
-                    except grpc.FutureTimeoutError:
-                        logger.warning(f"Timeout esperando conectividad con {node} durante sincronización")
+            except grpc.FutureTimeoutError:
+                logger.warning(f"Timeout esperando conectividad con {node} durante sincronización")
             except Exception as e:
                 logger.error(f"Error sincronizando con {node}: {str(e)}")
 
     def check_node_connections(self):
-        """Verifica la conexión con otros nodos al iniciar."""
+        """Verifica la conexión con otros nodos al iniciar y deja sus canales listos en el pool."""
         for node in self.other_nodes:
             try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024 * 1024 * 10),
-                    ('grpc.max_send_message_length', 1024 * 1024 * 10)
-                ]
-                with grpc.insecure_channel(node, options=options) as channel:
-                    try:
-                        grpc.channel_ready_future(channel).result(timeout=5)
-                        logger.info(f"✅ Conexión con nodo {node} establecida")
-                    except grpc.FutureTimeoutError:
-                        logger.warning(f"⚠️ Nodo {node} no disponible en este momento")
+                grpc.channel_ready_future(channel_pool.get_channel(node)).result(timeout=5)
+                logger.info(f"✅ Conexión con nodo {node} establecida")
+            except grpc.FutureTimeoutError:
+                logger.warning(f"⚠️ Nodo {node} no disponible en este momento")
             except Exception as e:
                 logger.warning(f"⚠️ No se pudo establecer conexión con nodo {node}: {e}")
 
-    def ReplicateMessage(self, request, context):
+    async def _storage(self, func, *args):
+        """Ejecuta una operación bloqueante de la base de datos en el executor de almacenamiento."""
+        return await asyncio.get_running_loop().run_in_executor(self.storage_executor, func, *args)
+
+    async def _in_background(self, func, *args):
+        """Ejecuta una difusión bloqueante (RPCs con reintentos) fuera del bucle y del executor de almacenamiento."""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def ReplicateMessage(self, request, context):
         """Recibe un mensaje para replicar desde otro nodo."""
-        message_id = f"{request.topic_name}:{request.sender}:{request.content}"
-        with self.node_lock:
-            if message_id in self.replication_history:
-                return messaging_pb2.MessageResponse(status="ALREADY_PROCESSED")
-            self.replication_history.add(message_id)
+        if request.HasField("envelope"):
+            try:
+                message = from_envelope(request.envelope)
+            except ValueError as e:
+                logger.warning(f"[{self.self_port}] ⚠️ {str(e)}")
+                return messaging_pb2.MessageResponse(status="UNSUPPORTED_VERSION")
+        else:
+            message = {"topic_name": request.topic_name, "sender": request.sender,
+                       "content": request.content, "message_id": request.message_id}
+        # Los mensajes con message_id se deduplican en la base de datos; el historial
+        # en memoria solo se usa para clientes que no lo envían
+        if not message["message_id"]:
+            message_id = f"{message['topic_name']}:{message['sender']}:{message['content']}"
+            with self.node_lock:
+                if message_id in self.replication_history:
+                    return messaging_pb2.MessageResponse(status="ALREADY_PROCESSED")
+                self.replication_history.add(message_id)
 
-        logger.info(f"[{self.self_port}] 📥 Recibido: {request.topic_name} - {request.content}")
+        logger.info(f"[{self.self_port}] 📥 Recibido: {message['topic_name']} - {message['content']}")
         
         # Verificar si el tópico existe en la base de datos
-        topics = get_topics()
-        if request.topic_name not in topics:
-            logger.warning(f"[{self.self_port}] ⚠️ Tópico no encontrado: {request.topic_name}")
+        if await self._storage(get_topic, message["topic_name"]) is None:
+            logger.warning(f"[{self.self_port}] ⚠️ Tópico no encontrado: {message['topic_name']}")
             return messaging_pb2.MessageResponse(status="TOPIC_NOT_FOUND")
         
-        # Agregar el mensaje al tópico en la base de datos
-        add_topic_message(request.topic_name, request.sender, request.content)
+        # Agregar el mensaje al tópico en la base de datos, conservando lo que asignó el líder
+        await self._storage(
+            functools.partial(
+                add_topic_message, message["topic_name"], message["sender"], message["content"],
+                message["message_id"] or None, partition_id=message.get("partition_id", 0),
+                partition_offset=message.get("partition_offset"), headers=message.get("headers"),
+                timestamp=message.get("timestamp")
+            )
+        )
         
-        logger.info(f"[{self.self_port}] 💾 Mensaje guardado en tópico: {request.topic_name}")
+        logger.info(f"[{self.self_port}] 💾 Mensaje guardado en tópico: {message['topic_name']}")
         return messaging_pb2.MessageResponse(status="SUCCESS")
 
-    def CreateTopic(self, request, context):
+    async def _apply_replicated_messages(self, messages):
+        """Convierte mensajes replicados a diccionarios y los aplica en una transacción."""
+        return await self._storage(add_topic_messages_batch, [from_envelope(message) for message in messages])
+
+    async def ReplicateBatch(self, request, context):
+        """Aplica un lote de mensajes replicados en una sola transacción."""
+        if not request.messages:
+            return messaging_pb2.ReplicateBatchResponse(status="SUCCESS")
+        try:
+            acked_ids = await self._apply_replicated_messages(request.messages)
+        except Exception as e:
+            logger.error(f"[{self.self_port}] Error aplicando lote de {request.origin}: {str(e)}")
+            return messaging_pb2.ReplicateBatchResponse(status="ERROR", message=f"Error: {str(e)}")
+        logger.info(f"[{self.self_port}] 💾 Lote de {len(acked_ids)} mensajes aplicado desde {request.origin}")
+        return messaging_pb2.ReplicateBatchResponse(status="SUCCESS", acked_ids=acked_ids)
+
+    async def ReplicationStream(self, request_iterator, context):
+        """
+        Canal de replicación de larga duración con otro nodo.
+
+        Las tramas se aplican en el orden en que llegan y cada una se confirma con
+        su secuencia; como la confirmación es acumulada, el emisor puede mantener
+        varias tramas en vuelo sin esperar una respuesta por cada una. Un stream
+        abierto no ocupa ningún hilo mientras espera tramas.
+        """
+        acked_sequence = 0
+        origin = None
+        async for frame in request_iterator:
+            if origin is None:
+                origin = frame.origin
+                logger.info(f"[{self.self_port}] 🔗 Stream de replicación abierto desde {origin}")
+            try:
+                if frame.messages:
+                    await self._apply_replicated_messages(frame.messages)
+            except Exception as e:
+                logger.error(f"[{self.self_port}] Error aplicando trama {frame.sequence} de {origin}: {str(e)}")
+                yield messaging_pb2.ReplicationAck(
+                    acked_sequence=acked_sequence, status="ERROR", message=f"Error: {str(e)}"
+                )
+                return
+            acked_sequence = frame.sequence
+            yield messaging_pb2.ReplicationAck(acked_sequence=acked_sequence, status="SUCCESS")
+        logger.info(f"[{self.self_port}] Stream de replicación desde {origin} cerrado")
+
+    async def FetchSince(self, request, context):
+        """Envía los mensajes de una partición posteriores al offset indicado."""
+        messages = await self._storage(
+            get_messages_since, request.topic_name, request.partition, request.offset,
+            request.max_bytes or CATCHUP_MAX_BYTES, request.end_offset or None
+        )
+        logger.info(
+            f"[{self.self_port}] 📤 FetchSince {request.topic_name}/{request.partition} desde offset "
+            f"{request.offset} para {request.requester}: {len(messages)} mensajes"
+        )
+        for message in messages:
+            yield to_envelope(message)
+
+    async def GetRangeHashes(self, request, context):
+        """Devuelve el hash de cada rango de buckets solicitado de una partición."""
+        if request.bucket_size != MERKLE_BUCKET_SIZE:
+            return messaging_pb2.RangeHashResponse(
+                status="ERROR", message=f"Tamaño de bucket distinto: {MERKLE_BUCKET_SIZE}"
+            )
+        leaves = await self._storage(get_partition_leaves, request.topic_name, request.partition)
+        last_offset = await self._storage(get_last_offset, request.topic_name, request.partition)
+        tree = HashTree(leaves)
+        return messaging_pb2.RangeHashResponse(
+            status="SUCCESS",
+            hashes=[tree.range_hash(bucket_range.start, bucket_range.end) for bucket_range in request.ranges],
+            last_offset=last_offset
+        )
+
+    async def CreateTopic(self, request, context):
         """Crea un nuevo tópico en el sistema."""
         logger.info(f"[{self.self_port}] 🆕 Solicitud para crear tópico: {request.name}")
         
-        topics = get_topics()
+        topics = await self._storage(get_topics)
         if request.name in topics:
             logger.info(f"[{self.self_port}] ⚠️ Tópico ya existe: {request.name}")
             return messaging_pb2.TopicResponse(status="ERROR", message="Tópico ya existe")
         
         try:
-            create_topic(request.name, request.owner)
+            await self._storage(create_topic, request.name, request.owner, request.acks or None, request.partitions or 1)
             logger.info(f"[{self.self_port}] ✅ Tópico creado: {request.name}")
-            self.replicate_topic_creation(request)
+            # Las copias recibidas de otro nodo se aplican sin volver a difundir
+            if request.hops == 0:
+                await self._in_background(self.replicate_topic_creation, request)
             return messaging_pb2.TopicResponse(status="SUCCESS", message=f"Tópico {request.name} creado")
         except Exception as e:
             logger.error(f"[{self.self_port}] Error al crear tópico: {str(e)}")
             return messaging_pb2.TopicResponse(status="ERROR", message=f"Error: {str(e)}")
 
-    def DeleteTopic(self, request, context):
+    async def DeleteTopic(self, request, context):
         """Elimina un tópico existente."""
         logger.info(f"[{self.self_port}] 🗑️ Solicitud para eliminar tópico: {request.name}")
         
-        topics = get_topics()
+        topics = await self._storage(get_topics)
         if request.name not in topics:
             return messaging_pb2.TopicResponse(status="ERROR", message="Tópico no existe")
         
@@ -145,44 +252,54 @@ class MessagingService(messaging_pb2_grpc.MessagingServiceServicer):
             return messaging_pb2.TopicResponse(status="ERROR", message="No autorizado para eliminar este tópico")
         
         try:
-            delete_topic(request.name)
+            await self._storage(delete_topic, request.name)
             logger.info(f"[{self.self_port}] ✅ Tópico eliminado: {request.name}")
-            self.replicate_topic_deletion(request)
+            # Las copias recibidas de otro nodo se aplican sin volver a difundir
+            if request.hops == 0:
+                await self._in_background(self.replicate_topic_deletion, request)
             return messaging_pb2.TopicResponse(status="SUCCESS", message=f"Tópico {request.name} eliminado")
         except Exception as e:
             logger.error(f"[{self.self_port}] Error al eliminar tópico: {str(e)}")
             return messaging_pb2.TopicResponse(status="ERROR", message=f"Error: {str(e)}")
 
-    def ListTopics(self, request, context):
+    async def ListTopics(self, request, context):
         """Lista todos los tópicos disponibles."""
         logger.info(f"[{self.self_port}] 📋 Solicitud para listar tópicos")
-        topics = get_topics()
+        topics = await self._storage(get_topic_catalog)
         topic_list = list(topics.keys())
-        return messaging_pb2.TopicsListResponse(topics=topic_list)
+        partitions = {name: topic["partitions"] for name, topic in topics.items()}
+        configs = [
+            messaging_pb2.TopicRequest(name=name, owner=topic["owner"], acks=topic["acks"] or "",
+                                       partitions=topic["partitions"])
+            for name, topic in topics.items()
+        ]
+        return messaging_pb2.TopicsListResponse(topics=topic_list, partitions=partitions, configs=configs)
 
-    def CreateQueue(self, request, context):
+    async def CreateQueue(self, request, context):
         """Crea una nueva cola en el sistema."""
         logger.info(f"[{self.self_port}] 🆕 Solicitud para crear cola: {request.name}")
         
-        queues = get_queues()
+        queues = await self._storage(get_queues)
         if request.name in queues:
             logger.info(f"[{self.self_port}] ⚠️ Cola ya existe: {request.name}")
             return messaging_pb2.QueueResponse(status="ERROR", message="Cola ya existe")
         
         try:
-            create_queue(request.name, request.owner)
+            await self._storage(create_queue, request.name, request.owner)
             logger.info(f"[{self.self_port}] ✅ Cola creada: {request.name}")
-            self.replicate_queue_creation(request)
+            # Las copias recibidas de otro nodo se aplican sin volver a difundir
+            if request.hops == 0:
+                await self._in_background(self.replicate_queue_creation, request)
             return messaging_pb2.QueueResponse(status="SUCCESS", message=f"Cola {request.name} creada")
         except Exception as e:
             logger.error(f"[{self.self_port}] Error al crear cola: {str(e)}")
             return messaging_pb2.QueueResponse(status="ERROR", message=f"Error: {str(e)}")
 
-    def DeleteQueue(self, request, context):
+    async def DeleteQueue(self, request, context):
         """Elimina una cola existente."""
         logger.info(f"[{self.self_port}] 🗑️ Solicitud para eliminar cola: {request.name}")
         
-        queues = get_queues()
+        queues = await self._storage(get_queues)
         if request.name not in queues:
             return messaging_pb2.QueueResponse(status="ERROR", message="Cola no existe")
         
@@ -190,86 +307,193 @@ class MessagingService(messaging_pb2_grpc.MessagingServiceServicer):
             return messaging_pb2.QueueResponse(status="ERROR", message="No autorizado para eliminar esta cola")
         
         try:
-            delete_queue(request.name)
+            await self._storage(delete_queue, request.name)
             logger.info(f"[{self.self_port}] ✅ Cola eliminada: {request.name}")
-            self.replicate_queue_deletion(request)
+            # Las copias recibidas de otro nodo se aplican sin volver a difundir
+            if request.hops == 0:
+                await self._in_background(self.replicate_queue_deletion, request)
             return messaging_pb2.QueueResponse(status="SUCCESS", message=f"Cola {request.name} eliminada")
         except Exception as e:
             logger.error(f"[{self.self_port}] Error al eliminar cola: {str(e)}")
             return messaging_pb2.QueueResponse(status="ERROR", message=f"Error: {str(e)}")
 
-    def ListQueues(self, request, context):
+    async def ListQueues(self, request, context):
         """Lista todas las colas disponibles."""
         logger.info(f"[{self.self_port}] 📋 Solicitud para listar colas")
-        queues = get_queues()
+        queues = await self._storage(get_queues)
         queue_list = list(queues.keys())
         return messaging_pb2.QueuesListResponse(queues=queue_list)
 
-    def SendMessageToQueue(self, request, context):
+    async def SendMessageToQueue(self, request, context):
         """Envía un mensaje a una cola específica."""
         logger.info(f"[{self.self_port}] 📤 Solicitud para enviar mensaje a cola: {request.queue_name}")
         
-        queues = get_queues()
+        queues = await self._storage(get_queues)
         if request.queue_name not in queues:
             return messaging_pb2.MessageResponse(status="ERROR")
         
         try:
-            add_queue_message(request.queue_name, request.sender, request.content)
+            await self._storage(add_queue_message, request.queue_name, request.sender, request.content)
             logger.info(f"[{self.self_port}] 💾 Mensaje guardado en cola: {request.queue_name}")
             return messaging_pb2.MessageResponse(status="SUCCESS")
         except Exception as e:
             logger.error(f"[{self.self_port}] Error al enviar mensaje a cola: {str(e)}")
             return messaging_pb2.MessageResponse(status="ERROR", message=f"Error: {str(e)}")
 
+    async def ApplyQueueEvents(self, request, context):
+        """Aplica un lote de eventos de cola (encolado y ack) enviado por el líder de la cola."""
+        events = [
+            {
+                "event": event.event,
+                "queue_name": event.queue_name,
+                "message_id": event.message_id,
+                "sender": event.sender,
+                "content": event.content,
+                "timestamp": event.timestamp or None
+            }
+            for event in request.events
+        ]
+        try:
+            applied = await self._storage(apply_queue_events, events)
+        except Exception as e:
+            logger.error(f"[{self.self_port}] Error aplicando eventos de cola de {request.origin}: {str(e)}")
+            return messaging_pb2.QueueEventResponse(status="ERROR", message=f"Error: {str(e)}")
+        logger.info(f"[{self.self_port}] 💾 {applied} eventos de cola aplicados desde {request.origin}")
+        return messaging_pb2.QueueEventResponse(status="SUCCESS", applied=applied)
+
+    async def Gossip(self, request, context):
+        """Fusiona la tabla de pertenencia recibida y responde con la local (solo memoria, sin executor)."""
+        membership.merge(request.members)
+        return messaging_pb2.GossipMessage(sender=membership.self_node, members=membership.digest())
+
+    async def WatchPartitionMap(self, request, context):
+        """
+        Envía las versiones del mapa de particiones posteriores a la que tiene el nodo,
+        primero la actual y después cada una que se publique. Solo en el nodo de metadatos.
+        """
+        if not metadata_service.is_alive():
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "Este nodo no aloja el servicio de metadatos")
+        logger.info(f"[{self.self_port}] 🗺️ {request.node} observa el mapa de particiones desde v{request.known_version}")
+        async for spec in metadata_service.watch(request.known_version):
+            yield to_proto(spec)
+
     # --- Funciones de replicación ---
-    def replicate_topic_creation(self, request):
-        """Replica la creación de un tópico a otros nodos."""
+    def _broadcast(self, method, request, record_kind):
+        """
+        Difunde una operación de metadatos al resto de nodos una sola vez.
+
+        Solo se llama para solicitudes con hops=0. Las copias salen con el nodo de
+        origen y hops=1, así que los receptores las aplican localmente sin volver a
+        difundirlas. Un cambio cuesta N-1 RPCs en lugar de una cascada entre todos
+        los nodos.
+        """
         self_host = os.getenv("SELF_HOST", "localhost:8000")
+        forwarded = type(request)()
+        forwarded.CopyFrom(request)
+        forwarded.origin = request.origin or self_host
+        forwarded.hops = request.hops + 1
         for node in CLUSTER_NODES:
-            if node == self_host or not node.strip():
+            if node in (self_host, forwarded.origin) or not node.strip():
                 continue
             grpc_address = api_to_grpc_address(node)
             if not grpc_address:
                 logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
                 continue
                 
-            # El resto del código sigue igual...
-            logger.info(f"[{self_host}] Replicando tópico '{request.name}' a nodo gRPC: {grpc_address}")
+            logger.info(f"[{self_host}] Difundiendo {method} '{request.name}' a nodo gRPC: {grpc_address}")
             max_retries = 3
             for attempt in range(max_retries):
-                logger.info(f"[{self_host}] Intento {attempt+1} de replicar '{request.name}' a {grpc_address}")
+                logger.info(f"[{self_host}] Intento {attempt+1} de {method} '{request.name}' en {grpc_address}")
                 try:
-                    options = [
-                        ('grpc.max_receive_message_length', 1024*1024*10),
-                        ('grpc.max_send_message_length', 1024*1024*10)
-                    ]
-                    channel = grpc.insecure_channel(grpc_address, options=options)
-                    try:
-                        grpc.channel_ready_future(channel).result(timeout=5)
-                        logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                    except grpc.FutureTimeoutError:
-                        logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                        if attempt == max_retries - 1:
-                            break
-                        continue
-                    stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                    response = stub.CreateTopic(request, timeout=5)
-                    if response.status == "ERROR" and "Tópico ya existe" in response.message:
-                        logger.info(f"[{self_host}] Tópico '{request.name}' ya existe en {grpc_address}, replicado")
-                    else:
-                        logger.info(f"[{self_host}] Tópico '{request.name}' replicado a {grpc_address}: {response.status}")
-                    with open('replication_record.txt', 'a') as f:
-                        f.write(f"{grpc_address}:{request.name}:topic\n")
+                    response = channel_pool.call(grpc_address, method, forwarded)
+                    logger.info(f"[{self_host}] {method} '{request.name}' en {grpc_address}: {response.status} {response.message}")
+                    audit.record("replicate", method=method, kind=record_kind, name=request.name,
+                                 target=grpc_address, status=response.status, attempts=attempt + 1)
                     break
                 except Exception as e:
-                    logger.error(f"[{self_host}] Error replicando tópico a {grpc_address} (intento {attempt+1}): {str(e)}")
+                    logger.error(f"[{self_host}] Error en {method} '{request.name}' hacia {grpc_address} (intento {attempt+1}): {str(e)}")
                     if attempt < max_retries - 1:
                         time.sleep(1)
-                finally:
-                    channel.close()
+                    else:
+                        audit.record("replicate", method=method, kind=record_kind, name=request.name,
+                                     target=grpc_address, status="FAILED", attempts=max_retries, error=str(e))
+
+    def replicate_topic_creation(self, request):
+        """Replica la creación de un tópico a otros nodos."""
+        self._broadcast("CreateTopic", request, "topic")
 
-    # El resto de los métodos de replicate_ siguen igual...
-    # Las funciones replicate_topic_deletion, replicate_queue_creation, replicate_queue_deletion, etc.
+    def replicate_topic_deletion(self, request):
+        """Replica la eliminación de un tópico a otros nodos."""
+        self._broadcast("DeleteTopic", request, "topic_deletion")
+
+    def replicate_queue_creation(self, request):
+        """Replica la creación de una cola a otros nodos."""
+        self._broadcast("CreateQueue", request, "queue")
+
+    def replicate_queue_deletion(self, request):
+        """Replica la eliminación de una cola a otros nodos."""
+        self._broadcast("DeleteQueue", request, "queue_deletion")
+
+async def start_grpc_server(service, self_port):
+    """
+    Crea y arranca el servidor gRPC asyncio en el bucle actual.
+    
+    Returns:
+        grpc.aio.Server: Servidor ya escuchando en `self_port`
+    """
+    server_options = [
+        ('grpc.max_send_message_length', 1024*1024*10),
+        ('grpc.max_receive_message_length', 1024*1024*10),
+        ('grpc.max_concurrent_streams', GRPC_MAX_CONCURRENT_STREAMS)
+    ]
+    
+    # Servidor asyncio: las RPCs en curso (incluidos los streams de replicación) no ocupan un hilo
+    # cada una; maximum_concurrent_rpcs limita cuántas se aceptan antes de responder RESOURCE_EXHAUSTED
+    server = grpc.aio.server(
+        options=server_options,
+        maximum_concurrent_rpcs=GRPC_MAX_CONCURRENT_RPCS or None
+    )
+    
+    messaging_pb2_grpc.add_MessagingServiceServicer_to_server(service, server)
+    
+    bind_address = f'[::]:{self_port}'
+    portnum = server.add_insecure_port(bind_address)
+    if portnum == 0:
+        raise RuntimeError(f"No se pudo enlazar al puerto {self_port}. Puede estar ocupado.")
+    await server.start()
+    logger.info(f"🚀 Servidor gRPC (asyncio) escuchando en puerto {self_port}")
+    return server
+
+def start_background_tasks(other_nodes, api_in_process=True):
+    """
+    Tareas del nodo que requieren que el servidor gRPC ya atienda: gossip, recuperación, anti-entropía, metadatos y rebalanceo.
+
+    Args:
+        other_nodes (list): Direcciones gRPC de los demás nodos
+        api_in_process (bool): False si la API corre en otro proceso (--separate-processes):
+            el mapa y el rebalanceo son suyos y aquí solo se sigue la versión publicada
+    """
+    logger.info(f"📡 Nodos conectados: {other_nodes}")
+    if MEMBERSHIP_ENABLED:
+        # Anunciarse solo cuando el servidor ya atiende: "vivo" implica que acepta RPCs
+        membership.start(announce=True)
+    if CATCHUP_ENABLED:
+        start_catch_up([node.strip() for node in other_nodes if node.strip()])
+    if ANTI_ENTROPY_ENABLED:
+        AntiEntropyWorker().start()
+    if METADATA_ENABLED and SELF_HOST == METADATA_NODE:
+        metadata_service.start()
+    if api_in_process:
+        start_partition_map_tasks()
+    elif METADATA_ENABLED:
+        # Los datos los traslada el rebalanceador del proceso de la API; aquí cada versión se activa al recibirla
+        metadata_watcher.start(install=True)
+
+async def _serve(service, self_port, other_nodes):
+    server = await start_grpc_server(service, self_port)
+    # Proceso solo gRPC: la API se lanza aparte (launch_cluster.py --separate-processes)
+    start_background_tasks(other_nodes, api_in_process=False)
+    await server.wait_for_termination()
 
 def serve():
     # Obtener parámetros de línea de comandos o variables de entorno
@@ -280,31 +504,14 @@ def serve():
         self_port = os.getenv("GRPC_PORT", "50051")
         other_nodes = os.getenv("GRPC_NODES", "").split(",")
     
-    server_options = [
-        ('grpc.max_send_message_length', 1024*1024*10),
-        ('grpc.max_receive_message_length', 1024*1024*10),
-        ('grpc.max_concurrent_streams', 100)
-    ]
-    
-    server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=10),
-        options=server_options
-    )
-    
-    messaging_pb2_grpc.add_MessagingServiceServicer_to_server(
-        MessagingService(self_port, other_nodes), server
-    )
+    init_db()
     
     try:
-        bind_address = f'[::]:{self_port}'
-        portnum = server.add_insecure_port(bind_address)
-        if portnum == 0:
-            raise RuntimeError(f"No se pudo enlazar al puerto {self_port}. Puede estar ocupado.")
-        server.start()
-        logger.info(f"🚀 Servidor gRPC escuchando en puerto {self_port}")
-        logger.info(f"📡 Nodos conectados: {other_nodes}")
-        time.sleep(1)
-        server.wait_for_termination()
+        # La verificación y sincronización iniciales son bloqueantes: se hacen antes de arrancar el bucle
+        service = MessagingService(self_port, other_nodes)
+        asyncio.run(_serve(service, self_port, other_nodes))
+        service.storage_executor.shutdown(wait=True)
+        audit.stop()
     except Exception as e:
         logger.error(f"❌ Error al iniciar el servidor gRPC: {str(e)}")
         sys.exit(1)
@@ -24,33 +24,77 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n(mom_server/grpc_services/messaging.proto\x12\tmessaging\"E\n\x0eMessageRequest\x12\x12\n\ntopic_name\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\"!\n\x0fMessageResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"+\n\x0cTopicRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05owner\x18\x02 \x01(\t\"0\n\rTopicResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x0e\n\x0c\x45mptyRequest\"$\n\x12TopicsListResponse\x12\x0e\n\x06topics\x18\x01 \x03(\t\"+\n\x0cQueueRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05owner\x18\x02 \x01(\t\"0\n\rQueueResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"$\n\x12QueuesListResponse\x12\x0e\n\x06queues\x18\x01 \x03(\t\"J\n\x13QueueMessageRequest\x12\x12\n\nqueue_name\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t2\xc3\x04\n\x10MessagingService\x12I\n\x10ReplicateMessage\x12\x19.messaging.MessageRequest\x1a\x1a.messaging.MessageResponse\x12@\n\x0b\x43reateTopic\x12\x17.messaging.TopicRequest\x1a\x18.messaging.TopicResponse\x12@\n\x0b\x44\x65leteTopic\x12\x17.messaging.TopicRequest\x1a\x18.messaging.TopicResponse\x12\x44\n\nListTopics\x12\x17.messaging.EmptyRequest\x1a\x1d.messaging.TopicsListResponse\x12@\n\x0b\x43reateQueue\x12\x17.messaging.QueueRequest\x1a\x18.messaging.QueueResponse\x12@\n\x0b\x44\x65leteQueue\x12\x17.messaging.QueueRequest\x1a\x18.messaging.QueueResponse\x12\x44\n\nListQueues\x12\x17.messaging.EmptyRequest\x1a\x1d.messaging.QueuesListResponse\x12P\n\x12SendMessageToQueue\x12\x1e.messaging.QueueMessageRequest\x1a\x1a.messaging.MessageResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n(mom_server/grpc_services/messaging.proto\x12\tmessaging\"\x87\x01\n\x0eMessageRequest\x12\x12\n\ntopic_name\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\x12\x12\n\nmessage_id\x18\x04 \x01(\t\x12,\n\x08\x65nvelope\x18\x05 \x01(\x0b\x32\x1a.messaging.MessageEnvelope\"!\n\x0fMessageResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\x8e\x02\n\x0fMessageEnvelope\x12\x0f\n\x07version\x18\x01 \x01(\x05\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x12\n\ntopic_name\x18\x03 \x01(\t\x12\x11\n\tpartition\x18\x04 \x01(\x05\x12\x0e\n\x06offset\x18\x05 \x01(\x03\x12\x14\n\x0ctimestamp_ms\x18\x06 \x01(\x03\x12\x38\n\x07headers\x18\x07 \x03(\x0b\x32\'.messaging.MessageEnvelope.HeadersEntry\x12\x0e\n\x06sender\x18\x08 \x01(\t\x12\x0f\n\x07payload\x18\t \x01(\x0c\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"U\n\x15ReplicateBatchRequest\x12\x0e\n\x06origin\x18\x01 \x01(\t\x12,\n\x08messages\x18\x02 \x03(\x0b\x32\x1a.messaging.MessageEnvelope\"L\n\x16ReplicateBatchResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\tacked_ids\x18\x02 \x03(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\"b\n\x10ReplicationFrame\x12\x10\n\x08sequence\x18\x01 \x01(\x03\x12\x0e\n\x06origin\x18\x02 \x01(\t\x12,\n\x08messages\x18\x03 \x03(\x0b\x32\x1a.messaging.MessageEnvelope\"\x7f\n\x0c\x46\x65tchRequest\x12\x12\n\ntopic_name\x18\x01 \x01(\t\x12\x11\n\tpartition\x18\x02 \x01(\x05\x12\x0e\n\x06offset\x18\x03 \x01(\x03\x12\x11\n\tmax_bytes\x18\x04 \x01(\x03\x12\x11\n\trequester\x18\x05 \x01(\t\x12\x12\n\nend_offset\x18\x06 \x01(\x03\")\n\x0b\x42ucketRange\x12\r\n\x05start\x18\x01 \x01(\x03\x12\x0b\n\x03\x65nd\x18\x02 \x01(\x03\"v\n\x10RangeHashRequest\x12\x12\n\ntopic_name\x18\x01 \x01(\t\x12\x11\n\tpartition\x18\x02 \x01(\x05\x12\x13\n\x0b\x62ucket_size\x18\x03 \x01(\x03\x12&\n\x06ranges\x18\x04 \x03(\x0b\x32\x16.messaging.BucketRange\"Y\n\x11RangeHashResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0e\n\x06hashes\x18\x02 \x03(\t\x12\x13\n\x0blast_offset\x18\x03 \x01(\x03\x12\x0f\n\x07message\x18\x04 \x01(\t\"I\n\x0eReplicationAck\x12\x16\n\x0e\x61\x63ked_sequence\x18\x01 \x01(\x03\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\"k\n\x0cTopicRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05owner\x18\x02 \x01(\t\x12\x0c\n\x04\x61\x63ks\x18\x03 \x01(\t\x12\x0e\n\x06origin\x18\x04 \x01(\t\x12\x0c\n\x04hops\x18\x05 \x01(\x05\x12\x12\n\npartitions\x18\x06 \x01(\x05\"0\n\rTopicResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x0e\n\x0c\x45mptyRequest\"\xc4\x01\n\x12TopicsListResponse\x12\x0e\n\x06topics\x18\x01 \x03(\t\x12\x41\n\npartitions\x18\x02 \x03(\x0b\x32-.messaging.TopicsListResponse.PartitionsEntry\x12(\n\x07\x63onfigs\x18\x03 \x03(\x0b\x32\x17.messaging.TopicRequest\x1a\x31\n\x0fPartitionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x05:\x02\x38\x01\"I\n\x0cQueueRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05owner\x18\x02 \x01(\t\x12\x0e\n\x06origin\x18\x03 \x01(\t\x12\x0c\n\x04hops\x18\x04 \x01(\x05\"0\n\rQueueResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"$\n\x12QueuesListResponse\x12\x0e\n\x06queues\x18\x01 \x03(\t\"w\n\nQueueEvent\x12\r\n\x05\x65vent\x18\x01 \x01(\t\x12\x12\n\nqueue_name\x18\x02 \x01(\t\x12\x12\n\nmessage_id\x18\x03 \x01(\t\x12\x0e\n\x06sender\x18\x04 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x05 \x01(\t\x12\x11\n\ttimestamp\x18\x06 \x01(\t\"H\n\x0fQueueEventBatch\x12\x0e\n\x06origin\x18\x01 \x01(\t\x12%\n\x06\x65vents\x18\x02 \x03(\x0b\x32\x15.messaging.QueueEvent\"F\n\x12QueueEventResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07\x61pplied\x18\x02 \x01(\x05\x12\x0f\n\x07message\x18\x03 \x01(\t\"@\n\x0bMemberState\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x12\n\ngeneration\x18\x02 \x01(\x03\x12\x0f\n\x07version\x18\x03 \x01(\x03\"H\n\rGossipMessage\x12\x0e\n\x06sender\x18\x01 \x01(\t\x12\'\n\x07members\x18\x02 \x03(\x0b\x32\x16.messaging.MemberState\"?\n\x18WatchPartitionMapRequest\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x15\n\rknown_version\x18\x02 \x01(\x03\"\xcd\x01\n\x11PartitionMapState\x12\x0f\n\x07version\x18\x01 \x01(\x03\x12\r\n\x05nodes\x18\x02 \x03(\t\x12:\n\x07weights\x18\x03 \x03(\x0b\x32).messaging.PartitionMapState.WeightsEntry\x12\x10\n\x08strategy\x18\x04 \x01(\t\x12\x1a\n\x12replication_factor\x18\x05 \x01(\x05\x1a.\n\x0cWeightsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"J\n\x13QueueMessageRequest\x12\x12\n\nqueue_name\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t2\xe4\x08\n\x10MessagingService\x12I\n\x10ReplicateMessage\x12\x19.messaging.MessageRequest\x1a\x1a.messaging.MessageResponse\x12@\n\x0b\x43reateTopic\x12\x17.messaging.TopicRequest\x1a\x18.messaging.TopicResponse\x12@\n\x0b\x44\x65leteTopic\x12\x17.messaging.TopicRequest\x1a\x18.messaging.TopicResponse\x12\x44\n\nListTopics\x12\x17.messaging.EmptyRequest\x1a\x1d.messaging.TopicsListResponse\x12@\n\x0b\x43reateQueue\x12\x17.messaging.QueueRequest\x1a\x18.messaging.QueueResponse\x12@\n\x0b\x44\x65leteQueue\x12\x17.messaging.QueueRequest\x1a\x18.messaging.QueueResponse\x12\x44\n\nListQueues\x12\x17.messaging.EmptyRequest\x1a\x1d.messaging.QueuesListResponse\x12P\n\x12SendMessageToQueue\x12\x1e.messaging.QueueMessageRequest\x1a\x1a.messaging.MessageResponse\x12U\n\x0eReplicateBatch\x12 .messaging.ReplicateBatchRequest\x1a!.messaging.ReplicateBatchResponse\x12O\n\x11ReplicationStream\x12\x1b.messaging.ReplicationFrame\x1a\x19.messaging.ReplicationAck(\x01\x30\x01\x12\x43\n\nFetchSince\x12\x17.messaging.FetchRequest\x1a\x1a.messaging.MessageEnvelope0\x01\x12K\n\x0eGetRangeHashes\x12\x1b.messaging.RangeHashRequest\x1a\x1c.messaging.RangeHashResponse\x12M\n\x10\x41pplyQueueEvents\x12\x1a.messaging.QueueEventBatch\x1a\x1d.messaging.QueueEventResponse\x12<\n\x06Gossip\x12\x18.messaging.GossipMessage\x1a\x18.messaging.GossipMessage\x12X\n\x11WatchPartitionMap\x12#.messaging.WatchPartitionMapRequest\x1a\x1c.messaging.PartitionMapState0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'mom_server.grpc_services.messaging_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_MESSAGEREQUEST']._serialized_start=55
-  _globals['_MESSAGEREQUEST']._serialized_end=124
-  _globals['_MESSAGERESPONSE']._serialized_start=126
-  _globals['_MESSAGERESPONSE']._serialized_end=159
-  _globals['_TOPICREQUEST']._serialized_start=161
-  _globals['_TOPICREQUEST']._serialized_end=204
-  _globals['_TOPICRESPONSE']._serialized_start=206
-  _globals['_TOPICRESPONSE']._serialized_end=254
-  _globals['_EMPTYREQUEST']._serialized_start=256
-  _globals['_EMPTYREQUEST']._serialized_end=270
-  _globals['_TOPICSLISTRESPONSE']._serialized_start=272
-  _globals['_TOPICSLISTRESPONSE']._serialized_end=308
-  _globals['_QUEUEREQUEST']._serialized_start=310
-  _globals['_QUEUEREQUEST']._serialized_end=353
-  _globals['_QUEUERESPONSE']._serialized_start=355
-  _globals['_QUEUERESPONSE']._serialized_end=403
-  _globals['_QUEUESLISTRESPONSE']._serialized_start=405
-  _globals['_QUEUESLISTRESPONSE']._serialized_end=441
-  _globals['_QUEUEMESSAGEREQUEST']._serialized_start=443
-  _globals['_QUEUEMESSAGEREQUEST']._serialized_end=517
-  _globals['_MESSAGINGSERVICE']._serialized_start=520
-  _globals['_MESSAGINGSERVICE']._serialized_end=1099
+  _globals['_MESSAGEENVELOPE_HEADERSENTRY']._loaded_options = None
+  _globals['_MESSAGEENVELOPE_HEADERSENTRY']._serialized_options = b'8\001'
+  _globals['_TOPICSLISTRESPONSE_PARTITIONSENTRY']._loaded_options = None
+  _globals['_TOPICSLISTRESPONSE_PARTITIONSENTRY']._serialized_options = b'8\001'
+  _globals['_PARTITIONMAPSTATE_WEIGHTSENTRY']._loaded_options = None
+  _globals['_PARTITIONMAPSTATE_WEIGHTSENTRY']._serialized_options = b'8\001'
+  _globals['_MESSAGEREQUEST']._serialized_start=56
+  _globals['_MESSAGEREQUEST']._serialized_end=191
+  _globals['_MESSAGERESPONSE']._serialized_start=193
+  _globals['_MESSAGERESPONSE']._serialized_end=226
+  _globals['_MESSAGEENVELOPE']._serialized_start=229
+  _globals['_MESSAGEENVELOPE']._serialized_end=499
+  _globals['_MESSAGEENVELOPE_HEADERSENTRY']._serialized_start=453
+  _globals['_MESSAGEENVELOPE_HEADERSENTRY']._serialized_end=499
+  _globals['_REPLICATEBATCHREQUEST']._serialized_start=501
+  _globals['_REPLICATEBATCHREQUEST']._serialized_end=586
+  _globals['_REPLICATEBATCHRESPONSE']._serialized_start=588
+  _globals['_REPLICATEBATCHRESPONSE']._serialized_end=664
+  _globals['_REPLICATIONFRAME']._serialized_start=666
+  _globals['_REPLICATIONFRAME']._serialized_end=764
+  _globals['_FETCHREQUEST']._serialized_start=766
+  _globals['_FETCHREQUEST']._serialized_end=893
+  _globals['_BUCKETRANGE']._serialized_start=895
+  _globals['_BUCKETRANGE']._serialized_end=936
+  _globals['_RANGEHASHREQUEST']._serialized_start=938
+  _globals['_RANGEHASHREQUEST']._serialized_end=1056
+  _globals['_RANGEHASHRESPONSE']._serialized_start=1058
+  _globals['_RANGEHASHRESPONSE']._serialized_end=1147
+  _globals['_REPLICATIONACK']._serialized_start=1149
+  _globals['_REPLICATIONACK']._serialized_end=1222
+  _globals['_TOPICREQUEST']._serialized_start=1224
+  _globals['_TOPICREQUEST']._serialized_end=1331
+  _globals['_TOPICRESPONSE']._serialized_start=1333
+  _globals['_TOPICRESPONSE']._serialized_end=1381
+  _globals['_EMPTYREQUEST']._serialized_start=1383
+  _globals['_EMPTYREQUEST']._serialized_end=1397
+  _globals['_TOPICSLISTRESPONSE']._serialized_start=1400
+  _globals['_TOPICSLISTRESPONSE']._serialized_end=1596
+  _globals['_TOPICSLISTRESPONSE_PARTITIONSENTRY']._serialized_start=1547
+  _globals['_TOPICSLISTRESPONSE_PARTITIONSENTRY']._serialized_end=1596
+  _globals['_QUEUEREQUEST']._serialized_start=1598
+  _globals['_QUEUEREQUEST']._serialized_end=1671
+  _globals['_QUEUERESPONSE']._serialized_start=1673
+  _globals['_QUEUERESPONSE']._serialized_end=1721
+  _globals['_QUEUESLISTRESPONSE']._serialized_start=1723
+  _globals['_QUEUESLISTRESPONSE']._serialized_end=1759
+  _globals['_QUEUEEVENT']._serialized_start=1761
+  _globals['_QUEUEEVENT']._serialized_end=1880
+  _globals['_QUEUEEVENTBATCH']._serialized_start=1882
+  _globals['_QUEUEEVENTBATCH']._serialized_end=1954
+  _globals['_QUEUEEVENTRESPONSE']._serialized_start=1956
+  _globals['_QUEUEEVENTRESPONSE']._serialized_end=2026
+  _globals['_MEMBERSTATE']._serialized_start=2028
+  _globals['_MEMBERSTATE']._serialized_end=2092
+  _globals['_GOSSIPMESSAGE']._serialized_start=2094
+  _globals['_GOSSIPMESSAGE']._serialized_end=2166
+  _globals['_WATCHPARTITIONMAPREQUEST']._serialized_start=2168
+  _globals['_WATCHPARTITIONMAPREQUEST']._serialized_end=2231
+  _globals['_PARTITIONMAPSTATE']._serialized_start=2234
+  _globals['_PARTITIONMAPSTATE']._serialized_end=2439
+  _globals['_PARTITIONMAPSTATE_WEIGHTSENTRY']._serialized_start=2393
+  _globals['_PARTITIONMAPSTATE_WEIGHTSENTRY']._serialized_end=2439
+  _globals['_QUEUEMESSAGEREQUEST']._serialized_start=2441
+  _globals['_QUEUEMESSAGEREQUEST']._serialized_end=2515
+  _globals['_MESSAGINGSERVICE']._serialized_start=2518
+  _globals['_MESSAGINGSERVICE']._serialized_end=3642
 # @@protoc_insertion_point(module_scope)
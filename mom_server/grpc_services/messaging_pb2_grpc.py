@@ -74,6 +74,41 @@ class MessagingServiceStub(object):
                 request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueMessageRequest.SerializeToString,
                 response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.MessageResponse.FromString,
                 _registered_method=True)
+        self.ReplicateBatch = channel.unary_unary(
+                '/messaging.MessagingService/ReplicateBatch',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchRequest.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchResponse.FromString,
+                _registered_method=True)
+        self.ReplicationStream = channel.stream_stream(
+                '/messaging.MessagingService/ReplicationStream',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationFrame.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationAck.FromString,
+                _registered_method=True)
+        self.FetchSince = channel.unary_stream(
+                '/messaging.MessagingService/FetchSince',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.FetchRequest.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.MessageEnvelope.FromString,
+                _registered_method=True)
+        self.GetRangeHashes = channel.unary_unary(
+                '/messaging.MessagingService/GetRangeHashes',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashRequest.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashResponse.FromString,
+                _registered_method=True)
+        self.ApplyQueueEvents = channel.unary_unary(
+                '/messaging.MessagingService/ApplyQueueEvents',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventBatch.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventResponse.FromString,
+                _registered_method=True)
+        self.Gossip = channel.unary_unary(
+                '/messaging.MessagingService/Gossip',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.FromString,
+                _registered_method=True)
+        self.WatchPartitionMap = channel.unary_stream(
+                '/messaging.MessagingService/WatchPartitionMap',
+                request_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.WatchPartitionMapRequest.SerializeToString,
+                response_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.PartitionMapState.FromString,
+                _registered_method=True)
 
 
 class MessagingServiceServicer(object):
@@ -127,6 +162,48 @@ class MessagingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ReplicateBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReplicationStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def FetchSince(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetRangeHashes(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ApplyQueueEvents(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Gossip(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchPartitionMap(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MessagingServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -170,6 +247,41 @@ def add_MessagingServiceServicer_to_server(servicer, server):
                     request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueMessageRequest.FromString,
                     response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.MessageResponse.SerializeToString,
             ),
+            'ReplicateBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReplicateBatch,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchRequest.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchResponse.SerializeToString,
+            ),
+            'ReplicationStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.ReplicationStream,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationFrame.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationAck.SerializeToString,
+            ),
+            'FetchSince': grpc.unary_stream_rpc_method_handler(
+                    servicer.FetchSince,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.FetchRequest.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.MessageEnvelope.SerializeToString,
+            ),
+            'GetRangeHashes': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetRangeHashes,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashRequest.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashResponse.SerializeToString,
+            ),
+            'ApplyQueueEvents': grpc.unary_unary_rpc_method_handler(
+                    servicer.ApplyQueueEvents,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventBatch.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventResponse.SerializeToString,
+            ),
+            'Gossip': grpc.unary_unary_rpc_method_handler(
+                    servicer.Gossip,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.SerializeToString,
+            ),
+            'WatchPartitionMap': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchPartitionMap,
+                    request_deserializer=mom__server_dot_grpc__services_dot_messaging__pb2.WatchPartitionMapRequest.FromString,
+                    response_serializer=mom__server_dot_grpc__services_dot_messaging__pb2.PartitionMapState.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'messaging.MessagingService', rpc_method_handlers)
@@ -396,3 +508,192 @@ class MessagingService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ReplicateBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.MessagingService/ReplicateBatch',
+            mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchRequest.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.ReplicateBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReplicationStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/messaging.MessagingService/ReplicationStream',
+            mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationFrame.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.ReplicationAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def FetchSince(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/messaging.MessagingService/FetchSince',
+            mom__server_dot_grpc__services_dot_messaging__pb2.FetchRequest.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.MessageEnvelope.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetRangeHashes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.MessagingService/GetRangeHashes',
+            mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashRequest.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.RangeHashResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ApplyQueueEvents(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.MessagingService/ApplyQueueEvents',
+            mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventBatch.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.QueueEventResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Gossip(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.MessagingService/Gossip',
+            mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.GossipMessage.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WatchPartitionMap(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/messaging.MessagingService/WatchPartitionMap',
+            mom__server_dot_grpc__services_dot_messaging__pb2.WatchPartitionMapRequest.SerializeToString,
+            mom__server_dot_grpc__services_dot_messaging__pb2.PartitionMapState.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,150 @@
+# mom_server/grpc_services/replication_stream.py
+
+"""
+Stream bidireccional de replicación hacia un nodo remoto.
+
+El emisor envía tramas numeradas sin esperar respuesta mientras haya hueco en la
+ventana (REPLICATION_STREAM_WINDOW tramas sin confirmar). El nodo remoto responde
+con confirmaciones acumuladas: una confirmación con secuencia N libera todas las
+tramas con secuencia <= N. Si el stream falla, las tramas sin confirmar se
+consideran no entregadas y quien lo usa debe reenviarlas por un stream nuevo.
+"""
+
+import grpc
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from mom_server.config import REPLICATION_STREAM_WINDOW, GRPC_RPC_TIMEOUT
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+
+logger = logging.getLogger(__name__)
+
+
+class StreamClosedError(RuntimeError):
+    """El stream se cerró o falló; las tramas sin confirmar deben reenviarse."""
+
+
+class ReplicationStream:
+    """Stream de replicación de larga duración con ventana de tramas en vuelo."""
+
+    def __init__(self, grpc_address, window=REPLICATION_STREAM_WINDOW, on_ack=None, on_error=None):
+        """
+        Args:
+            grpc_address (str): Dirección gRPC del nodo remoto
+            window (int): Máximo de tramas enviadas sin confirmar
+            on_ack (callable, optional): Se invoca con la lista de tokens de las tramas confirmadas
+            on_error (callable, optional): Se invoca con la excepción si el stream falla
+        """
+        self.grpc_address = grpc_address
+        self.window = window
+        self.error = None
+        self._on_ack = on_ack
+        self._on_error = on_error
+        self._outgoing = queue.Queue()
+        self._inflight = OrderedDict()
+        self._cond = threading.Condition()
+        self._next_sequence = 1
+        self._closed = False
+        self._origin = os.getenv("SELF_HOST", "localhost:8000")
+
+        stub = channel_pool.get_stub(grpc_address)
+        self._call = stub.ReplicationStream(self._frames())
+        self._reader = threading.Thread(
+            target=self._read_acks, name=f"replication-stream-{grpc_address}", daemon=True
+        )
+        self._reader.start()
+        logger.info(f"[{self._origin}] Stream de replicación abierto hacia {grpc_address}")
+
+    def _frames(self):
+        while True:
+            frame = self._outgoing.get()
+            if frame is None:
+                return
+            yield frame
+
+    def send(self, messages, token=None, timeout=GRPC_RPC_TIMEOUT):
+        """
+        Encola una trama; bloquea mientras la ventana esté llena.
+
+        Args:
+            messages (list): MessageEnvelope de la trama
+            token: Valor que se devolverá a `on_ack` cuando la trama se confirme
+            timeout (float): Espera máxima por hueco en la ventana
+
+        Returns:
+            int: Secuencia asignada a la trama
+        """
+        with self._cond:
+            has_room = self._cond.wait_for(
+                lambda: self._closed or len(self._inflight) < self.window, timeout=timeout
+            )
+            if self._closed:
+                raise StreamClosedError(str(self.error) if self.error else "Stream cerrado")
+            if not has_room:
+                raise TimeoutError(f"Ventana de replicación llena hacia {self.grpc_address}")
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            self._inflight[sequence] = token
+        self._outgoing.put(messaging_pb2.ReplicationFrame(sequence=sequence, origin=self._origin, messages=messages))
+        return sequence
+
+    def _read_acks(self):
+        try:
+            for ack in self._call:
+                if ack.status != "SUCCESS":
+                    raise StreamClosedError(ack.message or ack.status)
+                acked = []
+                with self._cond:
+                    while self._inflight and next(iter(self._inflight)) <= ack.acked_sequence:
+                        acked.append(self._inflight.popitem(last=False)[1])
+                    self._cond.notify_all()
+                if acked:
+                    channel_pool.report_success(self.grpc_address)
+                    if self._on_ack is not None:
+                        self._on_ack(acked)
+            raise StreamClosedError(f"Stream cerrado por {self.grpc_address}")
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self.error = error
+            self._cond.notify_all()
+        self._outgoing.put(None)
+        if isinstance(error, grpc.RpcError):
+            channel_pool.report_failure(self.grpc_address, error)
+        logger.warning(f"[{self._origin}] Stream de replicación hacia {self.grpc_address} interrumpido: {str(error)}")
+        if self._on_error is not None:
+            self._on_error(error)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def in_flight(self):
+        with self._cond:
+            return len(self._inflight)
+
+    @property
+    def unimplemented(self):
+        """True si el nodo remoto no ofrece ReplicationStream (versión anterior)."""
+        return isinstance(self.error, grpc.RpcError) and self.error.code() == grpc.StatusCode.UNIMPLEMENTED
+
+    def close(self):
+        """Cierra el stream; las tramas sin confirmar se descartan."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self.error = StreamClosedError("Stream cerrado localmente")
+            self._cond.notify_all()
+        self._outgoing.put(None)
+        self._call.cancel()
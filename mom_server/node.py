@@ -0,0 +1,85 @@
+# mom_server/node.py
+
+"""
+Nodo de proceso único: la API REST (FastAPI) y el servicio gRPC en el mismo proceso.
+
+Ambos comparten un bucle asyncio, la capa de almacenamiento, el pool de canales
+gRPC, los circuit breakers, la tabla de gossip y la caché del catálogo, así que
+cada nodo abre la base de datos desde un solo proceso y no hay contención de
+bloqueos de SQLite entre procesos.
+
+Uso:
+
+    SELF_HOST=localhost:8000 CLUSTER_NODES=localhost:8001,localhost:8002 GRPC_PORT=50051 \\
+        python -m mom_server.node
+
+El puerto de la API se toma de PORT o, si no está definido, de SELF_HOST. Los
+nodos gRPC se toman de GRPC_NODES o se derivan de CLUSTER_NODES.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+import uvicorn
+
+from api.main import app
+from mom_server.config import CLUSTER_NODES, GRPC_PORT, SELF_HOST, api_to_grpc_address
+from mom_server.database import init_db
+from mom_server.db.catalog_cache import catalog_cache
+from mom_server.grpc_services.grpc_server import MessagingService, start_grpc_server, start_background_tasks
+from mom_server.services.audit import audit
+
+logger = logging.getLogger(__name__)
+
+# Margen para que terminen las RPCs en curso al detener el nodo
+GRPC_SHUTDOWN_GRACE = 5
+
+
+def _grpc_nodes():
+    grpc_nodes = [node.strip() for node in os.getenv("GRPC_NODES", "").split(",") if node.strip()]
+    if grpc_nodes:
+        return grpc_nodes
+    return [api_to_grpc_address(node) for node in CLUSTER_NODES if node != SELF_HOST]
+
+
+def _api_port():
+    return int(os.getenv("PORT") or SELF_HOST.rsplit(":", 1)[-1])
+
+
+async def _run(service, grpc_port, grpc_nodes, api_port):
+    # Primero el servidor gRPC, para que el nodo se anuncie ya atendiendo réplicas
+    grpc_server = await start_grpc_server(service, grpc_port)
+    start_background_tasks(grpc_nodes)
+
+    api_server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=api_port))
+    logger.info(f"🚀 API REST escuchando en puerto {api_port} (mismo proceso que gRPC)")
+    try:
+        # uvicorn atiende SIGINT/SIGTERM y termina serve(); después se detiene gRPC
+        await api_server.serve()
+    finally:
+        await grpc_server.stop(GRPC_SHUTDOWN_GRACE)
+
+
+def main():
+    grpc_port = os.getenv("GRPC_PORT", GRPC_PORT)
+    grpc_nodes = _grpc_nodes()
+    api_port = _api_port()
+
+    init_db()
+    # Todas las escrituras del nodo pasan por este proceso: la caché del catálogo es segura
+    catalog_cache.enable()
+
+    try:
+        service = MessagingService(grpc_port, grpc_nodes)
+        asyncio.run(_run(service, grpc_port, grpc_nodes, api_port))
+        service.storage_executor.shutdown(wait=True)
+        audit.stop()
+    except Exception as e:
+        logger.error(f"❌ Error al iniciar el nodo: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
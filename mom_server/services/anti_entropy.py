@@ -0,0 +1,230 @@
+# mom_server/services/anti_entropy.py
+
+"""
+Anti-entropía entre réplicas mediante árboles de hashes por partición.
+
+Cada partición se divide en buckets de MERKLE_BUCKET_SIZE offsets. La hoja de un
+bucket es el XOR de los hashes de sus mensajes y se actualiza en la misma
+transacción que el insert (ver topic_repository). Los nodos internos del árbol
+se calculan a partir de las hojas: el hash de un rango de buckets resume las
+hojas no vacías que contiene.
+
+Periódicamente cada nodo compara sus particiones con las demás réplicas
+responsables: pide los hashes de los rangos nivel a nivel (MERKLE_FANOUT hijos
+por nodo), desciende solo por los rangos que difieren y, al llegar a un bucket
+distinto, trae con FetchSince únicamente los offsets de ese bucket. Cada nodo
+solo trae lo que le falta; la réplica remota hace lo mismo en su propia pasada.
+
+Si un mensaje recibido ya está guardado aquí en otro offset, gana el líder de la
+partición: la copia local se sustituye cuando el mensaje viene de él, y si viene
+de otra réplica se deja como está (se avisa una sola vez), porque ambas acabarán
+coincidiendo con el líder.
+"""
+
+import bisect
+import hashlib
+import logging
+import os
+import threading
+
+from mom_server.config import (
+    CLUSTER_NODES, PARTITIONING_ENABLED, api_to_grpc_address,
+    MERKLE_BUCKET_SIZE, MERKLE_FANOUT, ANTI_ENTROPY_INTERVAL, CATCHUP_MAX_BYTES, GRPC_RPC_TIMEOUT
+)
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.services.catchup import fetch_since
+from mom_server.services.membership import membership
+from mom_server.services.partitioning import get_responsible_nodes
+from mom_server.services.state import (
+    get_partition_offsets, get_partition_leaves, rebuild_partition_hashes, add_topic_messages_batch,
+    find_moved_messages, replace_topic_messages
+)
+
+logger = logging.getLogger(__name__)
+
+# (tópico, partición, message_id, réplica) de los conflictos ya avisados que no se reparan aquí
+_reported_conflicts = set()
+
+
+class HashTree:
+    """Vista de las hojas de una partición que calcula el hash de cualquier rango de buckets."""
+
+    def __init__(self, leaves):
+        self.buckets = sorted(leaves)
+        self.leaves = leaves
+
+    def range_hash(self, start, end):
+        """Hash de las hojas no vacías en [start, end); cadena vacía si no hay ninguna."""
+        lo = bisect.bisect_left(self.buckets, start)
+        hi = bisect.bisect_left(self.buckets, end)
+        if lo == hi:
+            return ""
+        digest = hashlib.sha256()
+        for bucket in self.buckets[lo:hi]:
+            digest.update(f"{bucket}:{self.leaves[bucket]};".encode("utf-8"))
+        return digest.hexdigest()
+
+
+def split_range(start, end, fanout=MERKLE_FANOUT):
+    """Divide [start, end) en como mucho `fanout` subrangos contiguos."""
+    step = max(1, -(-(end - start) // fanout))
+    return [(lo, min(lo + step, end)) for lo in range(start, end, step)]
+
+
+def _bucket_count(last_offset):
+    return -(-last_offset // MERKLE_BUCKET_SIZE)
+
+
+def get_remote_hashes(grpc_address, topic_name, partition_id, ranges):
+    """
+    Pide a un nodo los hashes de varios rangos de buckets.
+
+    Returns:
+        tuple: (lista de hashes en el orden de `ranges`, último offset remoto)
+    """
+    request = messaging_pb2.RangeHashRequest(
+        topic_name=topic_name, partition=partition_id, bucket_size=MERKLE_BUCKET_SIZE,
+        ranges=[messaging_pb2.BucketRange(start=start, end=end) for start, end in ranges]
+    )
+    response = channel_pool.call(grpc_address, "GetRangeHashes", request, timeout=GRPC_RPC_TIMEOUT)
+    if response.status != "SUCCESS":
+        raise RuntimeError(response.message or response.status)
+    return list(response.hashes), response.last_offset
+
+
+def find_divergent_buckets(grpc_address, topic_name, partition_id, local_last_offset):
+    """
+    Recorre el árbol de hashes contra un nodo remoto.
+
+    Returns:
+        list: Buckets cuyo contenido difiere entre ambos nodos
+    """
+    tree = HashTree(get_partition_leaves(topic_name, partition_id))
+    _, remote_last_offset = get_remote_hashes(grpc_address, topic_name, partition_id, [])
+    total_buckets = _bucket_count(max(local_last_offset, remote_last_offset))
+    if total_buckets == 0:
+        return []
+
+    divergent = []
+    frontier = [(0, total_buckets)]
+    while frontier:
+        remote_hashes, _ = get_remote_hashes(grpc_address, topic_name, partition_id, frontier)
+        next_frontier = []
+        for (start, end), remote_hash in zip(frontier, remote_hashes):
+            if tree.range_hash(start, end) == remote_hash:
+                continue
+            if end - start == 1:
+                divergent.append(start)
+            else:
+                next_frontier.extend(split_range(start, end))
+        frontier = next_frontier
+    return divergent
+
+
+def _is_leader(grpc_address, topic_name, partition_id):
+    """True si el nodo remoto es el primario de la partición (sin particionado no hay líder fijo)."""
+    if not PARTITIONING_ENABLED:
+        return False
+    return api_to_grpc_address(get_responsible_nodes(topic_name, "topic", partition_id)[0]) == grpc_address
+
+
+def _resolve_moved(grpc_address, topic_name, partition_id, moved):
+    """Aplica la versión del líder de los mensajes que aquí están en otro offset."""
+    if _is_leader(grpc_address, topic_name, partition_id):
+        replace_topic_messages(moved)
+        logger.warning(
+            f"🌳 {topic_name}/{partition_id}: {len(moved)} mensajes movidos al offset que tienen en el líder {grpc_address}"
+        )
+        return
+    for message in moved:
+        conflict = (topic_name, partition_id, message["message_id"], grpc_address)
+        if conflict not in _reported_conflicts:
+            _reported_conflicts.add(conflict)
+            logger.warning(
+                f"🌳 {topic_name}/{partition_id}: el mensaje {message['message_id']} está en el offset "
+                f"{message['partition_offset']} en {grpc_address}, que no es el líder; se mantiene la copia local"
+            )
+
+
+def repair_bucket(grpc_address, topic_name, partition_id, bucket):
+    """
+    Trae del nodo remoto los mensajes de un bucket; los ya presentes se ignoran.
+
+    Los que aquí están en otro offset se resuelven a favor del líder (ver _resolve_moved).
+
+    Returns:
+        int: Mensajes recibidos
+    """
+    offset = bucket * MERKLE_BUCKET_SIZE
+    end_offset = offset + MERKLE_BUCKET_SIZE
+    applied = 0
+    while offset < end_offset:
+        messages = fetch_since(grpc_address, topic_name, partition_id, offset, CATCHUP_MAX_BYTES, end_offset)
+        if not messages:
+            break
+        moved = find_moved_messages(messages)
+        if moved:
+            _resolve_moved(grpc_address, topic_name, partition_id, moved)
+        add_topic_messages_batch(messages)
+        applied += len(messages)
+        offset = max(message["partition_offset"] for message in messages)
+    return applied
+
+
+def _replica_addresses(topic_name, partition_id=0):
+    """Direcciones gRPC de las otras réplicas de la partición; vacío si este nodo no es réplica."""
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    nodes = get_responsible_nodes(topic_name, "topic", partition_id) if PARTITIONING_ENABLED else CLUSTER_NODES
+    if PARTITIONING_ENABLED and self_host not in nodes:
+        return []
+    return [
+        grpc_address
+        for grpc_address in (api_to_grpc_address(node) for node in membership.live_nodes(nodes) if node != self_host and node.strip())
+        if grpc_address
+    ]
+
+
+def run_anti_entropy():
+    """
+    Compara todas las particiones locales con sus réplicas y repara las diferencias.
+
+    Returns:
+        int: Mensajes recibidos de los buckets reparados
+    """
+    rebuild_partition_hashes()
+    repaired = 0
+    for (topic_name, partition_id), last_offset in get_partition_offsets().items():
+        for grpc_address in _replica_addresses(topic_name, partition_id):
+            if not channel_pool.is_healthy(grpc_address):
+                continue
+            try:
+                buckets = find_divergent_buckets(grpc_address, topic_name, partition_id, last_offset)
+                for bucket in buckets:
+                    repaired += repair_bucket(grpc_address, topic_name, partition_id, bucket)
+                if buckets:
+                    logger.info(f"🌳 {topic_name}/{partition_id} difiere de {grpc_address} en buckets {buckets}")
+            except Exception as e:
+                logger.warning(f"Error en anti-entropía de {topic_name}/{partition_id} con {grpc_address}: {str(e)}")
+    if repaired:
+        logger.info(f"🌳 Anti-entropía: {repaired} mensajes recibidos de buckets divergentes")
+    return repaired
+
+
+class AntiEntropyWorker(threading.Thread):
+    """Hilo que ejecuta una pasada de anti-entropía cada ANTI_ENTROPY_INTERVAL segundos."""
+
+    def __init__(self, interval=ANTI_ENTROPY_INTERVAL):
+        super().__init__(name="anti-entropy", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                run_anti_entropy()
+            except Exception as e:
+                logger.error(f"Error en pasada de anti-entropía: {str(e)}")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,246 @@
+# mom_server/services/audit.py
+
+"""
+Registro de auditoría estructurado con escritura asíncrona y rotación por tamaño.
+
+`audit.record(...)` solo encola el evento; un hilo escritor mantiene el fichero
+abierto y vuelca los eventos en bloques cada AUDIT_FLUSH_INTERVAL segundos (o
+antes si se acumulan AUDIT_BATCH_SIZE). Cada evento es una línea JSON con marca
+de tiempo, nodo y tipo. Cuando el fichero supera AUDIT_MAX_BYTES se rota a
+`<ruta>.1`, `<ruta>.2`... conservando AUDIT_BACKUP_COUNT copias.
+
+Si la cola se llena, los eventos nuevos se descartan y se cuentan en `dropped`
+en lugar de bloquear a quien los registra.
+
+Consulta desde la línea de comandos:
+
+    python -m mom_server.services.audit --event replicate --name alertas --since 2025-01-01T00:00:00
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from mom_server.config import (
+    AUDIT_ENABLED, AUDIT_LOG_PATH, AUDIT_MAX_BYTES, AUDIT_BACKUP_COUNT,
+    AUDIT_FLUSH_INTERVAL, AUDIT_BATCH_SIZE, AUDIT_QUEUE_SIZE
+)
+from mom_server.database import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def default_audit_path():
+    """Sin AUDIT_LOG_PATH, el registro va junto a la base de datos del nodo."""
+    return AUDIT_LOG_PATH or f"{os.path.splitext(DB_PATH)[0]}-audit.log"
+
+
+class AuditLog:
+    """Cola de eventos de auditoría con un hilo escritor en segundo plano."""
+
+    def __init__(self, path=None, max_bytes=AUDIT_MAX_BYTES, backup_count=AUDIT_BACKUP_COUNT,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, batch_size=AUDIT_BATCH_SIZE, queue_size=AUDIT_QUEUE_SIZE,
+                 enabled=AUDIT_ENABLED):
+        self.path = path or default_audit_path()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self.node = os.getenv("SELF_HOST", "localhost:8000")
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def record(self, event, **fields):
+        """
+        Encola un evento sin bloquear.
+
+        Args:
+            event (str): Tipo de evento (p. ej. "replicate")
+            **fields: Datos del evento; deben ser serializables a JSON
+        """
+        if not self.enabled:
+            return
+        self._ensure_started()
+        entry = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                 "node": self.node, "event": event, **fields}
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(f"Error escribiendo el registro de auditoría en {self.path}: {str(e)}")
+        # Volcar lo que quede al detenerse
+        batch = self._drain()
+        if batch:
+            self._write(batch)
+        self._close_file()
+
+    def _collect(self):
+        """Espera el primer evento y reúne los que lleguen durante el intervalo de volcado."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, batch):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch))
+        self._file.flush()
+        self.written += len(batch)
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """Renombra <ruta>.N-1 -> <ruta>.N ... <ruta> -> <ruta>.1 y abre un fichero nuevo."""
+        self._close_file()
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def flush(self, timeout=5):
+        """Espera a que se escriban los eventos encolados hasta ahora."""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def audit_files(path=None):
+    """Ficheros del registro, del más antiguo al más reciente."""
+    path = path or default_audit_path()
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + "."
+    backups = []
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit():
+                backups.append((int(suffix), os.path.join(directory, name)))
+    files = [file_path for _, file_path in sorted(backups, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_events(path=None, event=None, name=None, since=None, until=None, **fields):
+    """
+    Recorre los eventos del registro (incluidas las copias rotadas) en orden cronológico.
+
+    Args:
+        path (str, optional): Ruta del registro
+        event (str, optional): Solo eventos de este tipo
+        name (str, optional): Solo eventos sobre este tópico o cola
+        since (str, optional): Marca de tiempo ISO mínima
+        until (str, optional): Marca de tiempo ISO máxima
+        **fields: Igualdad exacta sobre otros campos
+
+    Yields:
+        dict: Eventos que cumplen los filtros
+    """
+    for file_path in audit_files(path):
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event is not None and entry.get("event") != event:
+                    continue
+                if name is not None and entry.get("name") != name:
+                    continue
+                if since is not None and entry.get("ts", "") < since:
+                    continue
+                if until is not None and entry.get("ts", "") > until:
+                    continue
+                if any(str(entry.get(key)) != str(value) for key, value in fields.items()):
+                    continue
+                yield entry
+
+
+# Instancia única por proceso
+audit = AuditLog()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Consulta del registro de auditoría')
+    parser.add_argument('--path', default=None, help='Ruta del registro (por defecto, la del nodo actual)')
+    parser.add_argument('--event', default=None, help='Tipo de evento')
+    parser.add_argument('--name', default=None, help='Tópico o cola')
+    parser.add_argument('--target', default=None, help='Nodo destino')
+    parser.add_argument('--status', default=None, help='Resultado (p. ej. SUCCESS, ERROR)')
+    parser.add_argument('--since', default=None, help='Marca de tiempo ISO mínima')
+    parser.add_argument('--until', default=None, help='Marca de tiempo ISO máxima')
+    parser.add_argument('--limit', type=int, default=0, help='Máximo de eventos a mostrar')
+
+    args = parser.parse_args()
+
+    filters = {key: value for key, value in (("target", args.target), ("status", args.status)) if value is not None}
+    shown = 0
+    for entry in read_events(args.path, args.event, args.name, args.since, args.until, **filters):
+        sys.stdout.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        shown += 1
+        if args.limit and shown >= args.limit:
+            break
@@ -0,0 +1,96 @@
+# mom_server/services/catchup.py
+
+"""
+Recuperación de mensajes perdidos al arrancar un nodo.
+
+Tras sincronizar los nombres de tópicos, el nodo consulta su último offset por
+partición y pide a cada réplica disponible, con FetchSince, solo los mensajes
+posteriores. Las llamadas se repiten en tramos de CATCHUP_MAX_BYTES hasta que la
+réplica no tenga nada más; preguntar después a la siguiente réplica solo copia lo
+que la anterior no tenía.
+"""
+
+import logging
+import os
+import threading
+
+from mom_server.config import CATCHUP_MAX_BYTES, GRPC_RPC_TIMEOUT
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.services.messaging import from_envelope
+from mom_server.services.state import get_partition_offsets, add_topic_messages_batch
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_since(grpc_address, topic_name, partition_id, offset, max_bytes=CATCHUP_MAX_BYTES, end_offset=0):
+    """
+    Pide a un nodo los mensajes de una partición posteriores a `offset`
+    (hasta `end_offset` inclusive si se indica).
+
+    Returns:
+        list: Mensajes como diccionarios, en orden de offset
+    """
+    request = messaging_pb2.FetchRequest(
+        topic_name=topic_name, partition=partition_id, offset=offset, max_bytes=max_bytes,
+        end_offset=end_offset, requester=os.getenv("SELF_HOST", "localhost:8000")
+    )
+    with channel_pool.guard(grpc_address) as stub:
+        return [from_envelope(envelope) for envelope in stub.FetchSince(request, timeout=GRPC_RPC_TIMEOUT)]
+
+
+def catch_up_partition(topic_name, partition_id, offset, peers, max_bytes=CATCHUP_MAX_BYTES, throttle=None):
+    """
+    Trae de las réplicas los mensajes de una partición posteriores a `offset`.
+
+    Args:
+        max_bytes (int, optional): Contenido aproximado por llamada a FetchSince
+        throttle (Throttle, optional): Limita el ritmo de la transferencia
+
+    Returns:
+        tuple: (mensajes aplicados, último offset local tras la recuperación)
+    """
+    applied = 0
+    for grpc_address in peers:
+        if not channel_pool.is_healthy(grpc_address):
+            continue
+        try:
+            while True:
+                messages = fetch_since(grpc_address, topic_name, partition_id, offset, max_bytes)
+                if not messages:
+                    break
+                add_topic_messages_batch(messages)
+                applied += len(messages)
+                offset = max(message["partition_offset"] for message in messages)
+                if throttle is not None:
+                    throttle.consume(sum(len(message["content"].encode("utf-8")) for message in messages))
+        except Exception as e:
+            logger.warning(f"Error recuperando {topic_name}/{partition_id} desde {grpc_address}: {str(e)}")
+    return applied, offset
+
+
+def catch_up(peers):
+    """
+    Recupera todas las particiones locales desde las réplicas indicadas.
+
+    Args:
+        peers (list): Direcciones gRPC de los otros nodos
+
+    Returns:
+        int: Total de mensajes aplicados
+    """
+    total = 0
+    for (topic_name, partition_id), offset in get_partition_offsets().items():
+        applied, last_offset = catch_up_partition(topic_name, partition_id, offset, peers)
+        if applied:
+            logger.info(f"🔄 {topic_name}/{partition_id}: {applied} mensajes recuperados (offset {offset} -> {last_offset})")
+        total += applied
+    logger.info(f"Recuperación al arranque completada: {total} mensajes")
+    return total
+
+
+def start_catch_up(peers):
+    """Lanza la recuperación en segundo plano para no retrasar el arranque del servidor."""
+    thread = threading.Thread(target=catch_up, args=(peers,), name="catch-up", daemon=True)
+    thread.start()
+    return thread
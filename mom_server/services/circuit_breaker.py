@@ -0,0 +1,177 @@
+# mom_server/services/circuit_breaker.py
+
+"""
+Circuit breakers por nodo, compartidos por el reenvío HTTP y la replicación gRPC.
+
+Cada nodo remoto tiene un breaker con tres estados:
+
+- cerrado: las llamadas pasan; se registran sus resultados en una ventana de las
+  últimas CIRCUIT_WINDOW_SIZE llamadas. Una llamada que tarda más de
+  CIRCUIT_SLOW_CALL_THRESHOLD cuenta como mala aunque termine bien.
+- abierto: se alcanzó CIRCUIT_FAILURE_THRESHOLD fallos consecutivos o una tasa de
+  llamadas malas >= CIRCUIT_FAILURE_RATE (con al menos CIRCUIT_MIN_CALLS en la
+  ventana). Las llamadas se rechazan al instante con CircuitOpenError.
+- semiabierto: pasado CIRCUIT_RESET_TIMEOUT se deja pasar una única llamada de
+  prueba; si va bien el breaker se cierra y si falla vuelve a abrirse.
+
+Así un nodo que falla cuesta una llamada de prueba por intervalo en vez de un
+timeout por petición.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from mom_server.config import (
+    api_to_grpc_address,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_FAILURE_RATE, CIRCUIT_SLOW_CALL_THRESHOLD,
+    CIRCUIT_WINDOW_SIZE, CIRCUIT_MIN_CALLS, CIRCUIT_RESET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """El breaker del nodo está abierto; la llamada no se intenta."""
+
+
+class CircuitBreaker:
+    """Breaker de un nodo remoto."""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, failure_rate=CIRCUIT_FAILURE_RATE,
+                 slow_call_threshold=CIRCUIT_SLOW_CALL_THRESHOLD, window_size=CIRCUIT_WINDOW_SIZE,
+                 min_calls=CIRCUIT_MIN_CALLS, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.slow_call_threshold = slow_call_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.last_error = None
+        # True = llamada mala (fallo o lenta)
+        self._outcomes = deque(maxlen=window_size)
+        self._probe_started_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Indica si una llamada puede intentarse. En semiabierto reserva la única
+        llamada de prueba, así que quien recibe True debe registrar el resultado.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_started_at = None
+                logger.info(f"Circuit breaker de {self.name} semiabierto: se permite una llamada de prueba")
+            # Semiabierto: una sola prueba a la vez; si nunca informa, se permite otra tras el intervalo
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+                return False
+            self._probe_started_at = now
+            return True
+
+    def before_call(self):
+        """Lanza CircuitOpenError si la llamada no debe intentarse."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker abierto para {self.name} (último error: {self.last_error})")
+
+    def available(self):
+        """Como `allow` pero sin reservar la llamada de prueba; para decidir si merece la pena intentarlo."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return True
+
+    def record_success(self, latency=None):
+        slow = latency is not None and latency > self.slow_call_threshold
+        with self._lock:
+            self.consecutive_failures = 0
+            self._outcomes.append(slow)
+            if self.state == HALF_OPEN:
+                if slow:
+                    self._open(f"llamada de prueba lenta ({latency:.2f}s)")
+                else:
+                    self._close()
+            elif self.state == CLOSED and slow:
+                self._check_rate()
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            self._outcomes.append(True)
+            if self.state == HALF_OPEN:
+                self._open("falló la llamada de prueba")
+            elif self.state == CLOSED:
+                if self.consecutive_failures >= self.failure_threshold:
+                    self._open(f"{self.consecutive_failures} fallos consecutivos")
+                else:
+                    self._check_rate()
+
+    def _check_rate(self):
+        if len(self._outcomes) < self.min_calls:
+            return
+        rate = sum(self._outcomes) / len(self._outcomes)
+        if rate >= self.failure_rate:
+            self._open(f"{rate:.0%} de llamadas fallidas o lentas")
+
+    def _open(self, reason):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_started_at = None
+        logger.warning(f"Circuit breaker de {self.name} abierto: {reason}")
+
+    def _close(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._outcomes.clear()
+        self._probe_started_at = None
+        logger.info(f"Circuit breaker de {self.name} cerrado: el nodo responde de nuevo")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "bad_call_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "times_opened": self.times_opened,
+                "last_error": self.last_error
+            }
+
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_breaker(grpc_address):
+    """Breaker del nodo, identificado por su dirección gRPC (la misma clave que el pool de canales)."""
+    with _lock:
+        breaker = _breakers.get(grpc_address)
+        if breaker is None:
+            breaker = _breakers[grpc_address] = CircuitBreaker(grpc_address)
+        return breaker
+
+
+def breaker_for_node(node):
+    """Breaker de un nodo identificado por su dirección API."""
+    return get_breaker(api_to_grpc_address(node) or node)
+
+
+def breakers_snapshot():
+    with _lock:
+        breakers = dict(_breakers)
+    return {address: breaker.snapshot() for address, breaker in breakers.items()}
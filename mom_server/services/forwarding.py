@@ -0,0 +1,64 @@
+# mom_server/services/forwarding.py
+
+"""
+Reenvío HTTP de solicitudes entre nodos de la API.
+
+Todas las redirecciones al nodo primario y las consultas a otros nodos pasan por
+`forward`, que reutiliza conexiones con una sesión compartida y consulta, antes de
+llamar, al detector de fallos y al circuit breaker del nodo (el mismo que usa la
+replicación gRPC). Si alguno de los dos descarta al nodo, la excepción se lanza al
+instante y el router aplica su alternativa local sin esperar un timeout.
+"""
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mom_server.config import FORWARD_TIMEOUT, FORWARD_POOL_SIZE
+from mom_server.services.circuit_breaker import breaker_for_node
+from mom_server.services.membership import ensure_alive
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=FORWARD_POOL_SIZE, pool_maxsize=FORWARD_POOL_SIZE)
+_session.mount("http://", _adapter)
+
+# Códigos HTTP que cuentan como fallo de transporte para el circuit breaker
+_UNREACHABLE_STATUS = (502, 504)
+
+
+def forward(method, node, path, timeout=FORWARD_TIMEOUT, **kwargs):
+    """
+    Envía una solicitud HTTP a otro nodo de la API.
+
+    Args:
+        method (str): Método HTTP ("GET", "POST", "DELETE"...)
+        node (str): Dirección API del nodo destino
+        path (str): Ruta de la solicitud, empezando por "/"
+        timeout (float): Plazo máximo de la solicitud
+        **kwargs: Argumentos adicionales de `requests` (params, json...)
+
+    Returns:
+        requests.Response: Respuesta del nodo
+
+    Raises:
+        PeerUnavailableError: El detector de fallos considera caído al nodo
+        CircuitOpenError: El circuit breaker del nodo está abierto
+        requests.RequestException: La solicitud falló
+    """
+    ensure_alive(node)
+    breaker = breaker_for_node(node)
+    breaker.before_call()
+    started = time.monotonic()
+    try:
+        response = _session.request(method, f"http://{node}{path}", timeout=timeout, **kwargs)
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    # Solo 502/504 indican que el nodo no responde; un 500 o 503 de la aplicación
+    # (o cualquier 4xx) significa que el nodo está vivo y no debe abrir el circuito
+    if response.status_code in _UNREACHABLE_STATUS:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success(time.monotonic() - started)
+    return response
@@ -0,0 +1,275 @@
+# mom_server/services/membership.py
+
+"""
+Pertenencia al clúster por gossip con detector de fallos phi-accrual.
+
+El proceso gRPC de cada nodo es quien anuncia al nodo: cada GOSSIP_INTERVAL
+incrementa su contador de latidos y envía su tabla (nodo, generación, versión)
+a GOSSIP_FANOUT nodos, que responden con la suya. Cuando la versión conocida de
+un nodo avanza, ya sea directamente o a través de otro, se registra un latido en
+su detector.
+
+El detector phi-accrual estima la distribución de los intervalos entre latidos y
+devuelve phi = -log10(P(el siguiente latido llegue aún más tarde)); un nodo se
+considera caído cuando phi supera PHI_THRESHOLD. Así el enrutado y la replicación
+consultan `is_alive` en memoria en vez de esperar un timeout por petición.
+
+El proceso de la API participa como observador: consulta las tablas de los
+nodos (incluido el gRPC local) sin anunciarse a sí mismo.
+"""
+
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from mom_server.config import (
+    CLUSTER_NODES, api_to_grpc_address,
+    GOSSIP_INTERVAL, GOSSIP_FANOUT, PHI_THRESHOLD, PHI_MIN_STD_DEV, PHI_ACCEPTABLE_PAUSE, PHI_WINDOW_SIZE
+)
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+
+logger = logging.getLogger(__name__)
+
+
+class PeerUnavailableError(RuntimeError):
+    """El detector de fallos considera caído al nodo; no se intenta la llamada."""
+
+
+class PhiAccrualDetector:
+    """Detector phi-accrual sobre los intervalos entre latidos de un nodo."""
+
+    def __init__(self, expected_interval=GOSSIP_INTERVAL, min_std_dev=PHI_MIN_STD_DEV,
+                 acceptable_pause=PHI_ACCEPTABLE_PAUSE, window_size=PHI_WINDOW_SIZE):
+        self.min_std_dev = min_std_dev
+        self.acceptable_pause = acceptable_pause
+        self.intervals = deque(maxlen=window_size)
+        self.last_heartbeat = None
+        # Estimación inicial para que el primer latido ya permita calcular phi
+        self.intervals.extend([expected_interval - expected_interval / 4, expected_interval + expected_interval / 4])
+
+    def heartbeat(self, now=None):
+        now = now if now is not None else time.monotonic()
+        if self.last_heartbeat is not None:
+            self.intervals.append(now - self.last_heartbeat)
+        self.last_heartbeat = now
+
+    def phi(self, now=None):
+        if self.last_heartbeat is None:
+            return 0.0
+        now = now if now is not None else time.monotonic()
+        elapsed = now - self.last_heartbeat
+        mean = sum(self.intervals) / len(self.intervals)
+        variance = sum((interval - mean) ** 2 for interval in self.intervals) / len(self.intervals)
+        std_dev = max(math.sqrt(variance), self.min_std_dev)
+        mean += self.acceptable_pause
+        # Aproximación logística de la CDF normal (la misma que usa Akka)
+        y = (elapsed - mean) / std_dev
+        exponent = -y * (1.5976 + 0.070566 * y * y)
+        # phi = -log10(e / (1 + e)) con e = exp(exponent), en forma que no desborde
+        if exponent < 0:
+            return -exponent / math.log(10) + math.log10(1.0 + math.exp(exponent))
+        return math.log10(1.0 + math.exp(-exponent))
+
+
+class MemberState:
+    """Lo que este proceso sabe de un nodo: generación, versión y detector."""
+
+    def __init__(self, node):
+        self.node = node
+        self.generation = 0
+        self.version = 0
+        self.detector = PhiAccrualDetector()
+        self.alive = True
+
+
+class Membership:
+    """Vista del clúster mantenida por gossip."""
+
+    def __init__(self, self_node, peers):
+        self.self_node = self_node
+        self.peers = [peer for peer in peers if peer and peer != self_node]
+        self.generation = int(time.time() * 1000)
+        self.version = 0
+        self.announce = False
+        self._members = {peer: MemberState(peer) for peer in self.peers}
+        # Cambia cada vez que se descubre un nodo nuevo; el mapa de particiones se reconstruye con ella
+        self.members_version = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, announce=False):
+        """
+        Arranca las rondas de gossip.
+
+        Args:
+            announce (bool): True en el proceso gRPC, que anuncia al nodo; False en
+                procesos observadores (API), que solo leen las tablas de los demás
+        """
+        if self._thread is not None:
+            return
+        self.announce = announce
+        self._thread = threading.Thread(target=self._run, name="gossip", daemon=True)
+        self._thread.start()
+        logger.info(f"Gossip iniciado para {self.self_node} (anuncia: {announce}) con nodos {self.peers}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def add_listener(self, callback):
+        """Registra `callback(node, alive)`, que se invoca cuando un nodo cambia de estado."""
+        self._listeners.append(callback)
+
+    def _run(self):
+        while not self._stop_event.wait(GOSSIP_INTERVAL):
+            try:
+                self.gossip_round()
+                self._check_transitions()
+            except Exception as e:
+                logger.error(f"Error en ronda de gossip: {str(e)}")
+
+    def _targets(self):
+        targets = random.sample(self.peers, min(GOSSIP_FANOUT, len(self.peers)))
+        if not self.announce:
+            # El observador también lee la tabla del gRPC local, que conoce a todos los nodos
+            targets.append(self.self_node)
+        return targets
+
+    def gossip_round(self):
+        """Envía la tabla local a algunos nodos sin bloquear; las respuestas se fusionan al llegar."""
+        if self.announce:
+            with self._lock:
+                self.version += 1
+        request = messaging_pb2.GossipMessage(
+            sender=self.self_node if self.announce else "", members=self.digest()
+        )
+        for node in self._targets():
+            grpc_address = api_to_grpc_address(node)
+            if not grpc_address:
+                continue
+            future = channel_pool.get_stub(grpc_address).Gossip.future(request, timeout=GOSSIP_INTERVAL * 2)
+            future.add_done_callback(self._on_response)
+
+    def _on_response(self, future):
+        if future.exception() is None:
+            self.merge(future.result().members)
+
+    def digest(self):
+        """Tabla local como lista de MemberState de protobuf."""
+        with self._lock:
+            members = [
+                messaging_pb2.MemberState(node=state.node, generation=state.generation, version=state.version)
+                for state in self._members.values() if state.generation
+            ]
+            if self.announce:
+                members.append(messaging_pb2.MemberState(
+                    node=self.self_node, generation=self.generation, version=self.version
+                ))
+        return members
+
+    def merge(self, members):
+        """Incorpora una tabla recibida; cada versión nueva de un nodo cuenta como latido."""
+        now = time.monotonic()
+        with self._lock:
+            for member in members:
+                if member.node == self.self_node and self.announce:
+                    continue
+                state = self._members.get(member.node)
+                if state is None:
+                    state = self._members[member.node] = MemberState(member.node)
+                    # El observador también recibe la entrada del propio nodo; no es un miembro nuevo
+                    if member.node != self.self_node:
+                        self.members_version += 1
+                        logger.info(f"Nodo {member.node} descubierto por gossip")
+                if (member.generation, member.version) > (state.generation, state.version):
+                    if member.generation != state.generation:
+                        # Nodo reiniciado: los intervalos anteriores ya no sirven
+                        state.detector = PhiAccrualDetector()
+                    state.generation = member.generation
+                    state.version = member.version
+                    state.detector.heartbeat(now)
+
+    def _check_transitions(self):
+        changes = []
+        with self._lock:
+            for state in self._members.values():
+                alive = state.detector.phi() < PHI_THRESHOLD
+                if alive != state.alive:
+                    state.alive = alive
+                    changes.append((state.node, alive))
+        for node, alive in changes:
+            logger.warning(f"Nodo {node} {'disponible' if alive else 'caído'} según el detector de fallos")
+            for callback in self._listeners:
+                try:
+                    callback(node, alive)
+                except Exception as e:
+                    logger.error(f"Error notificando cambio de estado de {node}: {str(e)}")
+
+    def phi(self, node):
+        with self._lock:
+            state = self._members.get(node)
+            return state.detector.phi() if state is not None else 0.0
+
+    def is_alive(self, node):
+        """El nodo local y los nodos de los que aún no se sabe nada se consideran vivos."""
+        if node == self.self_node:
+            return True
+        return self.phi(node) < PHI_THRESHOLD
+
+    def member_nodes(self):
+        """Nodos conocidos del clúster, incluido el local, vivos o no."""
+        with self._lock:
+            return [self.self_node] + [node for node in self._members if node != self.self_node]
+
+    def departed_nodes(self, grace):
+        """Nodos sin latidos desde hace más de `grace` segundos: se consideran fuera del clúster."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                state.node for state in self._members.values()
+                if state.detector.last_heartbeat is not None and now - state.detector.last_heartbeat > grace
+            ]
+
+    def current_nodes(self, down_grace):
+        """
+        Nodos que forman el clúster, ordenados: los conocidos menos los que llevan más
+        de `down_grace` segundos sin latidos (0 = ninguno se da por salido).
+        """
+        departed = set(self.departed_nodes(down_grace)) if down_grace > 0 else set()
+        return sorted(node for node in self.member_nodes() if node not in departed)
+
+    def live_nodes(self, nodes):
+        return [node for node in nodes if self.is_alive(node)]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                state.node: {
+                    "alive": state.detector.phi(now) < PHI_THRESHOLD,
+                    "phi": round(state.detector.phi(now), 3),
+                    "generation": state.generation,
+                    "version": state.version,
+                    "last_heartbeat_ago": (
+                        round(now - state.detector.last_heartbeat, 3)
+                        if state.detector.last_heartbeat is not None else None
+                    )
+                }
+                for state in self._members.values()
+            }
+
+
+# Instancia única por proceso
+membership = Membership(os.getenv("SELF_HOST", "localhost:8000"), CLUSTER_NODES)
+
+
+def ensure_alive(node):
+    """Lanza PeerUnavailableError si el detector considera caído al nodo."""
+    if not membership.is_alive(node):
+        raise PeerUnavailableError(f"Nodo {node} marcado como caído (phi={membership.phi(node):.1f})")
@@ -2,488 +2,356 @@
 
 from pydantic import BaseModel
 from api.routers.auth import verify_token
-import grpc
-from mom_server.config import CLUSTER_NODES, api_to_grpc_address, SELF_HOST
-from mom_server.grpc_services import messaging_pb2, messaging_pb2_grpc
+from mom_server.config import (
+    CLUSTER_NODES, api_to_grpc_address, SELF_HOST, GRPC_RPC_TIMEOUT,
+    REPLICATION_FANOUT_WORKERS, REPLICATION_PEER_DEADLINE, REPLICATION_REQUIRED_ACKS
+)
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.services.membership import membership
+from mom_server.services.circuit_breaker import CircuitOpenError
+from mom_server.services.state import format_timestamp, parse_timestamp
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import os
 import logging
 import time
+import uuid
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# AÑADIR NUEVA FUNCIÓN para particionamiento
-def replicate_topic_to_specific_nodes(topic_name: str, owner: str, target_nodes: list):
-    """Replica la creación de un tópico a nodos específicos del clúster."""
+MAX_RETRIES = 3
+
+# Versión del formato de MessageEnvelope que produce y entiende este nodo
+ENVELOPE_VERSION = 1
+
+# Pool compartido para enviar réplicas a varios nodos a la vez
+_replication_executor = ThreadPoolExecutor(
+    max_workers=REPLICATION_FANOUT_WORKERS, thread_name_prefix="replication"
+)
+
+def _target_addresses(target_nodes: list):
+    """Devuelve pares (nodo, dirección gRPC) de los nodos destino, excluyendo el nodo local."""
     self_host = os.getenv("SELF_HOST", "localhost:8000")
+    addresses = []
     for node in target_nodes:
         if node == self_host or not node.strip():
             continue
+        if not membership.is_alive(node):
+            logger.warning(f"[{self_host}] Omitiendo {node}: caído según el detector de fallos")
+            continue
         grpc_address = api_to_grpc_address(node)
         if not grpc_address:
             logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
             continue
-            
+        addresses.append((node, grpc_address))
+    return addresses
+
+def _send_with_retries(grpc_address: str, description: str, send):
+    """
+    Ejecuta `send(stub)` sobre el canal reutilizable del nodo, con reintentos.
+
+    Returns:
+        La respuesta del RPC, o None si todos los intentos fallaron
+    """
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    for attempt in range(MAX_RETRIES):
+        logger.info(f"[{self_host}] Intento {attempt+1} de {description} en {grpc_address}")
+        try:
+            with channel_pool.guard(grpc_address) as stub:
+                return send(stub)
+        except CircuitOpenError as e:
+            logger.warning(f"[{self_host}] Se omite {description} en {grpc_address}: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"[{self_host}] Error al {description} en {grpc_address} (intento {attempt+1}): {str(e)}")
+            if attempt < MAX_RETRIES - 1:
+                time.sleep(1)
+    return None
+
+def to_envelope(message: dict):
+    """Construye el MessageEnvelope de un mensaje de tópico expresado como diccionario."""
+    return messaging_pb2.MessageEnvelope(
+        version=ENVELOPE_VERSION,
+        message_id=message["message_id"],
+        topic_name=message["topic_name"],
+        partition=message.get("partition_id", 0),
+        offset=message.get("partition_offset") or 0,
+        timestamp_ms=parse_timestamp(message.get("timestamp")),
+        headers=message.get("headers") or {},
+        sender=message["sender"],
+        payload=message["content"].encode("utf-8")
+    )
+
+def from_envelope(envelope) -> dict:
+    """
+    Convierte un MessageEnvelope recibido al diccionario que usan los repositorios.
+
+    Raises:
+        ValueError: El sobre es de una versión posterior a ENVELOPE_VERSION
+    """
+    if envelope.version > ENVELOPE_VERSION:
+        raise ValueError(f"Versión de sobre no soportada: {envelope.version} (máxima {ENVELOPE_VERSION})")
+    return {
+        "message_id": envelope.message_id,
+        "topic_name": envelope.topic_name,
+        "partition_id": envelope.partition,
+        "partition_offset": envelope.offset or None,
+        "timestamp": format_timestamp(envelope.timestamp_ms) if envelope.timestamp_ms else None,
+        "headers": dict(envelope.headers),
+        "sender": envelope.sender,
+        "content": envelope.payload.decode("utf-8")
+    }
+
+def _send_batch(stub, messages: list, timeout: float = GRPC_RPC_TIMEOUT):
+    """Envía un lote de mensajes de tópico con ReplicateBatch y devuelve los identificadores confirmados."""
+    req = messaging_pb2.ReplicateBatchRequest(
+        origin=os.getenv("SELF_HOST", "localhost:8000"),
+        messages=[to_envelope(message) for message in messages]
+    )
+    response = stub.ReplicateBatch(req, timeout=timeout)
+    if response.status != "SUCCESS":
+        raise RuntimeError(f"Lote rechazado: {response.message or response.status}")
+    return list(response.acked_ids)
+
+def _replicate_message_to_node(grpc_address: str, message: dict, expires_at: float):
+    """
+    Reintenta la replicación de un mensaje contra un nodo hasta que venza su plazo.
+
+    Returns:
+        bool: True si el nodo confirmó el mensaje dentro del plazo
+    """
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    topic_name = message["topic_name"]
+    backoff = 0.1
+    attempt = 0
+    while True:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            logger.error(f"[{self_host}] Plazo agotado replicando mensaje de '{topic_name}' a {grpc_address} tras {attempt} intentos")
+            return False
+        attempt += 1
+        try:
+            with channel_pool.guard(grpc_address) as stub:
+                _send_batch(stub, [message], timeout=remaining)
+            logger.info(f"[{self_host}] Mensaje replicado a {grpc_address}")
+            return True
+        except CircuitOpenError as e:
+            # El outbox lo entregará cuando el nodo vuelva; no tiene sentido agotar el plazo
+            logger.warning(f"[{self_host}] Se omite la replicación de '{topic_name}' a {grpc_address}: {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"[{self_host}] Error replicando mensaje de '{topic_name}' a {grpc_address} (intento {attempt}): {str(e)}")
+            time.sleep(min(backoff, max(expires_at - time.monotonic(), 0)))
+            backoff *= 2
+
+def send_topic_messages_to_node(node: str, messages: list, timeout: float = GRPC_RPC_TIMEOUT):
+    """
+    Entrega un lote de mensajes de tópico a un único nodo, sin reintentos.
+
+    Lanza una excepción si la entrega falla; la usan los emisores del outbox,
+    que gestionan sus propios reintentos.
+
+    Returns:
+        list: Identificadores de mensaje confirmados por el nodo
+    """
+    grpc_address = api_to_grpc_address(node)
+    if not grpc_address:
+        raise ValueError(f"No se pudo obtener dirección gRPC para {node}")
+    with channel_pool.guard(grpc_address) as stub:
+        return _send_batch(stub, messages, timeout=timeout)
+
+def send_queue_events_to_node(node: str, events: list, timeout: float = GRPC_RPC_TIMEOUT):
+    """
+    Entrega un lote de eventos de cola (encolado y ack) a un único nodo, sin reintentos.
+
+    Lanza una excepción si la entrega falla; la usan los emisores del outbox.
+    """
+    grpc_address = api_to_grpc_address(node)
+    if not grpc_address:
+        raise ValueError(f"No se pudo obtener dirección gRPC para {node}")
+    req = messaging_pb2.QueueEventBatch(
+        origin=os.getenv("SELF_HOST", "localhost:8000"),
+        events=[
+            messaging_pb2.QueueEvent(
+                event=event["event"], queue_name=event["queue_name"], message_id=event["message_id"],
+                sender=event.get("sender", ""), content=event.get("content", ""),
+                timestamp=event.get("timestamp") or ""
+            )
+            for event in events
+        ]
+    )
+    response = channel_pool.call(grpc_address, "ApplyQueueEvents", req, timeout=timeout)
+    if response.status != "SUCCESS":
+        raise RuntimeError(f"Eventos de cola rechazados: {response.message or response.status}")
+    return response.applied
+
+def resolve_required_acks(required_acks, replica_count: int) -> int:
+    """Convierte "all" o un número de confirmaciones al número efectivo para `replica_count` réplicas."""
+    if required_acks is None:
+        required_acks = REPLICATION_REQUIRED_ACKS
+    if str(required_acks).lower() == "all":
+        return replica_count
+    return max(0, min(int(required_acks), replica_count))
+
+# AÑADIR NUEVA FUNCIÓN para particionamiento
+def replicate_topic_to_specific_nodes(topic_name: str, owner: str, target_nodes: list, acks: str = None,
+                                      partitions: int = 1):
+    """Replica la creación de un tópico a nodos específicos del clúster."""
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    req = messaging_pb2.TopicRequest(name=topic_name, owner=owner, acks=acks or "", origin=self_host, hops=1,
+                                     partitions=partitions)
+    for _, grpc_address in _target_addresses(target_nodes):
         logger.info(f"[{self_host}] Replicando tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar '{topic_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.TopicRequest(name=topic_name, owner=owner)
-                response = stub.CreateTopic(req, timeout=5)
-                if response.status == "ERROR" and "Tópico ya existe" in response.message:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' ya existe en {grpc_address}, replicado")
-                else:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' replicado a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando tópico a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+        response = _send_with_retries(
+            grpc_address, f"replicar '{topic_name}'",
+            lambda stub: stub.CreateTopic(req, timeout=GRPC_RPC_TIMEOUT)
+        )
+        if response is None:
+            continue
+        if response.status == "ERROR" and "Tópico ya existe" in response.message:
+            logger.info(f"[{self_host}] Tópico '{topic_name}' ya existe en {grpc_address}, replicado")
+        else:
+            logger.info(f"[{self_host}] Tópico '{topic_name}' replicado a {grpc_address}: {response.status}")
 
 # AÑADIR NUEVA FUNCIÓN para particionamiento con eliminación de tópicos
 def replicate_topic_deletion_to_specific_nodes(topic_name: str, owner: str, target_nodes: list):
     """Replica la eliminación de un tópico a nodos específicos del clúster."""
     self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in target_nodes:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
+    req = messaging_pb2.TopicRequest(name=topic_name, owner=owner, origin=self_host, hops=1)
+    for _, grpc_address in _target_addresses(target_nodes):
         logger.info(f"[{self_host}] Replicando eliminación de tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de eliminar réplica de '{topic_name}' en {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.TopicRequest(name=topic_name, owner=owner)
-                response = stub.DeleteTopic(req, timeout=5)
-                if response.status == "ERROR" and "Tópico no existe" in response.message:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' ya no existe en {grpc_address}, considerado eliminado")
-                else:
-                    logger.info(f"[{self_host}] Eliminación de tópico replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error eliminando réplica de tópico en {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+        response = _send_with_retries(
+            grpc_address, f"eliminar réplica de '{topic_name}'",
+            lambda stub: stub.DeleteTopic(req, timeout=GRPC_RPC_TIMEOUT)
+        )
+        if response is None:
+            continue
+        if response.status == "ERROR" and "Tópico no existe" in response.message:
+            logger.info(f"[{self_host}] Tópico '{topic_name}' ya no existe en {grpc_address}, considerado eliminado")
+        else:
+            logger.info(f"[{self_host}] Eliminación de tópico replicada a {grpc_address}: {response.status}")
+
+def _notify_ack(future, node: str, on_ack):
+    if future.exception() is None and future.result():
+        try:
+            on_ack(node)
+        except Exception as e:
+            logger.error(f"Error procesando confirmación de {node}: {str(e)}")
 
 # AÑADIR NUEVA FUNCIÓN para particionamiento de mensajes
-def replicate_message_to_specific_nodes(topic_name: str, sender: str, content: str, target_nodes: list):
-    """Replica un mensaje a nodos específicos del clúster."""
+def replicate_message_to_specific_nodes(topic_name: str, sender: str, content: str, target_nodes: list,
+                                        required_acks=None, deadline: float = REPLICATION_PEER_DEADLINE,
+                                        message_id: str = None, on_ack=None, partition_id: int = 0,
+                                        partition_offset: int = None, timestamp: str = None, headers: dict = None):
+    """
+    Replica un mensaje a nodos específicos del clúster en paralelo.
+
+    Cada réplica tiene su propio plazo de `deadline` segundos. La función retorna en
+    cuanto confirman `required_acks` réplicas ("all" o un número); los envíos
+    restantes continúan en segundo plano hasta su plazo. Si se indica `on_ack`, se
+    invoca con el nodo cada vez que una réplica confirma, incluso después de retornar.
+    `partition_id`, `partition_offset`, `timestamp` y `headers` propagan el registro
+    guardado por el líder.
+
+    Returns:
+        list: Nodos que confirmaron el mensaje antes de retornar
+    """
     self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in target_nodes:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
+    targets = _target_addresses(target_nodes)
+    if not targets:
+        return []
+    required = resolve_required_acks(required_acks, len(targets))
+    message = {
+        "message_id": message_id or uuid.uuid4().hex,
+        "topic_name": topic_name,
+        "partition_id": partition_id,
+        "partition_offset": partition_offset,
+        "timestamp": timestamp,
+        "headers": headers,
+        "sender": sender,
+        "content": content
+    }
+    expires_at = time.monotonic() + deadline
+    pending = {}
+    for node, grpc_address in targets:
         logger.info(f"[{self_host}] Replicando mensaje de tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar mensaje de '{topic_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.MessageRequest(topic_name=topic_name, sender=sender, content=content)
-                try:
-                    response = stub.ReplicateMessage(req, timeout=5)
-                    if response.status == "TOPIC_NOT_FOUND":
-                        logger.info(f"[{self_host}] Tópico '{topic_name}' no encontrado en {grpc_address}, creando...")
-                        create_req = messaging_pb2.TopicRequest(name=topic_name, owner=sender)
-                        create_resp = stub.CreateTopic(create_req, timeout=5)
-                        logger.info(f"[{self_host}] Creación de tópico en {grpc_address}: {create_resp.status}")
-                        response = stub.ReplicateMessage(req, timeout=5)
-                        if response.status == "TOPIC_NOT_FOUND":
-                            logger.error(f"[{self_host}] Aún no se encontró el tópico '{topic_name}' en {grpc_address} tras creación")
-                            continue
-                    logger.info(f"[{self_host}] Mensaje replicado a {grpc_address}")
+        future = _replication_executor.submit(
+            _replicate_message_to_node, grpc_address, message, expires_at
+        )
+        pending[future] = node
+        if on_ack is not None:
+            future.add_done_callback(lambda f, node=node: _notify_ack(f, node, on_ack))
+
+    acked = []
+    if required == 0:
+        return acked
+    try:
+        for future in as_completed(pending, timeout=deadline):
+            if future.result():
+                acked.append(pending[future])
+                if len(acked) >= required:
                     break
-                except Exception as inner_e:
-                    logger.error(f"[{self_host}] Error en llamada RPC: {str(inner_e)}")
-                    if attempt == max_retries - 1:
-                        try:
-                            create_req = messaging_pb2.TopicRequest(name=topic_name, owner=sender)
-                            stub.CreateTopic(create_req, timeout=5)
-                            response = stub.ReplicateMessage(req, timeout=5)
-                            logger.info(f"[{self_host}] Mensaje replicado a {grpc_address} tras crear tópico")
-                            break
-                        except Exception as final_e:
-                            logger.error(f"[{self_host}] Error final al replicar mensaje: {str(final_e)}")
-                finally:
-                    channel.close()
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando mensaje a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
+    except FuturesTimeoutError:
+        pass
+    if len(acked) < required:
+        logger.warning(f"[{self_host}] Mensaje de '{topic_name}' confirmado por {len(acked)}/{required} réplicas requeridas")
+    return acked
 
 # AÑADIR NUEVA FUNCIÓN para particionamiento de colas
 def replicate_queue_to_specific_nodes(queue_name: str, owner: str, target_nodes: list):
     """Replica la creación de una cola a nodos específicos del clúster."""
     self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in target_nodes:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
+    req = messaging_pb2.QueueRequest(name=queue_name, owner=owner, origin=self_host, hops=1)
+    for _, grpc_address in _target_addresses(target_nodes):
         logger.info(f"[{self_host}] Replicando cola '{queue_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar cola '{queue_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.QueueRequest(name=queue_name, owner=owner)
-                response = stub.CreateQueue(req, timeout=5)
-                if response.status == "ERROR" and "Cola ya existe" in response.message:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' ya existe en {grpc_address}, replicada")
-                else:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando cola a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+        response = _send_with_retries(
+            grpc_address, f"replicar cola '{queue_name}'",
+            lambda stub: stub.CreateQueue(req, timeout=GRPC_RPC_TIMEOUT)
+        )
+        if response is None:
+            continue
+        if response.status == "ERROR" and "Cola ya existe" in response.message:
+            logger.info(f"[{self_host}] Cola '{queue_name}' ya existe en {grpc_address}, replicada")
+        else:
+            logger.info(f"[{self_host}] Cola '{queue_name}' replicada a {grpc_address}: {response.status}")
 
 # AÑADIR NUEVA FUNCIÓN para particionamiento con eliminación de colas
 def replicate_queue_deletion_to_specific_nodes(queue_name: str, owner: str, target_nodes: list):
     """Replica la eliminación de una cola a nodos específicos del clúster."""
     self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in target_nodes:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
+    req = messaging_pb2.QueueRequest(name=queue_name, owner=owner, origin=self_host, hops=1)
+    for _, grpc_address in _target_addresses(target_nodes):
         logger.info(f"[{self_host}] Replicando eliminación de cola '{queue_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de eliminar réplica de cola '{queue_name}' en {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.QueueRequest(name=queue_name, owner=owner)
-                response = stub.DeleteQueue(req, timeout=5)
-                if response.status == "ERROR" and "Cola no existe" in response.message:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' ya no existe en {grpc_address}, considerada eliminada")
-                else:
-                    logger.info(f"[{self_host}] Eliminación de cola replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error eliminando réplica de cola en {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+        response = _send_with_retries(
+            grpc_address, f"eliminar réplica de cola '{queue_name}'",
+            lambda stub: stub.DeleteQueue(req, timeout=GRPC_RPC_TIMEOUT)
+        )
+        if response is None:
+            continue
+        if response.status == "ERROR" and "Cola no existe" in response.message:
+            logger.info(f"[{self_host}] Cola '{queue_name}' ya no existe en {grpc_address}, considerada eliminada")
+        else:
+            logger.info(f"[{self_host}] Eliminación de cola replicada a {grpc_address}: {response.status}")
 
 # MANTENER todas las funciones originales
-def replicate_topic_to_cluster(topic_name: str, owner: str):
+def replicate_topic_to_cluster(topic_name: str, owner: str, acks: str = None, partitions: int = 1):
     """Replica la creación de un tópico a todos los nodos del clúster."""
-    # Mantener el código original
-    self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in CLUSTER_NODES:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
-        logger.info(f"[{self_host}] Replicando tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar '{topic_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.TopicRequest(name=topic_name, owner=owner)
-                response = stub.CreateTopic(req, timeout=5)
-                if response.status == "ERROR" and "Tópico ya existe" in response.message:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' ya existe en {grpc_address}, replicado")
-                else:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' replicado a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando tópico a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
-
-# Mantener el resto de las funciones originales
+    replicate_topic_to_specific_nodes(topic_name, owner, CLUSTER_NODES, acks, partitions)
+
 def replicate_topic_deletion_to_cluster(topic_name: str, owner: str):
     """Replica la eliminación de un tópico a todos los nodos del clúster."""
-    self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in CLUSTER_NODES:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
-        logger.info(f"[{self_host}] Replicando eliminación de tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de eliminar réplica de '{topic_name}' en {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.TopicRequest(name=topic_name, owner=owner)
-                response = stub.DeleteTopic(req, timeout=5)
-                if response.status == "ERROR" and "Tópico no existe" in response.message:
-                    logger.info(f"[{self_host}] Tópico '{topic_name}' ya no existe en {grpc_address}, considerado eliminado")
-                else:
-                    logger.info(f"[{self_host}] Eliminación de tópico replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error eliminando réplica de tópico en {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+    replicate_topic_deletion_to_specific_nodes(topic_name, owner, CLUSTER_NODES)
 
 def replicate_queue_to_cluster(queue_name: str, owner: str):
     """Replica la creación de una cola a todos los nodos del clúster."""
-    self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in CLUSTER_NODES:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
-        logger.info(f"[{self_host}] Replicando cola '{queue_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar cola '{queue_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.QueueRequest(name=queue_name, owner=owner)
-                response = stub.CreateQueue(req, timeout=5)
-                if response.status == "ERROR" and "Cola ya existe" in response.message:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' ya existe en {grpc_address}, replicada")
-                else:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando cola a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
+    replicate_queue_to_specific_nodes(queue_name, owner, CLUSTER_NODES)
 
 def replicate_queue_deletion_to_cluster(queue_name: str, owner: str):
     """Replica la eliminación de una cola a todos los nodos del clúster."""
-    self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in CLUSTER_NODES:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
-        logger.info(f"[{self_host}] Replicando eliminación de cola '{queue_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de eliminar réplica de cola '{queue_name}' en {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.QueueRequest(name=queue_name, owner=owner)
-                response = stub.DeleteQueue(req, timeout=5)
-                if response.status == "ERROR" and "Cola no existe" in response.message:
-                    logger.info(f"[{self_host}] Cola '{queue_name}' ya no existe en {grpc_address}, considerada eliminada")
-                else:
-                    logger.info(f"[{self_host}] Eliminación de cola replicada a {grpc_address}: {response.status}")
-                break
-            except Exception as e:
-                logger.error(f"[{self_host}] Error eliminando réplica de cola en {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-            finally:
-                channel.close()
-
-def replicate_message_to_cluster(topic_name: str, sender: str, content: str):
+    replicate_queue_deletion_to_specific_nodes(queue_name, owner, CLUSTER_NODES)
+
+def replicate_message_to_cluster(topic_name: str, sender: str, content: str, required_acks=None):
     """Replica un mensaje a todos los nodos del clúster."""
-    self_host = os.getenv("SELF_HOST", "localhost:8000")
-    for node in CLUSTER_NODES:
-        if node == self_host or not node.strip():
-            continue
-        grpc_address = api_to_grpc_address(node)
-        if not grpc_address:
-            logger.error(f"[{self_host}] No se pudo obtener dirección gRPC para {node}")
-            continue
-        logger.info(f"[{self_host}] Replicando mensaje de tópico '{topic_name}' a nodo gRPC: {grpc_address}")
-        max_retries = 3
-        for attempt in range(max_retries):
-            logger.info(f"[{self_host}] Intento {attempt+1} de replicar mensaje de '{topic_name}' a {grpc_address}")
-            try:
-                options = [
-                    ('grpc.max_receive_message_length', 1024*1024*10),
-                    ('grpc.max_send_message_length', 1024*1024*10)
-                ]
-                channel = grpc.insecure_channel(grpc_address, options=options)
-                try:
-                    grpc.channel_ready_future(channel).result(timeout=5)
-                    logger.info(f"[{self_host}] Canal listo en {grpc_address}")
-                except grpc.FutureTimeoutError:
-                    logger.error(f"[{self_host}] Timeout esperando canal en {grpc_address}")
-                    if attempt == max_retries - 1:
-                        break
-                    continue
-                stub = messaging_pb2_grpc.MessagingServiceStub(channel)
-                req = messaging_pb2.MessageRequest(topic_name=topic_name, sender=sender, content=content)
-                try:
-                    response = stub.ReplicateMessage(req, timeout=5)
-                    if response.status == "TOPIC_NOT_FOUND":
-                        logger.info(f"[{self_host}] Tópico '{topic_name}' no encontrado en {grpc_address}, creando...")
-                        create_req = messaging_pb2.TopicRequest(name=topic_name, owner=sender)
-                        create_resp = stub.CreateTopic(create_req, timeout=5)
-                        logger.info(f"[{self_host}] Creación de tópico en {grpc_address}: {create_resp.status}")
-                        response = stub.ReplicateMessage(req, timeout=5)
-                        if response.status == "TOPIC_NOT_FOUND":
-                            logger.error(f"[{self_host}] Aún no se encontró el tópico '{topic_name}' en {grpc_address} tras creación")
-                            continue
-                    logger.info(f"[{self_host}] Mensaje replicado a {grpc_address}")
-                    break
-                except Exception as inner_e:
-                    logger.error(f"[{self_host}] Error en llamada RPC: {str(inner_e)}")
-                    if attempt == max_retries - 1:
-                        try:
-                            create_req = messaging_pb2.TopicRequest(name=topic_name, owner=sender)
-                            stub.CreateTopic(create_req, timeout=5)
-                            response = stub.ReplicateMessage(req, timeout=5)
-                            logger.info(f"[{self_host}] Mensaje replicado a {grpc_address} tras crear tópico")
-                            break
-                        except Exception as final_e:
-                            logger.error(f"[{self_host}] Error final al replicar mensaje: {str(final_e)}")
-                finally:
-                    channel.close()
-            except Exception as e:
-                logger.error(f"[{self_host}] Error replicando mensaje a {grpc_address} (intento {attempt+1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
\ No newline at end of file
+    return replicate_message_to_specific_nodes(topic_name, sender, content, CLUSTER_NODES, required_acks)
@@ -0,0 +1,283 @@
+# mom_server/services/metadata.py
+
+"""
+Servicio de metadatos: un mapa de particiones versionado, el mismo en todos los nodos.
+
+Sin él, cada nodo deriva el mapa de su propia vista de la pertenencia y de su
+configuración (CLUSTER_NODES, PARTITION_NODE_WEIGHTS...), así que dos nodos pueden
+discrepar sobre quién es responsable de una partición, y cambiar el reparto exige
+reiniciarlos. Con METADATA_NODE definido:
+
+- El nodo designado aloja el servicio (MetadataService). Cada REBALANCE_INTERVAL
+  calcula los nodos del mapa (los conocidos por gossip menos los que llevan más de
+  REBALANCE_DOWN_GRACE segundos sin latidos) y, si cambian ellos o los pesos
+  (PUT /cluster/metadata/weights), publica una versión nueva. Cada versión se
+  guarda en la tabla partition_maps, así que la numeración sigue tras un reinicio.
+- Todos los nodos, el designado incluido, mantienen abierto un WatchPartitionMap
+  con él (MetadataWatcher). El servicio envía su versión actual si es posterior a
+  la del nodo y después cada versión nueva en cuanto se publica, sin sondeo. El
+  nodo guarda la última recibida para arrancar con ella.
+- El rebalanceador activa cada versión recibida con el procedimiento de siempre
+  (traer datos, corte atómico, última pasada); sin rebalanceador, se activa al
+  recibirla.
+
+El mapa viaja completo (nodos, pesos, estrategia y factor de replicación), así que
+todos los nodos calculan exactamente el mismo reparto, tengan la configuración que
+tengan.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from mom_server.config import (
+    api_to_grpc_address, METADATA_NODE, METADATA_RETRY_INTERVAL, REBALANCE_INTERVAL, REBALANCE_DOWN_GRACE,
+    PARTITION_STRATEGY, PARTITION_REPLICATION_FACTOR, PARTITION_NODE_WEIGHTS
+)
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.services.audit import audit
+from mom_server.services.membership import membership
+from mom_server.services.partitioning import PartitionMap, manage_partition_map, install_partition_map
+from mom_server.services.state import save_partition_map, get_latest_partition_map
+
+logger = logging.getLogger(__name__)
+
+
+def build_partition_map(spec):
+    """PartitionMap de una versión publicada por el servicio."""
+    return PartitionMap(
+        spec["nodes"], spec["version"], replication_factor=spec["replication_factor"],
+        strategy=spec["strategy"], weights=spec["weights"]
+    )
+
+
+def to_proto(spec):
+    return messaging_pb2.PartitionMapState(
+        version=spec["version"], nodes=spec["nodes"], weights=spec["weights"],
+        strategy=spec["strategy"], replication_factor=spec["replication_factor"]
+    )
+
+
+def from_proto(state):
+    return {
+        "version": state.version,
+        "nodes": list(state.nodes),
+        "weights": dict(state.weights),
+        "strategy": state.strategy,
+        "replication_factor": state.replication_factor
+    }
+
+
+class MetadataService(threading.Thread):
+    """Dueño del mapa de particiones: publica una versión nueva cada vez que cambia."""
+
+    def __init__(self, interval=REBALANCE_INTERVAL, down_grace=REBALANCE_DOWN_GRACE):
+        super().__init__(name="metadata-service", daemon=True)
+        self.interval = interval
+        self.down_grace = down_grace
+        self.spec = None
+        self.weights = dict(PARTITION_NODE_WEIGHTS)
+        # (bucle, asyncio.Event) de cada WatchPartitionMap abierto
+        self._watchers = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.spec = get_latest_partition_map()
+        if self.spec is not None:
+            self.weights = dict(self.spec["weights"])
+            logger.info(f"🗺️ Servicio de metadatos: continúa desde el mapa v{self.spec['version']}")
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error actualizando el mapa de particiones: {str(e)}")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+    def refresh(self, min_version=0):
+        """
+        Publica una versión nueva si los nodos o los pesos cambiaron, o si la actual no pasa de `min_version`.
+
+        Returns:
+            dict: Versión vigente del mapa
+        """
+        nodes = membership.current_nodes(self.down_grace)
+        with self._lock:
+            current = self.spec
+            candidate = {
+                "nodes": nodes,
+                "weights": {node: weight for node, weight in self.weights.items() if node in nodes},
+                "strategy": PARTITION_STRATEGY,
+                "replication_factor": PARTITION_REPLICATION_FACTOR
+            }
+            if current is not None and current["version"] > min_version and \
+                    all(current[field] == value for field, value in candidate.items()):
+                return current
+            spec = {"version": max(current["version"] if current else 0, min_version) + 1, **candidate}
+            save_partition_map(spec)
+            self.spec = spec
+            watchers = list(self._watchers)
+        for loop, event in watchers:
+            loop.call_soon_threadsafe(event.set)
+        logger.info(f"🗺️ Mapa de particiones v{spec['version']} publicado: {nodes} (pesos: {spec['weights']})")
+        audit.record("partition_map", phase="publish", version=spec["version"], nodes=nodes)
+        return spec
+
+    def set_weights(self, weights):
+        """
+        Cambia el peso de los nodos indicados y publica el mapa resultante.
+
+        Args:
+            weights (dict): Nodo -> peso (>= 0; 0 = el nodo no recibe particiones)
+
+        Returns:
+            dict: Versión vigente del mapa
+
+        Raises:
+            ValueError: Algún peso es negativo, o todos los nodos del mapa quedarían con peso 0
+        """
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Los pesos no pueden ser negativos")
+        nodes = membership.current_nodes(self.down_grace)
+        with self._lock:
+            merged = {**self.weights, **{node: float(weight) for node, weight in weights.items()}}
+            # Los nodos sin peso valen 1
+            if nodes and all(merged.get(node, 1.0) == 0 for node in nodes):
+                raise ValueError(f"Con estos pesos ningún nodo de {nodes} recibiría particiones")
+            self.weights = merged
+        return self.refresh()
+
+    async def watch(self, known_version):
+        """
+        Versiones del mapa posteriores a `known_version`: la actual y cada una que se publique.
+
+        Un observador que no ocupa ningún hilo: espera en un asyncio.Event que
+        refresh() activa desde el hilo del servicio.
+        """
+        loop = asyncio.get_running_loop()
+        watcher = (loop, asyncio.Event())
+        with self._lock:
+            self._watchers.add(watcher)
+        try:
+            while True:
+                watcher[1].clear()
+                spec = self.spec
+                if spec is not None and spec["version"] < known_version:
+                    # El nodo conoce una versión que este servicio no (p. ej. base de datos nueva): se supera.
+                    # refresh() consulta la pertenencia y escribe en la base de datos: fuera del bucle
+                    spec = await loop.run_in_executor(None, self.refresh, known_version)
+                if spec is not None and spec["version"] > known_version:
+                    known_version = spec["version"]
+                    yield spec
+                await watcher[1].wait()
+        finally:
+            with self._lock:
+                self._watchers.discard(watcher)
+
+    def status(self):
+        return {
+            "running": self.is_alive(),
+            "version": self.spec["version"] if self.spec else None,
+            "nodes": self.spec["nodes"] if self.spec else [],
+            "weights": self.weights,
+            "watchers": len(self._watchers)
+        }
+
+
+class MetadataWatcher(threading.Thread):
+    """Mantiene abierto WatchPartitionMap con el servicio y guarda la última versión recibida."""
+
+    def __init__(self, metadata_node=METADATA_NODE, retry_interval=METADATA_RETRY_INTERVAL):
+        super().__init__(name="metadata-watcher", daemon=True)
+        self.metadata_node = metadata_node
+        self.retry_interval = retry_interval
+        self.self_host = os.getenv("SELF_HOST", "localhost:8000")
+        self.spec = None
+        self.install = False
+        self.connected = False
+        self.received_at = None
+        self._call = None
+        self._stop_event = threading.Event()
+
+    def start(self, install=False):
+        """
+        Carga el último mapa guardado y empieza a observar el servicio.
+
+        Args:
+            install (bool): Activar cada versión al recibirla. False cuando el
+                rebalanceador se encarga de activarlas después de trasladar los datos
+        """
+        self.install = install
+        self.spec = get_latest_partition_map()
+        if self.spec is not None:
+            logger.info(f"🗺️ Último mapa de particiones recibido: v{self.spec['version']} {self.spec['nodes']}")
+            if install:
+                self._install(self.spec)
+        super().start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._call is not None:
+            self._call.cancel()
+
+    def run(self):
+        grpc_address = api_to_grpc_address(self.metadata_node)
+        while not self._stop_event.is_set():
+            request = messaging_pb2.WatchPartitionMapRequest(
+                node=self.self_host, known_version=self.spec["version"] if self.spec else 0
+            )
+            try:
+                self._call = channel_pool.get_stub(grpc_address).WatchPartitionMap(request)
+                for state in self._call:
+                    if not self.connected:
+                        self.connected = True
+                        logger.info(f"🗺️ Observando el mapa de particiones en {self.metadata_node}")
+                    self.apply(from_proto(state))
+            except Exception as e:
+                if self.connected or self.received_at is None:
+                    logger.warning(f"Sin conexión con el servicio de metadatos {self.metadata_node}: {str(e)}")
+            self.connected = False
+            self._stop_event.wait(self.retry_interval)
+
+    def apply(self, spec):
+        """
+        Incorpora una versión recibida si es posterior a la que se tiene.
+
+        Returns:
+            bool: True si era nueva
+        """
+        if self.spec is not None and spec["version"] <= self.spec["version"]:
+            return False
+        save_partition_map(spec)
+        self.spec = spec
+        self.received_at = time.time()
+        logger.info(f"🗺️ Mapa de particiones v{spec['version']} recibido: {spec['nodes']}")
+        if self.install:
+            self._install(spec)
+        return True
+
+    def _install(self, spec):
+        manage_partition_map()
+        install_partition_map(build_partition_map(spec))
+
+    def status(self):
+        return {
+            "metadata_node": self.metadata_node,
+            "connected": self.connected,
+            "version": self.spec["version"] if self.spec else None,
+            "nodes": self.spec["nodes"] if self.spec else [],
+            "weights": self.spec["weights"] if self.spec else {},
+            "received_at": self.received_at
+        }
+
+
+# Instancias únicas por proceso
+metadata_service = MetadataService()
+metadata_watcher = MetadataWatcher()
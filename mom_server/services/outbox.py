@@ -0,0 +1,395 @@
+# mom_server/services/outbox.py
+
+"""
+Emisores en segundo plano del outbox de replicación.
+
+Cada escritura replicable deja una entrada por nodo destino en la tabla
+replication_outbox dentro de su propia transacción. Un hilo por nodo drena esas
+entradas en orden; si el nodo no responde, el hilo espera con back-off
+exponencial y vuelve a intentarlo, de modo que las réplicas convergen cuando el
+nodo regresa (hinted handoff).
+
+Las entradas consecutivas del mismo tipo se agrupan en lotes: tras un aviso el
+emisor espera REPLICATION_BATCH_LINGER_MS para acumular más mensajes y envía cada
+lote en un único RPC, limitado por REPLICATION_BATCH_MAX_MESSAGES y
+REPLICATION_BATCH_MAX_BYTES.
+
+Los tipos que admiten stream (STREAM_BUILDERS) viajan por un ReplicationStream de
+larga duración: el emisor mantiene varias tramas en vuelo y borra las entradas a
+medida que llegan las confirmaciones acumuladas. Si el nodo remoto no ofrece el
+stream, el emisor vuelve al RPC unario ReplicateBatch.
+
+Mientras el detector de fallos considere caído al nodo, su emisor no intenta
+entregas; cuando el nodo vuelve a estar disponible se le despierta de inmediato.
+"""
+
+import grpc
+import logging
+import threading
+import time
+
+from mom_server.config import (
+    api_to_grpc_address,
+    REPLICATION_OUTBOX_POLL_INTERVAL,
+    REPLICATION_OUTBOX_BACKOFF_BASE,
+    REPLICATION_OUTBOX_BACKOFF_MAX,
+    REPLICATION_OUTBOX_BATCH,
+    REPLICATION_BATCH_LINGER_MS,
+    REPLICATION_BATCH_MAX_MESSAGES,
+    REPLICATION_BATCH_MAX_BYTES,
+    REPLICATION_STREAM_ENABLED
+)
+from mom_server.db import outbox_repository
+from mom_server.services.membership import membership
+from mom_server.services.circuit_breaker import get_breaker, CircuitOpenError
+from mom_server.services.replication_lag import replication_tracker
+from mom_server.grpc_services.replication_stream import ReplicationStream, StreamClosedError
+from mom_server.services.messaging import (
+    send_topic_messages_to_node, send_queue_events_to_node, to_envelope
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _deliver_topic_messages(peer, payloads):
+    send_topic_messages_to_node(peer, payloads)
+
+
+def _deliver_queue_events(peer, payloads):
+    send_queue_events_to_node(peer, payloads)
+
+
+def _payload_size(payload):
+    return len(payload.get("content", "").encode("utf-8"))
+
+
+# Función de entrega (por lotes) para cada tipo de entrada del outbox
+DELIVERY_HANDLERS = {
+    "topic_message": _deliver_topic_messages,
+    "queue_event": _deliver_queue_events
+}
+
+# Tipos que pueden viajar por el stream de replicación y cómo se convierten a protobuf
+STREAM_BUILDERS = {
+    "topic_message": to_envelope
+}
+
+
+def split_batches(entries):
+    """
+    Agrupa entradas consecutivas del mismo tipo respetando los límites de lote.
+
+    Un lote siempre contiene al menos una entrada, aunque esta supere por sí sola
+    REPLICATION_BATCH_MAX_BYTES.
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+    for entry in entries:
+        size = _payload_size(entry["payload"])
+        if current and (
+            entry["kind"] != current[0]["kind"]
+            or len(current) >= REPLICATION_BATCH_MAX_MESSAGES
+            or current_bytes + size > REPLICATION_BATCH_MAX_BYTES
+        ):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(entry)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+class PeerSender(threading.Thread):
+    """Hilo que entrega en orden las entradas pendientes de un nodo."""
+
+    def __init__(self, peer):
+        super().__init__(name=f"outbox-{peer}", daemon=True)
+        self.peer = peer
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.batches_sent = 0
+        self.messages_sent = 0
+        self._pending_hint = 0
+        self._stream = None
+        self._stream_cursor = 0
+        # Ids enviados por el stream más allá del cursor (detrás de una entrada retenida), sin confirmar
+        self._stream_sent = set()
+        self._stream_supported = REPLICATION_STREAM_ENABLED
+        self._blocked_on_stream = False
+        # Las confirmaciones del stream llegan en el hilo lector del stream: protege cursor,
+        # enviados, espera de entregas unarias y contadores frente al hilo emisor
+        self._stream_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self, count=1):
+        """Avisa de `count` entradas nuevas; el emisor deja de esperar al completar un lote."""
+        self._pending_hint += count
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._stream is not None:
+            self._stream.close()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            wait = max(self.retry_at - time.time(), 0) or REPLICATION_OUTBOX_POLL_INTERVAL
+            self._wake_event.wait(timeout=wait)
+            self._wake_event.clear()
+            if self._stop_event.is_set() or time.time() < self.retry_at:
+                continue
+            if not membership.is_alive(self.peer):
+                # Se reanudará al recibir el aviso de que el nodo vuelve a estar disponible
+                continue
+            self._linger()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"[outbox] Error drenando entradas para {self.peer}: {str(e)}")
+
+    def _linger(self):
+        """Espera a que se acumule un lote completo o a que venza el linger."""
+        deadline = time.monotonic() + REPLICATION_BATCH_LINGER_MS / 1000
+        while self._pending_hint < REPLICATION_BATCH_MAX_MESSAGES and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wake_event.wait(timeout=remaining)
+            self._wake_event.clear()
+        self._pending_hint = 0
+
+    def drain(self):
+        """Entrega lotes hasta vaciar el outbox del nodo o encontrar un fallo."""
+        if self._stream_supported:
+            self._drain_stream()
+        else:
+            self._drain_unary()
+
+    def _drain_unary(self):
+        while not self._stop_event.is_set():
+            entries = outbox_repository.fetch_due_entries(
+                self.peer, max(REPLICATION_OUTBOX_BATCH, REPLICATION_BATCH_MAX_MESSAGES)
+            )
+            if not entries:
+                return
+            for batch in split_batches(entries):
+                if not self._deliver_unary(batch):
+                    return
+
+    def _deliver_unary(self, batch):
+        try:
+            DELIVERY_HANDLERS[batch[0]["kind"]](self.peer, [entry["payload"] for entry in batch])
+        except Exception as e:
+            with self._stream_lock:
+                self._on_failure(batch[0], e)
+            return False
+        with self._stream_lock:
+            outbox_repository.delete_entries([entry["id"] for entry in batch])
+            self._record_acks(batch)
+            self._on_success(len(batch))
+        return True
+
+    def _drain_stream(self):
+        """
+        Envía lotes por el stream sin esperar confirmación.
+
+        `_stream_cursor` es el id hasta el que se ha enviado todo; las entradas se
+        borran cuando el nodo las confirma (`_on_stream_ack`). El cursor no pasa de
+        una entrada retenida (aún no debe enviarse): las enviadas detrás de ella se
+        recuerdan en `_stream_sent` para no repetirlas.
+        """
+        if self._stream is not None and self._stream.closed:
+            self._on_stream_failure(self._stream)
+            return
+        while not self._stop_event.is_set():
+            with self._stream_lock:
+                cursor = self._stream_cursor
+            entries, first_held_id = outbox_repository.fetch_due_window(
+                self.peer, max(REPLICATION_OUTBOX_BATCH, REPLICATION_BATCH_MAX_MESSAGES), after_id=cursor
+            )
+            with self._stream_lock:
+                entries = [entry for entry in entries if entry["id"] not in self._stream_sent]
+            if not entries:
+                return
+            for batch in split_batches(entries):
+                builder = STREAM_BUILDERS.get(batch[0]["kind"])
+                if builder is None:
+                    # Tipos sin stream: se entregan por RPC unario sin tramas pendientes delante
+                    with self._stream_lock:
+                        # Comprobación y marca bajo el cerrojo: la última confirmación no puede colarse entre ambas
+                        if self._stream is not None and self._stream.in_flight:
+                            self._blocked_on_stream = True
+                            return
+                    if not self._deliver_unary(batch):
+                        return
+                    self._advance_cursor(batch, first_held_id, in_flight=False)
+                    continue
+                try:
+                    stream = self._get_stream()
+                    stream.send(
+                        [builder(entry["payload"]) for entry in batch],
+                        token=batch
+                    )
+                except (StreamClosedError, CircuitOpenError, TimeoutError, grpc.RpcError) as e:
+                    self._on_stream_failure(self._stream, e)
+                    return
+                self._advance_cursor(batch, first_held_id)
+
+    def _advance_cursor(self, batch, first_held_id, in_flight=True):
+        with self._stream_lock:
+            for entry in batch:
+                if first_held_id is None or entry["id"] < first_held_id:
+                    self._stream_cursor = entry["id"]
+                elif in_flight:
+                    self._stream_sent.add(entry["id"])
+
+    def _get_stream(self):
+        if self._stream is None:
+            grpc_address = api_to_grpc_address(self.peer)
+            if not grpc_address:
+                raise ValueError(f"No se pudo obtener dirección gRPC para {self.peer}")
+            # Con el breaker abierto no se abre el stream; el back-off del emisor espera al siguiente intento
+            get_breaker(grpc_address).before_call()
+            self._stream = ReplicationStream(
+                grpc_address, on_ack=self._on_stream_ack, on_error=lambda error: self.wake()
+            )
+        return self._stream
+
+    def _on_stream_ack(self, tokens):
+        """Se ejecuta en el hilo lector del stream."""
+        with self._stream_lock:
+            for batch in tokens:
+                outbox_repository.delete_entries([entry["id"] for entry in batch])
+                self._stream_sent.difference_update(entry["id"] for entry in batch)
+                self._record_acks(batch)
+                self._on_success(len(batch))
+            # Una entrega unaria esperaba a que el stream quedara sin tramas pendientes
+            if self._blocked_on_stream and self._stream is not None and not self._stream.in_flight:
+                self._blocked_on_stream = False
+                self._wake_event.set()
+
+    def _on_stream_failure(self, stream, error=None):
+        """Descarta el stream; las entradas sin confirmar se reenviarán desde el principio."""
+        error = error or (stream.error if stream is not None else None)
+        if stream is not None:
+            stream.close()
+        with self._stream_lock:
+            self._stream = None
+            self._stream_cursor = 0
+            self._stream_sent.clear()
+            self._blocked_on_stream = False
+            if stream is not None and stream.unimplemented:
+                logger.info(f"[outbox] {self.peer} no ofrece ReplicationStream, usando ReplicateBatch")
+                self._stream_supported = False
+                self.wake()
+                return
+            pending = outbox_repository.fetch_due_entries(self.peer, 1)
+            self._on_failure(pending[0] if pending else None, error)
+
+    def _record_acks(self, batch):
+        if batch[0]["kind"] == "topic_message":
+            for entry in batch:
+                replication_tracker.record_ack(self.peer, entry["payload"])
+
+    def _on_success(self, delivered_count):
+        if self.consecutive_failures:
+            logger.info(f"[outbox] Nodo {self.peer} disponible de nuevo, reanudando replicación")
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.batches_sent += 1
+        self.messages_sent += delivered_count
+        logger.debug(f"[outbox] Lote de {delivered_count} entradas entregado a {self.peer}")
+
+    def _on_failure(self, entry, error):
+        self.consecutive_failures += 1
+        backoff = min(
+            REPLICATION_OUTBOX_BACKOFF_BASE * (2 ** (self.consecutive_failures - 1)),
+            REPLICATION_OUTBOX_BACKOFF_MAX
+        )
+        self.retry_at = time.time() + backoff
+        self.last_error = str(error)
+        if entry is not None:
+            outbox_repository.mark_entry_failed(entry["id"], self.last_error, self.retry_at)
+        logger.warning(
+            f"[outbox] Fallo entregando a {self.peer} (intento {self.consecutive_failures}), "
+            f"reintento en {backoff:.1f}s: {self.last_error}"
+        )
+
+    def snapshot(self):
+        return {
+            "consecutive_failures": self.consecutive_failures,
+            "retry_at": self.retry_at or None,
+            "last_error": self.last_error,
+            "batches_sent": self.batches_sent,
+            "messages_sent": self.messages_sent,
+            "streaming": self._stream is not None and not self._stream.closed,
+            "in_flight": self._stream.in_flight if self._stream is not None else 0
+        }
+
+
+class OutboxDispatcher:
+    """Mantiene un PeerSender por nodo destino."""
+
+    def __init__(self):
+        self._senders = {}
+        self._lock = threading.Lock()
+
+    def _get_sender(self, peer):
+        with self._lock:
+            sender = self._senders.get(peer)
+            if sender is None:
+                sender = PeerSender(peer)
+                self._senders[peer] = sender
+                sender.start()
+            return sender
+
+    def start(self):
+        """Arranca emisores para los nodos que ya tenían trabajo pendiente."""
+        membership.add_listener(self._on_membership_change)
+        for peer in outbox_repository.get_pending_peers():
+            self._get_sender(peer).wake()
+
+    def _on_membership_change(self, node, alive):
+        """Despierta al emisor de un nodo que vuelve a estar disponible, sin esperar al back-off."""
+        if not alive:
+            return
+        with self._lock:
+            sender = self._senders.get(node)
+        if sender is not None:
+            sender.retry_at = 0.0
+            sender.wake()
+
+    def wake(self, peers):
+        """Avisa a los emisores de que hay entradas nuevas para esos nodos."""
+        for peer in peers:
+            self._get_sender(peer).wake()
+
+    def stop(self):
+        with self._lock:
+            for sender in self._senders.values():
+                sender.stop()
+            self._senders.clear()
+
+    def stats(self):
+        pending = outbox_repository.count_pending_by_peer()
+        with self._lock:
+            senders = dict(self._senders)
+        peers = set(pending) | set(senders)
+        return {
+            peer: {
+                "pending": pending.get(peer, 0),
+                **(senders[peer].snapshot() if peer in senders else {})
+            }
+            for peer in peers
+        }
+
+
+# Instancia única por proceso
+outbox_dispatcher = OutboxDispatcher()
@@ -1,109 +1,284 @@
-# mom_server/services/partitioning.py - Versión corregida
+# mom_server/services/partitioning.py
+
+"""
+Reparto de tópicos y colas entre los nodos con un anillo de hash consistente.
+
+Cada nodo ocupa PARTITION_VIRTUAL_NODES posiciones (nodos virtuales) en un anillo
+de enteros de 64 bits. Un tópico o cola se asigna al primer nodo que aparece en
+el anillo a partir del hash de su nombre, y sus réplicas a los siguientes nodos
+distintos en el sentido de las agujas del reloj. Al añadir o quitar un nodo solo
+cambian de dueño los nombres de los tramos que ocupaban sus nodos virtuales,
+alrededor de 1/N del total, en lugar de casi todos como con hash % N.
+
+Todos los nodos construyen el mismo anillo a partir de la lista de nodos del
+clúster, así que coinciden en el reparto sin coordinarse.
+
+Con PARTITION_STRATEGY=rendezvous se usa en su lugar hashing rendezvous ponderado
+(highest random weight): cada nodo puntúa cada clave con -peso / ln(h), donde h
+es el hash de (nodo, clave) llevado a (0, 1), y los responsables son los de mayor
+puntuación. Un nodo de peso 2 recibe el doble de claves que uno de peso 1, y al
+añadir o quitar un nodo solo cambian las claves que este gana o pierde: el orden
+relativo de los demás no varía, así que las réplicas elegidas se mantienen.
+
+El reparto se precalcula en un PartitionMap inmutable por versión de la
+pertenencia (cambia al descubrirse un nodo por gossip). Cada mapa memoiza en un
+LRU el resultado de cada nombre, así que en el camino caliente enrutar cuesta
+una búsqueda en un diccionario; un mapa nuevo empieza con la caché vacía.
+Cuando hay un rebalanceador (ver rebalancer.py), el mapa activo solo cambia
+cuando este lo sustituye, después de trasladar los datos afectados.
+
+Un tópico con varias particiones ubica cada una por separado (la partición 0
+conserva la clave del tópico sin particionar), de modo que sus primarios se
+reparten por el anillo y el tópico escala con el número de nodos.
+"""
+
+import bisect
+import functools
 import hashlib
 import logging
-from mom_server.config import CLUSTER_NODES, SELF_HOST, PARTITION_REPLICATION_FACTOR
+import math
+import threading
+from types import MappingProxyType
+from mom_server.config import (
+    SELF_HOST, PARTITION_REPLICATION_FACTOR, PARTITION_VIRTUAL_NODES, PARTITION_CACHE_SIZE,
+    PARTITION_STRATEGY, PARTITION_NODE_WEIGHTS, METADATA_ENABLED
+)
+from mom_server.services.membership import membership
 
 logger = logging.getLogger(__name__)
 
-def get_partition_for_topic(topic_name, redirected=False):
-    """Determina qué nodo es responsable de un tópico específico"""
-    # Usamos un hash para distribuir los tópicos uniformemente
-    hash_value = int(hashlib.md5(topic_name.encode()).hexdigest(), 16)
-    node_count = len(CLUSTER_NODES) + 1  # Incluir el nodo local
-    
-    # Lista completa de nodos en el anillo
-    nodes = [SELF_HOST] + CLUSTER_NODES
-    
-    # Ordenamos la lista para asegurar coherencia entre nodos
-    sorted_nodes = sorted(nodes)
-    
-    # El índice primario se determina por el hash
-    primary_index = hash_value % node_count
-    primary_node = sorted_nodes[primary_index] if primary_index < len(sorted_nodes) else sorted_nodes[0]
-    
-    # Crear una lista de nodos secundarios (tantos como indique el factor de replicación)
-    secondary_nodes = []
-    for i in range(1, min(PARTITION_REPLICATION_FACTOR, node_count)):
-        sec_index = (primary_index + i) % node_count
-        secondary_node = sorted_nodes[sec_index] if sec_index < len(sorted_nodes) else sorted_nodes[0]
-        secondary_nodes.append(secondary_node)
-    
-    # Verificar si este nodo es responsable
-    is_primary = primary_node == SELF_HOST
-    is_secondary = SELF_HOST in secondary_nodes
-    
+
+def ring_hash(key):
+    """Posición de `key` en el anillo: los primeros 64 bits de su MD5 (estable entre procesos)."""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Anillo de hash consistente con nodos virtuales."""
+
+    def __init__(self, nodes, virtual_nodes=PARTITION_VIRTUAL_NODES):
+        self.nodes = sorted(set(nodes))
+        self.virtual_nodes = virtual_nodes
+        points = sorted(
+            (ring_hash(f"{node}#{index}"), node)
+            for node in self.nodes
+            for index in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def preference_list(self, key, count):
+        """
+        Nodos responsables de `key`, empezando por el primario.
+
+        Args:
+            key (str): Clave a ubicar
+            count (int): Número de nodos distintos deseados (primario + réplicas)
+
+        Returns:
+            list: Hasta `count` nodos distintos en orden del anillo
+        """
+        if not self._owners:
+            return []
+        count = min(count, len(self.nodes))
+        start = bisect.bisect(self._hashes, ring_hash(key))
+        selected = []
+        for offset in range(len(self._owners)):
+            node = self._owners[(start + offset) % len(self._owners)]
+            if node not in selected:
+                selected.append(node)
+                if len(selected) == count:
+                    break
+        return selected
+
+
+class WeightedRendezvous:
+    """Hashing rendezvous ponderado: los responsables de una clave son los nodos de mayor puntuación."""
+
+    def __init__(self, nodes, weights=None):
+        self.nodes = sorted(set(nodes))
+        weights = weights if weights is not None else PARTITION_NODE_WEIGHTS
+        self.weights = {node: weights.get(node, 1.0) for node in self.nodes}
+
+    def score(self, node, key):
+        # Los 64 bits del hash llevados a (0, 1): ln(h) < 0 y la puntuación es positiva
+        h = (ring_hash(f"{node}#{key}") + 0.5) / 2 ** 64
+        return -self.weights[node] / math.log(h)
+
+    def preference_list(self, key, count):
+        """
+        Nodos responsables de `key`, empezando por el primario.
+
+        Args:
+            key (str): Clave a ubicar
+            count (int): Número de nodos distintos deseados (primario + réplicas)
+
+        Returns:
+            list: Hasta `count` nodos en orden de puntuación descendente
+        """
+        candidates = [node for node in self.nodes if self.weights[node] > 0]
+        return sorted(candidates, key=lambda node: self.score(node, key), reverse=True)[:count]
+
+
+def create_placement(nodes, strategy=PARTITION_STRATEGY, virtual_nodes=PARTITION_VIRTUAL_NODES, weights=None):
+    """Estrategia de reparto configurada para `nodes`: "ring" o "rendezvous"."""
+    if strategy == "ring":
+        return HashRing(nodes, virtual_nodes)
+    if strategy == "rendezvous":
+        return WeightedRendezvous(nodes, weights)
+    raise ValueError(f"Estrategia de reparto desconocida: {strategy}")
+
+
+class PartitionMap:
+    """
+    Reparto inmutable de nombres entre un conjunto fijo de nodos.
+
+    Las ubicaciones devueltas son de solo lectura y se comparten entre llamadas.
+    """
+
+    def __init__(self, nodes, version=0, replication_factor=PARTITION_REPLICATION_FACTOR,
+                 virtual_nodes=PARTITION_VIRTUAL_NODES, cache_size=PARTITION_CACHE_SIZE,
+                 strategy=PARTITION_STRATEGY, weights=None):
+        self.version = version
+        self.replication_factor = max(replication_factor, 1)
+        self.virtual_nodes = virtual_nodes
+        self.strategy = strategy
+        self.weights = weights
+        self.placement_strategy = create_placement(nodes, strategy, virtual_nodes, weights)
+        self.nodes = tuple(self.placement_strategy.nodes)
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, key):
+        nodes = tuple(self.placement_strategy.preference_list(key, self.replication_factor))
+        if not nodes:
+            # Sin nodos, o todos con peso 0: no hay primario al que enrutar
+            raise RuntimeError(f"Ningún nodo del mapa v{self.version} puede recibir '{key}' "
+                               f"(nodos: {list(self.nodes)}, pesos: {self.weights})")
+        return MappingProxyType({
+            "primary": nodes[0],
+            "secondary_nodes": nodes[1:],
+            "is_primary": nodes[0] == SELF_HOST,
+            "is_secondary": SELF_HOST in nodes[1:],
+            "all_responsible_nodes": nodes
+        })
+
+    def with_nodes(self, nodes, version):
+        """Mapa con los mismos parámetros de reparto (estrategia, pesos, réplicas) sobre otros nodos."""
+        return PartitionMap(nodes, version, self.replication_factor, self.virtual_nodes,
+                            self._lookup.cache_info().maxsize, self.strategy, self.weights)
+
+    def placement(self, key):
+        """Ubicación memoizada de `key`: primario, secundarios y si este nodo es uno de ellos."""
+        return self._lookup(key)
+
+    def cache_info(self):
+        return self._lookup.cache_info()
+
+
+_map = None
+_map_lock = threading.Lock()
+# True cuando un rebalanceador decide cuándo cambia el mapa activo
+_managed = False
+
+
+def get_partition_map():
+    """
+    Mapa de particiones activo.
+
+    Sin rebalanceador se reconstruye en cuanto cambia la versión de la pertenencia;
+    con él, solo cambia con install_partition_map. En el primer caso la versión es
+    un contador local del nodo y no se puede comparar con la de otros nodos (ver
+    shared_map_version).
+    """
+    global _map
+    current = _map
+    version = membership.members_version
+    if current is not None and (_managed or current.version == version):
+        return current
+    with _map_lock:
+        if _map is None or (not _managed and _map.version != version):
+            _map = PartitionMap(membership.member_nodes(), version)
+            logger.info(f"Mapa de particiones v{version} construido con nodos {list(_map.nodes)}")
+        return _map
+
+
+def shared_map_version():
+    """
+    Si la versión del mapa significa lo mismo en todos los nodos: la publica el servicio
+    de metadatos o la fija el rebalanceador. Sin ninguno de los dos es la versión local de
+    la pertenencia, y solo sirve como dato informativo.
+    """
+    return METADATA_ENABLED or _managed
+
+
+def manage_partition_map():
+    """Deja de seguir a la pertenencia: a partir de aquí el mapa activo solo cambia con install_partition_map."""
+    global _managed
+    get_partition_map()
+    _managed = True
+
+
+def install_partition_map(partition_map):
+    """Sustituye el mapa activo de una sola vez: todas las decisiones posteriores usan el nuevo."""
+    global _map
+    with _map_lock:
+        _map = partition_map
+    logger.info(f"Mapa de particiones v{partition_map.version} activado con nodos {list(partition_map.nodes)}")
+
+
+def _placement(key, redirected=False):
+    placement = get_partition_map().placement(key)
+    if not redirected:
+        return placement
     # Si estamos procesando una solicitud ya redirigida, consideremos a este nodo responsable
     # para evitar ciclos de redirección
-    if redirected:
-        is_primary = True  # Forzar que el nodo actual se considere responsable
-    
-    result = {
-        "primary": primary_node,
-        "secondary_nodes": secondary_nodes,
-        "is_primary": is_primary,
-        "is_secondary": is_secondary,
-        "all_responsible_nodes": [primary_node] + secondary_nodes
-    }
-    
-    logger.debug(f"Particionamiento para tópico '{topic_name}': {result}")
-    return result
+    return MappingProxyType({**placement, "is_primary": True})
+
+def topic_key(topic_name, partition_id=0):
+    """Clave en el anillo de una partición de un tópico."""
+    # La partición 0 usa la clave de siempre: los tópicos existentes no cambian de nodo
+    return f"topic:{topic_name}" if not partition_id else f"topic:{topic_name}#{partition_id}"
+
+def queue_key(queue_name):
+    """Clave en el anillo de una cola."""
+    # Prefijo distinto al de los tópicos para que un tópico y una cola homónimos no caigan juntos
+    return f"queue:{queue_name}"
+
+def partition_for_key(key, partitions):
+    """Partición de un mensaje con clave: todos los mensajes con la misma clave van a la misma."""
+    return ring_hash(key) % max(partitions, 1)
+
+def get_partition_for_topic(topic_name, redirected=False, partition_id=0):
+    """Determina qué nodo es responsable de una partición de un tópico"""
+    return _placement(topic_key(topic_name, partition_id), redirected)
 
 def get_partition_for_queue(queue_name, redirected=False):
     """Determina qué nodo es responsable de una cola específica"""
-    # Similar a tópicos pero con un offset para distribuir diferente
-    hash_value = int(hashlib.md5(queue_name.encode()).hexdigest(), 16) + 1
-    node_count = len(CLUSTER_NODES) + 1
-    
-    # Lista completa de nodos en el anillo
-    nodes = [SELF_HOST] + CLUSTER_NODES
-    
-    # Ordenamos la lista para asegurar coherencia entre nodos
-    sorted_nodes = sorted(nodes)
-    
-    # El índice primario se determina por el hash
-    primary_index = hash_value % node_count
-    primary_node = sorted_nodes[primary_index] if primary_index < len(sorted_nodes) else sorted_nodes[0]
-    
-    # Crear una lista de nodos secundarios
-    secondary_nodes = []
-    for i in range(1, min(PARTITION_REPLICATION_FACTOR, node_count)):
-        sec_index = (primary_index + i) % node_count
-        secondary_node = sorted_nodes[sec_index] if sec_index < len(sorted_nodes) else sorted_nodes[0]
-        secondary_nodes.append(secondary_node)
-    
-    # Verificar si este nodo es responsable
-    is_primary = primary_node == SELF_HOST
-    is_secondary = SELF_HOST in secondary_nodes
-    
-    # Si estamos procesando una solicitud ya redirigida, consideremos a este nodo responsable
-    if redirected:
-        is_primary = True  # Forzar que el nodo actual se considere responsable
-    
-    result = {
-        "primary": primary_node,
-        "secondary_nodes": secondary_nodes,
-        "is_primary": is_primary,
-        "is_secondary": is_secondary,
-        "all_responsible_nodes": [primary_node] + secondary_nodes
-    }
-    
-    logger.debug(f"Particionamiento para cola '{queue_name}': {result}")
-    return result
+    return _placement(queue_key(queue_name), redirected)
 
-def is_node_responsible(entity_name, entity_type="topic", redirected=False):
-    """Verifica si el nodo actual es responsable del tópico o cola"""
+def is_node_responsible(entity_name, entity_type="topic", redirected=False, partition_id=0):
+    """Verifica si el nodo actual es responsable del tópico (o de una de sus particiones) o cola"""
     if entity_type == "topic":
-        partition = get_partition_for_topic(entity_name, redirected)
+        partition = get_partition_for_topic(entity_name, redirected, partition_id)
     else:  # queue
         partition = get_partition_for_queue(entity_name, redirected)
     
     return partition["is_primary"] or partition["is_secondary"]
 
-def get_responsible_nodes(entity_name, entity_type="topic"):
-    """Obtiene los nodos responsables para un tópico o cola"""
+def get_responsible_nodes(entity_name, entity_type="topic", partition_id=0):
+    """Obtiene los nodos responsables para un tópico (o una de sus particiones) o cola"""
     if entity_type == "topic":
-        partition = get_partition_for_topic(entity_name)
+        partition = get_partition_for_topic(entity_name, partition_id=partition_id)
     else:  # queue
         partition = get_partition_for_queue(entity_name)
     
-    return partition["all_responsible_nodes"]
\ No newline at end of file
+    return partition["all_responsible_nodes"]
+
+def get_topic_nodes(topic_name, partitions=1):
+    """Nodos responsables de alguna partición del tópico: todos ellos guardan su configuración"""
+    nodes = []
+    for partition_id in range(max(partitions, 1)):
+        for node in get_responsible_nodes(topic_name, "topic", partition_id):
+            if node not in nodes:
+                nodes.append(node)
+    return nodes
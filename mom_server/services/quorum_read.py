@@ -0,0 +1,205 @@
+# mom_server/services/quorum_read.py
+
+"""
+Lecturas de tópicos con nivel de consistencia y reparación en lectura.
+
+Con consistencia "quorum" o "all", el nodo que recibe la lectura la coordina:
+pide los mensajes de una partición a sus nodos responsables en paralelo (a sí mismo
+en local si es uno de ellos), responde en cuanto han contestado R de ellos y
+devuelve la unión de las respuestas, deduplicada por message_id y ordenada por
+offset. Con N réplicas, R es N // 2 + 1 para "quorum" y N para "all".
+
+Cuando llegan las respuestas restantes envía en segundo plano a cada réplica que
+contestó los mensajes que le faltaban (reparación en lectura). La reparación
+corre en su propio pool: ningún hilo de lectura queda esperando a las réplicas
+lentas. Los mensajes
+viajan con el sobre del líder, así que la copia reparada es idéntica al
+original y reaplicarla es inocuo.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+from mom_server.config import (
+    CLUSTER_NODES, PARTITIONING_ENABLED, REPLICATION_FANOUT_WORKERS, READ_TIMEOUT, READ_REPAIR_ENABLED
+)
+from mom_server.services.audit import audit
+from mom_server.services.forwarding import forward
+from mom_server.services.messaging import send_topic_messages_to_node
+from mom_server.services.partitioning import get_responsible_nodes
+from mom_server.services.state import get_topic, get_topic_messages, add_topic_messages_batch
+
+logger = logging.getLogger(__name__)
+
+_read_executor = ThreadPoolExecutor(max_workers=REPLICATION_FANOUT_WORKERS, thread_name_prefix="quorum-read")
+_repair_executor = ThreadPoolExecutor(max_workers=REPLICATION_FANOUT_WORKERS, thread_name_prefix="read-repair")
+
+
+class ReadQuorumError(RuntimeError):
+    """No respondieron suficientes réplicas para el nivel de consistencia pedido."""
+
+
+def required_responses(consistency, replica_count):
+    """Respuestas necesarias para `consistency` con `replica_count` réplicas."""
+    if consistency == "all":
+        return replica_count
+    if consistency == "quorum":
+        return replica_count // 2 + 1
+    return 1
+
+
+def _replica_set(topic_name, partition_id=0):
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    nodes = get_responsible_nodes(topic_name, "topic", partition_id) if PARTITIONING_ENABLED else [self_host] + CLUSTER_NODES
+    return list(dict.fromkeys(node.strip() for node in nodes if node.strip()))
+
+
+def _read_local(topic_name, partition_id):
+    if get_topic(topic_name) is None:
+        return None
+    return get_topic_messages(topic_name, partition_id)
+
+
+def _read_from(node, topic_name, partition_id):
+    """
+    Mensajes de la partición en `node`, o None si el nodo no tiene el tópico.
+
+    Raises:
+        Exception: El nodo no respondió (caído, breaker abierto, error HTTP...)
+    """
+    if node == os.getenv("SELF_HOST", "localhost:8000"):
+        return _read_local(topic_name, partition_id)
+    response = forward(
+        "GET", node, f"/messages/messages/topic/{topic_name}",
+        timeout=READ_TIMEOUT, params={"redirected": True, "partition": partition_id, "consistency": "one"}
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json().get("messages", [])
+
+
+def _message_key(message):
+    # Los mensajes anteriores al message_id se identifican por su contenido
+    return message.get("message_id") or (message["sender"], message["content"], message.get("timestamp"))
+
+
+def merge_responses(responses):
+    """
+    Une las respuestas de varias réplicas.
+
+    Args:
+        responses (dict): Nodo -> lista de mensajes (o None si no tiene el tópico)
+
+    Returns:
+        list: Mensajes sin duplicados, en orden de partición y offset
+    """
+    merged = {}
+    for messages in responses.values():
+        for message in messages or []:
+            merged.setdefault(_message_key(message), message)
+    return sorted(
+        merged.values(),
+        key=lambda m: (m.get("partition_id", 0), m.get("partition_offset") or float("inf"), m.get("timestamp") or "")
+    )
+
+
+def _repair(topic_name, node, missing):
+    payloads = [{**message, "topic_name": topic_name} for message in missing]
+    try:
+        if node == os.getenv("SELF_HOST", "localhost:8000"):
+            add_topic_messages_batch(payloads)
+        else:
+            send_topic_messages_to_node(node, payloads, timeout=READ_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Reparación en lectura de '{topic_name}' en {node} fallida: {str(e)}")
+        audit.record("read_repair", name=topic_name, target=node, count=len(missing), status="FAILED", error=str(e))
+        return
+    logger.info(f"🩹 Reparación en lectura de '{topic_name}': {len(missing)} mensajes enviados a {node}")
+    audit.record("read_repair", name=topic_name, target=node, count=len(missing), status="SUCCESS")
+
+
+def _read_repair(topic_name, pending, responses):
+    """Con todas las lecturas terminadas, envía a cada réplica los mensajes que no tenía."""
+    responses = dict(responses)
+    for future, node in pending.items():
+        if future.exception() is None:
+            responses[node] = future.result()
+    merged = merge_responses(responses)
+    for node, messages in responses.items():
+        present = {_message_key(message) for message in messages or []}
+        # Solo se reparan mensajes con identidad y posición asignadas por el líder
+        missing = [
+            message for message in merged
+            if _message_key(message) not in present and message.get("message_id") and message.get("partition_offset")
+        ]
+        if missing:
+            _repair(topic_name, node, missing)
+
+
+def _schedule_read_repair(topic_name, pending, responses):
+    """Programa la reparación para cuando terminen las lecturas pendientes, sin ocupar un hilo esperándolas."""
+    if not pending:
+        _repair_executor.submit(_read_repair, topic_name, pending, responses)
+        return
+    remaining = [len(pending)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        # Se ejecuta en el hilo que completa la lectura; la reparación va al pool propio
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        _repair_executor.submit(_read_repair, topic_name, pending, responses)
+
+    for future in pending:
+        future.add_done_callback(on_done)
+
+
+def quorum_read(topic_name, consistency, partition_id=0):
+    """
+    Lee una partición de sus nodos responsables con el nivel de consistencia indicado.
+
+    Args:
+        topic_name (str): Nombre del tópico
+        consistency (str): "one", "quorum" o "all"
+        partition_id (int, optional): Partición a leer
+
+    Returns:
+        list: Mensajes unidos de las réplicas que respondieron, o None si ninguna
+            tiene el tópico
+
+    Raises:
+        ReadQuorumError: Respondieron menos réplicas de las necesarias en READ_TIMEOUT
+    """
+    replicas = _replica_set(topic_name, partition_id)
+    required = required_responses(consistency, len(replicas))
+    futures = {_read_executor.submit(_read_from, node, topic_name, partition_id): node for node in replicas}
+    responses = {}
+    try:
+        for future in as_completed(futures, timeout=READ_TIMEOUT):
+            node = futures[future]
+            try:
+                responses[node] = future.result()
+            except Exception as e:
+                logger.warning(f"Lectura de '{topic_name}' en {node} fallida: {str(e)}")
+                continue
+            if len(responses) >= required:
+                break
+    except FuturesTimeoutError:
+        pass
+    if len(responses) < required:
+        raise ReadQuorumError(
+            f"Respondieron {len(responses)}/{required} réplicas de '{topic_name}'/{partition_id} ({consistency})"
+        )
+
+    if READ_REPAIR_ENABLED:
+        pending = {future: node for future, node in futures.items() if node not in responses}
+        _schedule_read_repair(topic_name, pending, responses)
+
+    if all(messages is None for messages in responses.values()):
+        return None
+    return merge_responses(responses)
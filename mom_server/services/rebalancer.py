@@ -0,0 +1,399 @@
+# mom_server/services/rebalancer.py
+
+"""
+Traslado de particiones cuando nodos se unen al clúster o salen de él.
+
+Sin rebalanceo, descubrir un nodo cambia el mapa de particiones al instante y los
+datos escritos antes se quedan en los responsables anteriores. El rebalanceador
+toma el control del mapa activo y cada REBALANCE_INTERVAL lo compara con el
+objetivo: los nodos conocidos por gossip menos los que llevan más de
+REBALANCE_DOWN_GRACE segundos sin latidos. Si difieren:
+
+1. El nodo trae, con FetchSince desde los responsables anteriores vivos, las
+   particiones de tópico de las que pasa a ser responsable, junto con la
+   configuración del tópico. Mientras tanto, una escritura o lectura local de
+   una de esas particiones la trae antes, para que los offsets nuevos sigan a
+   los trasladados.
+2. El primer responsable anterior vivo de cada cola envía su configuración y sus
+   mensajes pendientes a los nodos que la reciben.
+3. El mapa objetivo sustituye al activo con una sola asignación (corte atómico).
+   Tras TAIL_INTERVALS intervalos, una última pasada trae lo que los responsables
+   anteriores aceptaron hasta cambiar ellos también de mapa.
+
+Un nodo nuevo arranca ya con un mapa que lo incluye, así que al arrancar el
+rebalanceador hace lo mismo respecto al mapa sin el nodo: trae sus particiones y,
+cuando los demás ya lo han descubierto, la última pasada.
+
+Con servicio de metadatos (METADATA_NODE, ver metadata.py), el objetivo no se
+deriva de la pertenencia local sino que es la última versión del mapa recibida del
+servicio, y el nodo arranca con la última que guardó.
+
+Las transferencias se limitan a REBALANCE_MAX_BYTES_PER_SEC para no competir con
+productores y consumidores. Si el objetivo cambia a mitad de un rebalanceo, no se
+activa y se vuelve a planificar en la siguiente pasada; lo ya trasladado no se
+repite porque cada partición se trae desde su último offset local.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from mom_server.config import (
+    api_to_grpc_address, REBALANCE_INTERVAL, REBALANCE_DOWN_GRACE, REBALANCE_MAX_BYTES_PER_SEC,
+    REBALANCE_CHUNK_BYTES, METADATA_ENABLED, PARTITIONING_ENABLED, REBALANCE_ENABLED
+)
+from mom_server.grpc_services import messaging_pb2
+from mom_server.grpc_services.channel_pool import channel_pool
+from mom_server.services.audit import audit
+from mom_server.services.catchup import catch_up_partition
+from mom_server.services.membership import membership
+from mom_server.services.metadata import metadata_watcher, build_partition_map
+from mom_server.services.messaging import replicate_queue_to_specific_nodes, send_queue_events_to_node
+from mom_server.services.partitioning import (
+    get_partition_map, install_partition_map, manage_partition_map, topic_key, queue_key
+)
+from mom_server.services.state import (
+    get_topic, get_topic_catalog, create_topic, get_last_offset, get_queue_catalog, get_pending_messages
+)
+
+logger = logging.getLogger(__name__)
+
+# Intervalos que se espera tras el corte para que los demás nodos activen también su mapa
+TAIL_INTERVALS = 2
+
+
+class Throttle:
+    """Limita el ritmo de una transferencia a `rate` bytes por segundo (0 = sin límite)."""
+
+    def __init__(self, rate=REBALANCE_MAX_BYTES_PER_SEC):
+        self.rate = rate
+        self.sent = 0
+        self._start = time.monotonic()
+
+    def consume(self, size):
+        """Registra `size` bytes enviados y espera lo necesario para no superar el ritmo."""
+        self.sent += size
+        if self.rate <= 0:
+            return
+        delay = self._start + self.sent / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _Acquisition:
+    """Partición de tópico que este nodo debe traer antes de activar el mapa objetivo."""
+
+    def __init__(self, config, sources):
+        self.config = config
+        self.sources = sources
+        self.done = False
+        self.lock = threading.Lock()
+
+
+def _grpc_addresses(nodes):
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    return [
+        grpc_address
+        for grpc_address in (api_to_grpc_address(node) for node in membership.live_nodes(nodes) if node != self_host)
+        if grpc_address
+    ]
+
+
+def _cluster_topics(nodes):
+    """Configuración de los tópicos conocidos en local y en los nodos indicados."""
+    topics = get_topic_catalog()
+    for grpc_address in _grpc_addresses(nodes):
+        try:
+            response = channel_pool.call(grpc_address, "ListTopics", messaging_pb2.EmptyRequest())
+        except Exception as e:
+            logger.warning(f"No se pudieron listar los tópicos de {grpc_address}: {str(e)}")
+            continue
+        for config in response.configs:
+            known = topics.get(config.name)
+            # Las copias creadas por replicación tienen propietario "system": se prefiere el real
+            if known is None or (known["owner"] == "system" and config.owner != "system"):
+                topics[config.name] = {"name": config.name, "owner": config.owner, "acks": config.acks or None,
+                                       "partitions": config.partitions or 1}
+    return topics
+
+
+class Rebalancer(threading.Thread):
+    """Hilo que traslada los datos afectados por un cambio de nodos y después activa el mapa nuevo."""
+
+    def __init__(self, interval=REBALANCE_INTERVAL, down_grace=REBALANCE_DOWN_GRACE):
+        super().__init__(name="rebalancer", daemon=True)
+        self.interval = interval
+        self.down_grace = down_grace
+        self.self_host = os.getenv("SELF_HOST", "localhost:8000")
+        self.target = None
+        self.last_cutover = None
+        # Versión del servicio de metadatos activa en este nodo
+        self.metadata_version = None
+        # (tópico, partición) -> _Acquisition pendiente. Lo consultan los hilos de las solicitudes
+        # (ensure_ready): se sustituye entero o se le quitan entradas solo bajo _acquiring_lock
+        self._acquiring = {}
+        self._acquiring_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        manage_partition_map()
+        if METADATA_ENABLED and metadata_watcher.spec is not None:
+            # Tras un reinicio se vuelve al último mapa recibido sin esperar al servicio
+            self._activate(build_partition_map(metadata_watcher.spec))
+        # Un nodo que aún no tiene ningún mapa del servicio trae sus particiones al recibir el primero
+        if not METADATA_ENABLED or self.metadata_version is not None:
+            try:
+                self.bootstrap()
+            except Exception as e:
+                logger.error(f"Error trayendo las particiones propias al arrancar: {str(e)}")
+                self._set_acquiring({})
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.rebalance()
+            except Exception as e:
+                logger.error(f"Error en pasada de rebalanceo: {str(e)}")
+                self._set_acquiring({})
+                self.target = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def target_nodes(self):
+        """Nodos que deben formar el mapa: los conocidos menos los que se dan por salidos."""
+        return membership.current_nodes(self.down_grace)
+
+    def target_map(self, active):
+        """Mapa al que debe pasar el nodo, o None si el activo ya lo es."""
+        if METADATA_ENABLED:
+            spec = metadata_watcher.spec
+            if spec is None or spec["version"] == self.metadata_version:
+                return None
+            return build_partition_map(spec)
+        nodes = self.target_nodes()
+        if nodes == list(active.nodes):
+            return None
+        return active.with_nodes(nodes, active.version + 1)
+
+    def _target_changed(self, target):
+        if METADATA_ENABLED:
+            return metadata_watcher.spec["version"] != target.version
+        return self.target_nodes() != list(target.nodes)
+
+    def _activate(self, partition_map):
+        install_partition_map(partition_map)
+        if METADATA_ENABLED:
+            self.metadata_version = partition_map.version
+
+    def bootstrap(self):
+        """
+        Trae las particiones de las que este nodo es responsable como si acabara de unirse al mapa.
+
+        Returns:
+            int: Mensajes traídos
+        """
+        active = get_partition_map()
+        others = [node for node in active.nodes if node != self.self_host]
+        if not others:
+            return 0
+        throttle = Throttle()
+        acquisitions = self._plan_acquisitions(active.with_nodes(others, active.version), active)
+        self._set_acquiring(acquisitions)
+        moved = sum(self._acquire(topic_name, partition_id, throttle) for topic_name, partition_id in acquisitions)
+        moved += self._tail(acquisitions, throttle)
+        if moved:
+            logger.info(f"⚖️ Arranque: {moved} mensajes traídos en {len(acquisitions)} particiones")
+        return moved
+
+    def _tail(self, acquisitions, throttle):
+        """Última pasada sobre las particiones traídas, cuando los demás nodos ya usan el mapa nuevo."""
+        self._stop_event.wait(self.interval * TAIL_INTERVALS)
+        return sum(
+            self._pull(topic_name, partition_id, acquisition.sources, throttle)
+            for (topic_name, partition_id), acquisition in acquisitions.items()
+        )
+
+    def rebalance(self):
+        """
+        Compara el mapa activo con el objetivo y, si difieren, traslada los datos y lo activa.
+
+        Returns:
+            bool: True si se activó un mapa nuevo
+        """
+        active = get_partition_map()
+        target = self.target_map(active)
+        if target is None:
+            return False
+        nodes = list(target.nodes)
+        self.target = target
+        started = time.monotonic()
+        throttle = Throttle()
+        logger.info(f"⚖️ Rebalanceo v{active.version} -> v{target.version}: {list(active.nodes)} -> {nodes}")
+        audit.record("rebalance", phase="start", version=target.version, nodes=nodes)
+
+        previous = active
+        if METADATA_ENABLED and self.metadata_version is None:
+            # Primer mapa del servicio: como en el arranque, se trae todo lo que le corresponde según él
+            previous = target.with_nodes([node for node in target.nodes if node != self.self_host], active.version)
+        acquisitions = self._plan_acquisitions(previous, target)
+        self._set_acquiring(acquisitions)
+        moved = sum(self._acquire(topic_name, partition_id, throttle)
+                    for topic_name, partition_id in acquisitions)
+        moved += self._push_queues(previous, target, throttle)
+
+        if self._target_changed(target):
+            logger.info("⚖️ El mapa objetivo cambió durante el rebalanceo; se replanificará")
+            self._set_acquiring({})
+            self.target = None
+            return False
+
+        self._activate(target)
+        self.target = None
+        # Los responsables anteriores siguen aceptando escrituras hasta que activan su mapa
+        moved += self._tail(acquisitions, throttle)
+
+        self.last_cutover = {
+            "version": target.version,
+            "nodes": nodes,
+            "partitions_acquired": len(acquisitions),
+            "messages_moved": moved,
+            "bytes_moved": throttle.sent,
+            "seconds": round(time.monotonic() - started, 3),
+            "at": time.time()
+        }
+        logger.info(f"⚖️ Mapa v{target.version} activado: {len(acquisitions)} particiones traídas, {moved} mensajes")
+        audit.record("rebalance", phase="cutover", version=target.version, nodes=nodes,
+                     partitions=len(acquisitions), messages=moved)
+        return True
+
+    def _plan_acquisitions(self, active, target):
+        """Particiones de tópico de las que este nodo pasa a ser responsable."""
+        acquisitions = {}
+        for topic_name, config in _cluster_topics(set(active.nodes) | set(target.nodes)).items():
+            for partition_id in range(config["partitions"]):
+                key = topic_key(topic_name, partition_id)
+                old_nodes = active.placement(key)["all_responsible_nodes"]
+                if self.self_host in target.placement(key)["all_responsible_nodes"] and self.self_host not in old_nodes:
+                    acquisitions[(topic_name, partition_id)] = _Acquisition(config, list(old_nodes))
+        return acquisitions
+
+    def _pull(self, topic_name, partition_id, sources, throttle=None):
+        applied, _ = catch_up_partition(
+            topic_name, partition_id, get_last_offset(topic_name, partition_id), _grpc_addresses(sources),
+            REBALANCE_CHUNK_BYTES, throttle
+        )
+        return applied
+
+    def _set_acquiring(self, acquisitions):
+        # Copia propia: `acquisitions` sigue siendo del plan en curso (última pasada)
+        with self._acquiring_lock:
+            self._acquiring = dict(acquisitions)
+
+    def _acquire(self, topic_name, partition_id, throttle=None):
+        key = (topic_name, partition_id)
+        acquisition = self._acquiring.get(key)
+        if acquisition is None:
+            return 0
+        with acquisition.lock:
+            if acquisition.done:
+                return 0
+            if get_topic(topic_name) is None:
+                config = acquisition.config
+                try:
+                    create_topic(topic_name, config["owner"], config["acks"], config["partitions"])
+                except Exception as e:
+                    # Creado a la vez por replicación: basta con que exista
+                    logger.debug(f"Tópico '{topic_name}' ya creado: {str(e)}")
+            moved = self._pull(topic_name, partition_id, acquisition.sources, throttle)
+            acquisition.done = True
+        with self._acquiring_lock:
+            # Un plan nuevo puede haber puesto otra adquisición de la misma partición: esa sigue pendiente
+            if self._acquiring.get(key) is acquisition:
+                del self._acquiring[key]
+        if moved:
+            logger.info(f"⚖️ {topic_name}/{partition_id}: {moved} mensajes traídos de {acquisition.sources}")
+        return moved
+
+    def ensure_ready(self, topic_name, partition_id):
+        """Antes de usar en local una partición que este nodo aún está trayendo, la trae."""
+        self._acquire(topic_name, partition_id)
+
+    def _push_queues(self, active, target, throttle):
+        """Envía las colas de las que este nodo es el primer responsable vivo a sus nuevos responsables."""
+        moved = 0
+        for queue_name, queue in get_queue_catalog().items():
+            key = queue_key(queue_name)
+            old_nodes = active.placement(key)["all_responsible_nodes"]
+            added = [node for node in target.placement(key)["all_responsible_nodes"] if node not in old_nodes]
+            live_old = membership.live_nodes(old_nodes)
+            if not added or not live_old or live_old[0] != self.self_host:
+                continue
+            replicate_queue_to_specific_nodes(queue_name, queue["owner"], added)
+            events = [{"event": "enqueue", "queue_name": queue_name, **message}
+                      for message in get_pending_messages(queue_name) if message["message_id"]]
+            for node in added:
+                if not membership.is_alive(node):
+                    continue
+                for chunk in _chunks(events, REBALANCE_CHUNK_BYTES):
+                    try:
+                        send_queue_events_to_node(node, chunk)
+                    except Exception as e:
+                        logger.warning(f"Error enviando la cola '{queue_name}' a {node}: {str(e)}")
+                        break
+                    moved += len(chunk)
+                    throttle.consume(sum(len(event["content"].encode("utf-8")) for event in chunk))
+            logger.info(f"⚖️ Cola '{queue_name}': {len(events)} mensajes enviados a {added}")
+        return moved
+
+    def _pending_acquisitions(self):
+        with self._acquiring_lock:
+            return list(self._acquiring)
+
+    def status(self):
+        active = get_partition_map()
+        return {
+            "running": self.is_alive(),
+            "active": {"version": active.version, "nodes": list(active.nodes)},
+            "target": {"version": self.target.version, "nodes": list(self.target.nodes)} if self.target else None,
+            "acquiring": [f"{topic_name}/{partition_id}" for topic_name, partition_id in self._pending_acquisitions()],
+            "metadata_version": self.metadata_version,
+            "last_cutover": self.last_cutover
+        }
+
+
+def _chunks(events, max_bytes):
+    chunk = []
+    size = 0
+    for event in events:
+        event_size = len(event["content"].encode("utf-8"))
+        if chunk and size + event_size > max_bytes:
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(event)
+        size += event_size
+    if chunk:
+        yield chunk
+
+
+# Instancia única por proceso
+rebalancer = Rebalancer()
+
+_start_lock = threading.Lock()
+
+
+def start_partition_map_tasks():
+    """
+    Arranca el observador del servicio de metadatos y el rebalanceador.
+
+    Deben ejecutarse en el proceso que enruta las solicitudes (el de la API), que es
+    el que consulta el mapa activo y llama a ensure_ready. En un nodo de proceso
+    único lo invocan tanto el arranque de gRPC como el de la API: solo la primera
+    llamada tiene efecto.
+    """
+    with _start_lock:
+        if METADATA_ENABLED and metadata_watcher.ident is None:
+            # Con rebalanceador, es él quien activa cada versión recibida tras trasladar los datos
+            metadata_watcher.start(install=not REBALANCE_ENABLED)
+        if PARTITIONING_ENABLED and REBALANCE_ENABLED and rebalancer.ident is None:
+            rebalancer.start()
@@ -0,0 +1,136 @@
+# mom_server/services/replication_lag.py
+
+"""
+Seguimiento del retraso de las réplicas respecto al líder.
+
+Para cada partición que lidera, el nodo calcula el offset confirmado por cada
+réplica a partir del outbox: las entradas de una réplica se borran al confirmarse,
+así que su offset confirmado es el anterior al primer offset pendiente, o el
+último offset del líder si no tiene nada pendiente. El cálculo sobrevive a
+reinicios porque solo depende de la base de datos.
+
+La latencia de replicación (desde que el líder guarda el mensaje hasta que la
+réplica lo confirma) se mide en memoria en cada confirmación, tanto de la
+replicación síncrona como de los emisores del outbox.
+"""
+
+import os
+import threading
+import time
+
+from mom_server.config import CLUSTER_NODES, PARTITIONING_ENABLED
+from mom_server.db import outbox_repository
+from mom_server.services.membership import membership
+from mom_server.services.partitioning import get_partition_for_topic, get_responsible_nodes
+from mom_server.services.state import get_partition_offsets
+
+# Peso de la última muestra en la media móvil de latencia
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class ReplicaStats:
+    """Confirmaciones y latencia de una réplica en una partición."""
+
+    def __init__(self):
+        self.acked_offset = 0
+        self.last_ack_at = None
+        self.last_latency = None
+        self.avg_latency = None
+        self.acks = 0
+
+    def record(self, offset, latency):
+        self.acked_offset = max(self.acked_offset, offset or 0)
+        self.last_ack_at = time.time()
+        self.acks += 1
+        if latency is not None:
+            self.last_latency = latency
+            self.avg_latency = latency if self.avg_latency is None else (
+                LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.avg_latency
+            )
+
+
+class ReplicationTracker:
+    """Estadísticas en memoria por (réplica, tópico, partición)."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record_ack(self, peer, message):
+        """
+        Registra que `peer` confirmó un mensaje de tópico.
+
+        Args:
+            peer (str): Nodo réplica (dirección API)
+            message (dict): Payload del mensaje, con topic_name, partition_id,
+                partition_offset y, si se conoce, appended_at
+        """
+        appended_at = message.get("appended_at")
+        latency = max(time.time() - appended_at, 0.0) if appended_at else None
+        key = (peer, message["topic_name"], message.get("partition_id", 0))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = ReplicaStats()
+            stats.record(message.get("partition_offset"), latency)
+
+    def get(self, peer, topic_name, partition_id):
+        with self._lock:
+            return self._stats.get((peer, topic_name, partition_id))
+
+
+# Instancia única por proceso
+replication_tracker = ReplicationTracker()
+
+
+def _replicas_of(topic_name, partition_id=0):
+    self_host = os.getenv("SELF_HOST", "localhost:8000")
+    nodes = get_responsible_nodes(topic_name, "topic", partition_id) if PARTITIONING_ENABLED else CLUSTER_NODES
+    return [node for node in nodes if node != self_host and node.strip()]
+
+
+def replication_lag_report(topic_name=None):
+    """
+    Retraso de cada réplica en las particiones que lidera este nodo.
+
+    Args:
+        topic_name (str, optional): Limitar el informe a un tópico
+
+    Returns:
+        list: Una entrada por (tópico, partición, réplica) con leader_offset,
+            acked_offset, lag_messages, lag_seconds, pending, latencias y alive
+    """
+    now = time.time()
+    pending = outbox_repository.get_pending_topic_offsets()
+    report = []
+    for (topic, partition_id), leader_offset in sorted(get_partition_offsets().items()):
+        if topic_name is not None and topic != topic_name:
+            continue
+        if PARTITIONING_ENABLED and not get_partition_for_topic(topic, partition_id=partition_id)["is_primary"]:
+            continue
+        for peer in _replicas_of(topic, partition_id):
+            waiting = pending.get((peer, topic, partition_id))
+            if waiting and waiting["first_offset"] is not None:
+                acked_offset = waiting["first_offset"] - 1
+            else:
+                acked_offset = leader_offset
+            stats = replication_tracker.get(peer, topic, partition_id)
+            report.append({
+                "topic": topic,
+                "partition": partition_id,
+                "replica": peer,
+                "alive": membership.is_alive(peer),
+                "leader_offset": leader_offset,
+                "acked_offset": acked_offset,
+                "lag_messages": max(leader_offset - acked_offset, 0),
+                "lag_seconds": (
+                    round(max(now - waiting["oldest_appended_at"], 0.0), 3)
+                    if waiting and waiting["oldest_appended_at"] else 0.0
+                ),
+                "pending": waiting["pending"] if waiting else 0,
+                "last_ack_at": stats.last_ack_at if stats else None,
+                "last_latency_ms": round(stats.last_latency * 1000, 2) if stats and stats.last_latency is not None else None,
+                "avg_latency_ms": round(stats.avg_latency * 1000, 2) if stats and stats.avg_latency is not None else None
+            })
+    return report
+
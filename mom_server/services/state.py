@@ -8,15 +8,18 @@ Actúa como una capa de adaptación que reenvía las llamadas a los repositorios
 import logging
 # Importar funciones desde los repositorios
 from mom_server.db.topic_repository import (
-    get_topics, get_topic_messages, create_topic, delete_topic, add_topic_message
+    get_topics, get_topic, get_topic_catalog, get_topic_messages, create_topic, delete_topic, add_topic_message,
+    add_topic_messages_batch, find_moved_messages, replace_topic_messages, get_partition_offsets, get_messages_since,
+    get_partition_leaves, rebuild_partition_hashes, get_last_offset, format_timestamp, parse_timestamp
 )
 from mom_server.db.queue_repository import (
-    get_queues, get_queue_messages, create_queue, delete_queue, add_queue_message, 
-    consume_queue_message
+    get_queues, get_queue, get_queue_catalog, get_queue_messages, create_queue, delete_queue, add_queue_message, 
+    consume_queue_message, apply_queue_events, get_pending_messages
 )
 from mom_server.db.user_repository import (
     get_user, create_user, verify_password, get_all_users
 )
+from mom_server.db.metadata_repository import save_partition_map, get_latest_partition_map
 
 logger = logging.getLogger(__name__)
 
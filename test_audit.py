@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# test_audit.py
+
+"""
+Pruebas unitarias del registro de auditoría: escritura asíncrona, rotación por
+tamaño y lectura de las copias rotadas.
+
+No necesitan un clúster en marcha.
+"""
+
+import os
+
+from mom_server.services.audit import AuditLog, audit_files, read_events
+
+
+def _write_events(path, count, **settings):
+    log = AuditLog(path=str(path), flush_interval=0.01, batch_size=1, enabled=True, **settings)
+    for index in range(count):
+        log.record("replicate", name="pedidos", index=index)
+    log.flush()
+    log.stop()
+    return log
+
+
+def test_events_are_written_as_json_lines(tmp_path):
+    path = tmp_path / "audit.log"
+    log = _write_events(path, 5)
+    assert log.written == 5
+    events = list(read_events(str(path)))
+    assert [event["index"] for event in events] == list(range(5))
+    assert all(event["event"] == "replicate" and event["node"] == log.node for event in events)
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = tmp_path / "audit.log"
+    _write_events(path, 60, max_bytes=500, backup_count=2)
+
+    files = audit_files(str(path))
+    assert files == [f"{path}.2", f"{path}.1", str(path)] or files == [f"{path}.2", f"{path}.1"]
+    assert not os.path.exists(f"{path}.3")
+    for file_path in files:
+        assert os.path.getsize(file_path) < 500 + 200
+
+    # Las copias se leen en orden cronológico y solo se pierden los eventos más antiguos
+    indexes = [event["index"] for event in read_events(str(path))]
+    assert indexes == sorted(indexes)
+    assert indexes[-1] == 59
+    assert indexes[0] > 0
+
+
+def test_rotation_without_backups_discards_the_file(tmp_path):
+    path = tmp_path / "audit.log"
+    _write_events(path, 30, max_bytes=500, backup_count=0)
+    assert all(not name.startswith("audit.log.") for name in os.listdir(tmp_path))
+
+
+def test_read_events_filters(tmp_path):
+    path = tmp_path / "audit.log"
+    log = AuditLog(path=str(path), flush_interval=0.01, enabled=True)
+    log.record("replicate", name="pedidos", target="localhost:8001", status="SUCCESS")
+    log.record("replicate", name="pagos", target="localhost:8001", status="FAILED")
+    log.record("read_repair", name="pedidos", target="localhost:8002", status="SUCCESS")
+    log.flush()
+    log.stop()
+
+    assert [e["name"] for e in read_events(str(path), event="replicate")] == ["pedidos", "pagos"]
+    assert [e["event"] for e in read_events(str(path), name="pedidos", status="SUCCESS")] == ["replicate", "read_repair"]
+    assert list(read_events(str(path), until="2000-01-01T00:00:00")) == []
+
+
+def test_disabled_log_writes_nothing(tmp_path):
+    path = tmp_path / "audit.log"
+    log = AuditLog(path=str(path), enabled=False)
+    log.record("replicate", name="pedidos")
+    log.stop()
+    assert not path.exists()
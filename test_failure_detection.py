@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# test_failure_detection.py
+
+"""
+Pruebas unitarias del detector de fallos phi-accrual y del circuit breaker por nodo.
+
+No necesitan un clúster en marcha.
+"""
+
+import pytest
+
+from mom_server.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from mom_server.services.membership import PhiAccrualDetector
+
+
+def _detector_with_heartbeats(interval=1.0, count=20):
+    detector = PhiAccrualDetector(expected_interval=interval, min_std_dev=0.1, acceptable_pause=0.0)
+    for beat in range(count):
+        detector.heartbeat(now=beat * interval)
+    return detector, (count - 1) * interval
+
+
+def test_phi_is_zero_before_first_heartbeat():
+    assert PhiAccrualDetector().phi(now=100.0) == 0.0
+
+
+def test_phi_grows_with_silence():
+    detector, last = _detector_with_heartbeats()
+    values = [detector.phi(now=last + elapsed) for elapsed in (0.5, 1.0, 2.0, 4.0)]
+    assert values == sorted(values)
+    # A tiempo, phi es bajo; tras varios intervalos sin latidos supera cualquier umbral razonable
+    assert values[1] < 1.0
+    assert values[-1] > 8.0
+
+
+def test_phi_tolerates_more_silence_with_jittery_heartbeats():
+    steady, steady_last = _detector_with_heartbeats()
+    jittery = PhiAccrualDetector(expected_interval=1.0, min_std_dev=0.1, acceptable_pause=0.0)
+    now = 0.0
+    for beat in range(20):
+        now += 0.5 if beat % 2 else 1.5
+        jittery.heartbeat(now=now)
+    assert jittery.phi(now=now + 2.0) < steady.phi(now=steady_last + 2.0)
+
+
+def test_phi_window_is_bounded():
+    detector = PhiAccrualDetector(window_size=10)
+    for beat in range(50):
+        detector.heartbeat(now=float(beat))
+    assert len(detector.intervals) == 10
+
+
+def _breaker(**overrides):
+    settings = dict(failure_threshold=3, failure_rate=0.5, slow_call_threshold=1.0,
+                    window_size=10, min_calls=4, reset_timeout=60.0)
+    settings.update(overrides)
+    return CircuitBreaker("localhost:50051", **settings)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record_failure("timeout")
+    assert breaker.state == CLOSED
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert not breaker.available()
+
+
+def test_breaker_opens_on_bad_call_rate():
+    breaker = _breaker(failure_threshold=100)
+    for _ in range(2):
+        breaker.record_success(0.01)
+        breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+
+
+def test_breaker_counts_slow_calls_as_bad():
+    breaker = _breaker(failure_threshold=100)
+    for _ in range(4):
+        breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+
+def test_breaker_success_resets_consecutive_failures():
+    breaker = _breaker(min_calls=100)
+    for _ in range(10):
+        breaker.record_failure("timeout")
+        breaker.record_failure("timeout")
+        breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe_and_closes_on_success():
+    breaker = _breaker(reset_timeout=0.0)
+    for _ in range(3):
+        breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+def test_half_open_reopens_when_probe_fails():
+    breaker = _breaker(reset_timeout=0.0)
+    for _ in range(3):
+        breaker.record_failure("timeout")
+    breaker.allow()
+    breaker.record_failure("sigue caído")
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+
+
+def test_half_open_rejects_concurrent_probes():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure("timeout")
+    # Simula que ya pasó el intervalo de reapertura
+    breaker.opened_at -= breaker.reset_timeout
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# test_partition_placement.py
+
+"""
+Pruebas unitarias del reparto de particiones: anillo de hash consistente,
+hashing rendezvous ponderado y mapa de particiones memoizado.
+
+No necesitan un clúster en marcha.
+"""
+
+import pytest
+
+from mom_server.services import metadata
+from mom_server.services.partitioning import HashRing, WeightedRendezvous, PartitionMap
+
+NODES = [f"localhost:{8000 + i}" for i in range(5)]
+KEYS = [f"topic:t{i}" for i in range(5000)]
+
+
+def _primaries(placement, keys=KEYS):
+    return {key: placement.preference_list(key, 1)[0] for key in keys}
+
+
+def test_hash_ring_join_remaps_about_one_nth():
+    before = _primaries(HashRing(NODES))
+    new_node = "localhost:8005"
+    after = _primaries(HashRing(NODES + [new_node]))
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    # Con 6 nodos se espera ~1/6 de las claves; hash % N movería casi todas
+    assert len(KEYS) / 12 < len(moved) < len(KEYS) / 3
+    # Solo cambian las claves que pasa a tener el nodo nuevo
+    assert all(after[key] == new_node for key in moved)
+
+
+def test_hash_ring_preference_list_is_distinct_and_bounded():
+    ring = HashRing(NODES)
+    nodes = ring.preference_list("topic:pedidos", 3)
+    assert len(nodes) == len(set(nodes)) == 3
+    assert len(ring.preference_list("topic:pedidos", 10)) == len(NODES)
+    assert HashRing([]).preference_list("topic:pedidos", 2) == []
+
+
+def test_partition_map_memoizes_placements():
+    partition_map = PartitionMap(NODES, version=1, replication_factor=2)
+    first = partition_map.placement("topic:pedidos")
+    assert partition_map.placement("topic:pedidos") is first
+    assert partition_map.cache_info().hits == 1
+    assert first["all_responsible_nodes"] == (first["primary"], *first["secondary_nodes"])
+
+
+def test_partition_map_placements_are_read_only():
+    partition_map = PartitionMap(NODES, version=1, replication_factor=2)
+    placement = partition_map.placement("topic:pedidos")
+    with pytest.raises(TypeError):
+        placement["primary"] = "localhost:9999"
+    assert partition_map.placement("topic:pedidos")["primary"] == placement["primary"]
+
+
+def test_partition_map_with_nodes_keeps_parameters_and_starts_empty():
+    partition_map = PartitionMap(NODES, version=1, replication_factor=2, strategy="rendezvous",
+                                 weights={NODES[0]: 3.0})
+    partition_map.placement("topic:pedidos")
+    successor = partition_map.with_nodes(NODES[:3], version=2)
+    assert successor.version == 2
+    assert successor.nodes == tuple(NODES[:3])
+    assert (successor.strategy, successor.weights, successor.replication_factor) == ("rendezvous", {NODES[0]: 3.0}, 2)
+    assert successor.cache_info().currsize == 0
+
+
+def test_partition_map_without_eligible_nodes_fails():
+    with pytest.raises(RuntimeError):
+        PartitionMap([], version=1).placement("topic:pedidos")
+    zero = PartitionMap(NODES[:2], version=1, strategy="rendezvous", weights={node: 0.0 for node in NODES[:2]})
+    with pytest.raises(RuntimeError):
+        zero.placement("topic:pedidos")
+
+
+def test_rendezvous_is_proportional_to_weight():
+    nodes = NODES[:3]
+    rendezvous = WeightedRendezvous(nodes, {nodes[0]: 1.0, nodes[1]: 1.0, nodes[2]: 2.0})
+    keys = [f"topic:t{i}" for i in range(20000)]
+    counts = {node: 0 for node in nodes}
+    for primary in _primaries(rendezvous, keys).values():
+        counts[primary] += 1
+    # Pesos 1:1:2 -> 25 %, 25 %, 50 %
+    assert counts[nodes[2]] / len(keys) == pytest.approx(0.5, abs=0.03)
+    assert counts[nodes[0]] / len(keys) == pytest.approx(0.25, abs=0.03)
+
+
+def test_rendezvous_only_moves_keys_of_the_changed_node():
+    before = _primaries(WeightedRendezvous(NODES, {}))
+    removed = NODES[1]
+    after = _primaries(WeightedRendezvous([node for node in NODES if node != removed], {}))
+    for key in KEYS:
+        if before[key] != removed:
+            assert after[key] == before[key]
+
+    # Las réplicas de los demás nodos conservan su orden relativo
+    full = WeightedRendezvous(NODES, {}).preference_list("topic:pedidos", len(NODES))
+    reduced = WeightedRendezvous([node for node in NODES if node != removed], {}).preference_list(
+        "topic:pedidos", len(NODES))
+    assert reduced == [node for node in full if node != removed]
+
+
+def test_rendezvous_skips_zero_weight_nodes():
+    rendezvous = WeightedRendezvous(NODES[:3], {NODES[0]: 0.0})
+    assert all(NODES[0] not in rendezvous.preference_list(key, 3) for key in KEYS[:500])
+
+
+def test_set_weights_rejects_invalid_weights(monkeypatch):
+    monkeypatch.setattr(metadata.membership, "current_nodes", lambda down_grace: NODES[:2])
+    service = metadata.MetadataService()
+    with pytest.raises(ValueError):
+        service.set_weights({NODES[0]: -1})
+    with pytest.raises(ValueError):
+        service.set_weights({NODES[0]: 0, NODES[1]: 0})
+    # Un cambio rechazado no altera los pesos vigentes
+    assert service.weights.get(NODES[0], 1.0) == 1.0
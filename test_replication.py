@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# test_replication.py
+
+"""
+Pruebas unitarias de las piezas de replicación: ventana del outbox, sobre de
+mensajes, unión de lecturas por quórum y árbol de hashes de anti-entropía.
+
+No necesitan un clúster en marcha; las que usan la base de datos trabajan sobre
+una copia temporal.
+"""
+
+import pytest
+
+from mom_server import database
+from mom_server.db import outbox_repository
+from mom_server.services.anti_entropy import HashTree, split_range
+from mom_server.services.messaging import ENVELOPE_VERSION, to_envelope, from_envelope
+from mom_server.services.quorum_read import merge_responses, required_responses
+
+PEER = "localhost:8001"
+
+
+@pytest.fixture
+def temp_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "mom_state.db"))
+    database.init_db()
+
+
+def _enqueue(topic_name, partition_id, offset, delay=0):
+    conn = database.get_connection()
+    outbox_repository.enqueue_entries(
+        conn.cursor(), [PEER], "topic_message",
+        {"topic_name": topic_name, "partition_id": partition_id, "partition_offset": offset},
+        f"{topic_name}-{partition_id}-{offset}", delay
+    )
+    conn.commit()
+    conn.close()
+
+
+def _offsets(entries):
+    return [(entry["payload"]["topic_name"], entry["payload"]["partition_id"], entry["payload"]["partition_offset"])
+            for entry in entries]
+
+
+def test_outbox_window_holds_back_only_the_delayed_partition(temp_db):
+    _enqueue("pedidos", 0, 1)
+    _enqueue("pedidos", 0, 2, delay=60)
+    _enqueue("pedidos", 1, 1)
+    _enqueue("pedidos", 0, 3)
+    _enqueue("pagos", 0, 1)
+
+    entries, first_held_id = outbox_repository.fetch_due_window(PEER)
+
+    # pedidos/0 se detiene en la entrada diferida para no adelantarla; las demás particiones siguen
+    assert _offsets(entries) == [("pedidos", 0, 1), ("pedidos", 1, 1), ("pagos", 0, 1)]
+    assert first_held_id == entries[0]["id"] + 1
+
+
+def test_outbox_window_respects_after_id_and_limit(temp_db):
+    for offset in range(1, 6):
+        _enqueue("pedidos", 0, offset)
+    first, _ = outbox_repository.fetch_due_window(PEER, limit=2)
+    assert _offsets(first) == [("pedidos", 0, 1), ("pedidos", 0, 2)]
+    rest, first_held_id = outbox_repository.fetch_due_window(PEER, after_id=first[-1]["id"])
+    assert _offsets(rest) == [("pedidos", 0, offset) for offset in (3, 4, 5)]
+    assert first_held_id is None
+    assert outbox_repository.fetch_due_entries("localhost:8002") == []
+
+
+def test_envelope_round_trip():
+    message = {
+        "message_id": "m-1", "topic_name": "pedidos", "partition_id": 3, "partition_offset": 42,
+        "timestamp": "2025-05-01 10:20:30.123", "headers": {"tipo": "alta"},
+        "sender": "ana", "content": "hola ñandú"
+    }
+    envelope = to_envelope(message)
+    assert envelope.version == ENVELOPE_VERSION
+    assert from_envelope(envelope) == message
+
+
+def test_envelope_without_leader_fields():
+    message = {"message_id": "m-2", "topic_name": "pedidos", "sender": "ana", "content": "hola"}
+    decoded = from_envelope(to_envelope(message))
+    assert decoded["partition_id"] == 0
+    assert decoded["partition_offset"] is None
+    assert decoded["timestamp"] is None
+    assert decoded["headers"] == {}
+
+
+def test_envelope_rejects_newer_versions():
+    envelope = to_envelope({"message_id": "m-3", "topic_name": "pedidos", "sender": "ana", "content": "hola"})
+    envelope.version = ENVELOPE_VERSION + 1
+    with pytest.raises(ValueError):
+        from_envelope(envelope)
+
+
+@pytest.mark.parametrize("consistency, replicas, expected", [
+    ("one", 3, 1), ("quorum", 1, 1), ("quorum", 2, 2), ("quorum", 3, 2), ("quorum", 5, 3),
+    ("all", 3, 3), ("all", 1, 1)
+])
+def test_required_responses(consistency, replicas, expected):
+    assert required_responses(consistency, replicas) == expected
+
+
+def test_merge_responses_deduplicates_and_orders():
+    def message(message_id, partition_id, offset):
+        return {"message_id": message_id, "partition_id": partition_id, "partition_offset": offset,
+                "sender": "ana", "content": message_id, "timestamp": f"2025-05-01 10:00:0{offset}.000"}
+
+    merged = merge_responses({
+        "localhost:8000": [message("a", 0, 1), message("c", 0, 3)],
+        "localhost:8001": [message("b", 0, 2), message("a", 0, 1)],
+        "localhost:8002": None,
+        "localhost:8003": [message("x", 1, 1), message("c", 0, 3)]
+    })
+    assert [m["message_id"] for m in merged] == ["a", "b", "c", "x"]
+
+
+def test_merge_responses_keeps_messages_without_id_last():
+    legacy = {"sender": "ana", "content": "antiguo", "timestamp": "2025-01-01 00:00:00"}
+    merged = merge_responses({
+        "localhost:8000": [legacy, {"message_id": "a", "partition_offset": 1, "sender": "ana", "content": "a"}],
+        "localhost:8001": [dict(legacy)]
+    })
+    assert [m["content"] for m in merged] == ["a", "antiguo"]
+
+
+def test_hash_tree_detects_divergent_ranges():
+    leaves = {0: 11, 1: 22, 5: 33, 9: 44}
+    local = HashTree(leaves)
+    remote = HashTree({**leaves, 5: 34})
+    assert local.range_hash(0, 10) != remote.range_hash(0, 10)
+    assert local.range_hash(0, 5) == remote.range_hash(0, 5)
+    assert local.range_hash(6, 10) == remote.range_hash(6, 10)
+    assert local.range_hash(2, 5) == ""
+
+
+def test_hash_tree_does_not_depend_on_leaf_insertion_order():
+    assert HashTree({3: 1, 1: 2}).range_hash(0, 4) == HashTree({1: 2, 3: 1}).range_hash(0, 4)
+
+
+@pytest.mark.parametrize("start, end, fanout", [(0, 100, 16), (0, 5, 16), (7, 8, 4), (10, 33, 3)])
+def test_split_range_covers_range_contiguously(start, end, fanout):
+    ranges = split_range(start, end, fanout)
+    assert len(ranges) <= fanout
+    assert ranges[0][0] == start and ranges[-1][1] == end
+    assert all(lo < hi for lo, hi in ranges)
+    assert all(previous[1] == following[0] for previous, following in zip(ranges, ranges[1:]))
+
+
+def test_split_range_of_empty_range():
+    assert split_range(5, 5, 4) == []